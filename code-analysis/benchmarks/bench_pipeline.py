@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from synthetic_repo import make_synthetic_repo
+from fake_llm import FakeLLMManager
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "commit": commit or None
+    }
+
+
+def timed(phases, name, function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    phases[name] = round(time.perf_counter() - start, 4)
+    print(f"{name:<14} {phases[name]:>9.3f}s", flush=True)
+    return result
+
+
+def run_pipeline(work_dir, repo_dir, args):
+    from analyzer import PatternAnalyzer
+    from tree_builder import DirectoryTreeBuilder
+    from file_reader import LazyDocuments
+    
+    phases = {}
+    analyzer = PatternAnalyzer(work_dir / "target_repo", use_repo_cache=True)
+    analyzer.repo_manager.cache_dir = work_dir / "mirrors"
+    
+    if args.model and args.workers <= 1:
+        analyzer.phase_1_load_model(use_server=False)
+    else:
+        analyzer._llm_manager = FakeLLMManager(
+            batch_latency_ms=args.batch_latency_ms,
+            prefill_us_per_token=args.prefill_us_per_token,
+            decode_ms_per_step=args.decode_ms_per_step
+        )
+    
+    if args.graph:
+        # The whole analyzer task graph as one span; per-phase spans land in the run report timeline
+        timed(
+            phases,
+            "pipeline",
+            analyzer.run,
+            repo_dir.resolve().as_uri(),
+            concurrency=1 if args.sequential else 0,
+            batch_size=args.batch_size,
+            use_cache=False,
+            workers=args.workers
+        )
+    elif args.clone:
+        timed(phases, "clone", analyzer.phase_0_clone_and_map, repo_dir.resolve().as_uri())
+    else:
+        analyzer.repo_path = repo_dir
+        
+        def build_tree():
+            tree_builder = DirectoryTreeBuilder(analyzer.repo_path)
+            analyzer.directory_tree, analyzer.source_files = tree_builder.build()
+            analyzer.doc_files = LazyDocuments(analyzer.repo_path, tree_builder.doc_files)
+        
+        timed(phases, "tree_build", build_tree)
+    
+    if not args.graph:
+        timed(phases, "doc_discovery", lambda: [analyzer.doc_files[path] for path in analyzer.doc_files])
+        timed(phases, "symbol_index", analyzer.build_symbol_index)
+        timed(phases, "indexing", analyzer.phase_2_generate_summaries, batch_size=args.batch_size, use_cache=False, workers=args.workers)
+        timed(phases, "vector_index", analyzer.build_vector_index)
+    
+    indexer = analyzer.indexer
+    metrics = {
+        "source_files": len(analyzer.source_files),
+        "doc_files": len(analyzer.doc_files),
+        "files_per_second": round(indexer.files_per_second, 2),
+        "workers": getattr(indexer, "worker_stats", None),
+        "stage_times": {stage: round(seconds, 4) for stage, seconds in indexer.stage_times.items()},
+        "llm_calls_avoided": indexer.llm_calls_avoided(),
+        "decoding": indexer.decoding
+    }
+    if isinstance(analyzer.llm_manager, FakeLLMManager):
+        metrics["llm_calls"] = analyzer.llm_manager.calls
+        metrics["prompt_tokens"] = analyzer.llm_manager.prompt_tokens
+        metrics["generated_tokens"] = analyzer.llm_manager.generated_tokens
+    
+    metrics["run_report"] = analyzer.metrics.report()["phases"]
+    
+    analyzer.cleanup(keep_summaries=False)
+    return phases, metrics
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    
+    print(f"\nCompared with {baseline_path}:")
+    for name, seconds in results["phases"].items():
+        previous = baseline.get("phases", {}).get(name)
+        if previous:
+            print(f"  {name:<14} {previous:>9.3f}s -> {seconds:>9.3f}s ({(seconds - previous) / previous:+.1%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time each PatternAnalyzer phase on a synthetic repository.")
+    parser.add_argument('--files', type=int, default=1000, help='Source files in the synthetic repository')
+    parser.add_argument('--depth', type=int, default=3, help='Package nesting depth')
+    parser.add_argument('--fanout', type=int, default=4, help='Subpackages per package')
+    parser.add_argument('--classes', type=int, default=3, help='Classes per module')
+    parser.add_argument('--methods', type=int, default=4, help='Methods per class')
+    parser.add_argument('--duplicate-ratio', type=float, default=0.1, help='Fraction of modules that copy an earlier module')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the synthetic repository')
+    parser.add_argument('--clone', action='store_true', help='Commit the repository and time phase 0 through the mirror clone')
+    parser.add_argument('--batch-size', type=int, default=8, help='Indexer batch size')
+    parser.add_argument('--batch-latency-ms', type=float, default=5.0, help='Fake backend: fixed latency per forward pass')
+    parser.add_argument('--prefill-us-per-token', type=float, default=20.0, help='Fake backend: prefill latency per prompt token')
+    parser.add_argument('--decode-ms-per-step', type=float, default=1.0, help='Fake backend: latency per decoding step')
+    parser.add_argument('--graph', action='store_true', help='Run PatternAnalyzer.run (concurrent task graph, implies --clone) instead of timing phases one by one')
+    parser.add_argument('--sequential', action='store_true', help='With --graph: one phase at a time, for comparison')
+    parser.add_argument('--model', help='Use this real (tiny) model instead of the fake backend')
+    parser.add_argument('--workers', type=int, default=1, help='Indexer processes (requires --model)')
+    parser.add_argument('--work-dir', help='Keep the synthetic repository and outputs here instead of a temp dir')
+    parser.add_argument('--json', dest='json_path', default='bench_pipeline.json', help='Results file')
+    parser.add_argument('--compare', dest='baseline_path', help='Previous results file to compare against')
+    args = parser.parse_args()
+    
+    if args.workers > 1 and not args.model:
+        parser.error("--workers needs --model; the fake backend lives in this process only")
+    
+    if args.model:
+        os.environ["LLM_MODEL"] = args.model
+    
+    work_dir = Path(args.work_dir or tempfile.mkdtemp(prefix="bench_pipeline_"))
+    repo_dir = work_dir / "synthetic_repo"
+    
+    try:
+        start = time.perf_counter()
+        make_synthetic_repo(
+            repo_dir,
+            files=args.files,
+            depth=args.depth,
+            fanout=args.fanout,
+            classes=args.classes,
+            methods=args.methods,
+            duplicate_ratio=args.duplicate_ratio,
+            seed=args.seed,
+            git=args.clone or args.graph
+        )
+        print(f"Generated {args.files} files in {time.perf_counter() - start:.2f}s at {repo_dir}\n")
+        
+        os.environ.setdefault("SYMBOL_CACHE_DIR", str(work_dir / "symbol_cache"))
+        phases, metrics = run_pipeline(work_dir, repo_dir, args)
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    
+    results = {
+        "config": {key: value for key, value in vars(args).items() if key not in ("json_path", "baseline_path", "work_dir")},
+        "backend": args.model or "fake",
+        "environment": environment(),
+        "phases": phases,
+        "total_s": round(sum(phases.values()), 4),
+        "metrics": metrics
+    }
+    
+    with open(args.json_path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nTotal {results['total_s']:.3f}s, {metrics['files_per_second']:.1f} files/sec indexed; results written to {args.json_path}")
+    
+    if args.baseline_path:
+        compare(results, args.baseline_path)
+
+
+if __name__ == "__main__":
+    main()
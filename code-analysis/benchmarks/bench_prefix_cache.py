@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "src"))
+
+from config import SUMMARY_PROMPT_TEMPLATE, SUMMARY_BATCH_SIZE
+from llm_manager import LLMManager
+from tree_builder import DirectoryTreeBuilder
+
+MANUAL_ORCHESTRATOR = ROOT_DIR.parent / "manual-analysis" / "src" / "manual" / "orchestrator.py"
+
+CHAT_QUESTIONS = [
+    "Which creational patterns does the repository use?",
+    "Is the LLMManager a proper Singleton?",
+    "Explain how the indexer batches prompts.",
+    "Does the CLI follow the Command pattern?",
+]
+
+
+def summary_prompts(repo, count, max_chars):
+    _, source_files = DirectoryTreeBuilder(repo).build()
+    prompts = []
+    for file_path in source_files[:count]:
+        code = file_path.read_text(encoding='utf-8', errors='replace')[:max_chars]
+        prompts.append(SUMMARY_PROMPT_TEMPLATE.format(code=code))
+    return SUMMARY_PROMPT_TEMPLATE.split("{code}")[0], prompts
+
+
+def chat_prompts(count):
+    source = MANUAL_ORCHESTRATOR.read_text(encoding='utf-8')
+    system_prompt = re.search(r'SYSTEM_PROMPT = """(.*?)"""', source, re.DOTALL).group(1)
+    prompts = [
+        f"{system_prompt}\n\nUser: {CHAT_QUESTIONS[i % len(CHAT_QUESTIONS)]}\n\nAssistant:"
+        for i in range(count)
+    ]
+    return system_prompt, prompts
+
+
+def run(llm_manager, input_ids, batch_size, max_new_tokens):
+    outputs = []
+    start = time.perf_counter()
+    for i in range(0, len(input_ids), batch_size):
+        outputs.extend(llm_manager.generate_batch(None, max_new_tokens=max_new_tokens, input_ids=input_ids[i:i + batch_size]))
+    return time.perf_counter() - start, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure prefill time with and without the shared-prefix KV cache.")
+    parser.add_argument('--scenario', choices=['summary', 'chat'], default='summary', help='Indexer summary prompts or orchestrator chat prompts')
+    parser.add_argument('--repo', default=str(ROOT_DIR / "src"), help='Source tree used for summary prompts')
+    parser.add_argument('--prompts', type=int, default=32, help='Number of prompts')
+    parser.add_argument('--max-chars', type=int, default=1500, help='Characters of each file placed in summary prompts')
+    parser.add_argument('--batch-size', type=int, default=SUMMARY_BATCH_SIZE, help='Prompts per forward pass')
+    parser.add_argument('--check-tokens', type=int, default=32, help='Greedy tokens compared between both paths')
+    parser.add_argument('--runs', type=int, default=3, help='Runs per mode (best is reported)')
+    parser.add_argument('--json', dest='json_path', help='Also write results to this JSON file')
+    args = parser.parse_args()
+    
+    if args.scenario == "summary":
+        prefix, prompts = summary_prompts(args.repo, args.prompts, args.max_chars)
+    else:
+        prefix, prompts = chat_prompts(args.prompts)
+    
+    llm_manager = LLMManager()
+    llm_manager.load_model(use_server=False)
+    input_ids = llm_manager.encode(prompts)
+    
+    results = {"scenario": args.scenario, "prompts": len(prompts), "prompt_tokens": sum(len(ids) for ids in input_ids)}
+    
+    llm_manager.clear_prefixes()
+    _, baseline = run(llm_manager, input_ids, args.batch_size, args.check_tokens)
+    results["baseline_prefill_s"] = min(run(llm_manager, input_ids, args.batch_size, 1)[0] for _ in range(args.runs))
+    
+    results["prefix_tokens"] = llm_manager.cache_prefix(prefix)
+    results["prefix_hit_rate"] = sum(llm_manager._match_prefix([ids]) is not None for ids in input_ids) / len(input_ids)
+    _, cached = run(llm_manager, input_ids, args.batch_size, args.check_tokens)
+    results["cached_prefill_s"] = min(run(llm_manager, input_ids, args.batch_size, 1)[0] for _ in range(args.runs))
+    
+    results["identical_outputs"] = baseline == cached
+    results["prefill_reduction"] = 1 - results["cached_prefill_s"] / results["baseline_prefill_s"]
+    
+    print(f"Scenario: {args.scenario}, {results['prompts']} prompts, {results['prompt_tokens']} prompt tokens")
+    print(f"Cached prefix: {results['prefix_tokens']} tokens, matched by {results['prefix_hit_rate']:.0%} of prompts")
+    print(f"Prefill without prefix cache: {results['baseline_prefill_s']:.3f}s")
+    print(f"Prefill with prefix cache:    {results['cached_prefill_s']:.3f}s ({results['prefill_reduction']:.1%} less)")
+    print(f"Greedy outputs identical ({args.check_tokens} tokens): {results['identical_outputs']}")
+    
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
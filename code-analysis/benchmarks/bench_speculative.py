@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "src"))
+
+from config import SUMMARY_PROMPT_TEMPLATE, SUMMARY_MAX_NEW_TOKENS, DRAFT_MODEL_NAME, MODEL_NAME
+from llm_manager import LLMManager
+from tree_builder import DirectoryTreeBuilder
+
+
+def summary_prompts(repo, count, max_chars):
+    _, source_files = DirectoryTreeBuilder(repo).build()
+    return [
+        SUMMARY_PROMPT_TEMPLATE.format(code=file_path.read_text(encoding='utf-8', errors='replace')[:max_chars])
+        for file_path in source_files[:count]
+    ]
+
+
+def run(llm_manager, input_ids, max_new_tokens):
+    start = time.perf_counter()
+    outputs = llm_manager.generate_batch(None, max_new_tokens=max_new_tokens, input_ids=input_ids)
+    return time.perf_counter() - start, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare greedy decoding with and without the draft model (LLM_DRAFT_MODEL).")
+    parser.add_argument('--repo', default=str(ROOT_DIR / "src"), help='Source tree used for summary prompts')
+    parser.add_argument('--prompts', type=int, default=8, help='Number of prompts')
+    parser.add_argument('--max-chars', type=int, default=1500, help='Characters of each file placed in the prompt')
+    parser.add_argument('--max-new-tokens', type=int, default=SUMMARY_MAX_NEW_TOKENS, help='Tokens generated per prompt')
+    parser.add_argument('--json', dest='json_path', help='Also write results to this JSON file')
+    args = parser.parse_args()
+    
+    if not DRAFT_MODEL_NAME:
+        parser.error("set LLM_DRAFT_MODEL to the draft model name")
+    
+    llm_manager = LLMManager()
+    llm_manager.load_model(use_server=False)
+    input_ids = llm_manager.encode(summary_prompts(args.repo, args.prompts, args.max_chars))
+    
+    draft_model = llm_manager._draft_model
+    
+    # Both paths decode one prompt at a time so the comparison isolates speculation from batching
+    llm_manager._draft_model = None
+    baseline_s = 0.0
+    baseline = []
+    for ids in input_ids:
+        elapsed, outputs = run(llm_manager, [ids], args.max_new_tokens)
+        baseline_s += elapsed
+        baseline.extend(outputs)
+    
+    llm_manager._draft_model = draft_model
+    speculative_s, speculative = run(llm_manager, input_ids, args.max_new_tokens)
+    
+    new_tokens = llm_manager.speculation["new_tokens"]
+    results = {
+        "model": MODEL_NAME,
+        "draft_model": DRAFT_MODEL_NAME,
+        "prompts": len(input_ids),
+        "new_tokens": new_tokens,
+        "baseline_s": baseline_s,
+        "speculative_s": speculative_s,
+        "baseline_tokens_per_s": new_tokens / baseline_s,
+        "speculative_tokens_per_s": new_tokens / speculative_s,
+        "speedup": baseline_s / speculative_s,
+        "acceptance_rate": llm_manager.acceptance_rate(),
+        "identical_outputs": baseline == speculative
+    }
+    
+    print(f"Model: {MODEL_NAME}, draft: {DRAFT_MODEL_NAME}, {results['prompts']} prompts, {new_tokens} new tokens")
+    print(f"Without draft: {baseline_s:.2f}s ({results['baseline_tokens_per_s']:.1f} tokens/sec)")
+    print(f"With draft:    {speculative_s:.2f}s ({results['speculative_tokens_per_s']:.1f} tokens/sec)")
+    print(f"Speedup: {results['speedup']:.2f}x, draft acceptance rate: {results['acceptance_rate']:.1%}")
+    print(f"Greedy outputs identical: {results['identical_outputs']}")
+    
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+COMMANDS = SRC_DIR / "commands.py"
+HEAVY_MODULES = ('torch', 'transformers')
+
+SUBCOMMANDS = {
+    "--help": ["--help"],
+    "tree": ["tree", str(SRC_DIR)],
+    "clone --help": ["clone", "--help"],
+    "index --help": ["index", "--help"],
+    "analyze --help": ["analyze", "--help"],
+    "load-model --help": ["load-model", "--help"],
+    "serve --help": ["serve", "--help"],
+    "prune-cache --help": ["prune-cache", "--help"],
+}
+
+
+def parse_importtime(stderr):
+    total_us = 0
+    heavy = set()
+    
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.startswith(" ") and not name.startswith("  "):
+            total_us += int(cumulative)
+        
+        module = name.strip().split(".")[0]
+        if module in HEAVY_MODULES:
+            heavy.add(module)
+    
+    return total_us / 1000, sorted(heavy)
+
+
+def measure(args, runs):
+    best_wall_ms = None
+    import_ms = 0.0
+    heavy = []
+    
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", str(COMMANDS), *args],
+            capture_output=True,
+            text=True,
+            cwd=SRC_DIR
+        )
+        wall_ms = (time.perf_counter() - start) * 1000
+        
+        if best_wall_ms is None or wall_ms < best_wall_ms:
+            best_wall_ms = wall_ms
+            import_ms, heavy = parse_importtime(result.stderr)
+    
+    return {"wall_ms": round(best_wall_ms, 1), "import_ms": round(import_ms, 1), "heavy_imports": heavy}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start latency of each analyze subcommand.")
+    parser.add_argument('--runs', type=int, default=3, help='Runs per subcommand (best is reported)')
+    parser.add_argument('--json', dest='json_path', help='Also write results to this JSON file')
+    args = parser.parse_args()
+    
+    results = {}
+    for name, command_args in SUBCOMMANDS.items():
+        results[name] = measure(command_args, args.runs)
+        result = results[name]
+        heavy = ", ".join(result["heavy_imports"]) or "-"
+        print(f"{name:<22} wall {result['wall_ms']:>8.1f} ms   imports {result['import_ms']:>8.1f} ms   heavy: {heavy}")
+    
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
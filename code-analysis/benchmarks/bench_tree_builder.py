@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from tree_builder import DirectoryTreeBuilder
+
+
+EXTENSIONS = ['.py', '.js', '.go', '.txt', '.md']
+
+
+def make_synthetic_tree(root, total_files, fanout, files_per_dir):
+    root = Path(root)
+    created = 0
+    frontier = [root]
+    
+    while created < total_files:
+        next_frontier = []
+        for directory in frontier:
+            directory.mkdir(parents=True, exist_ok=True)
+            
+            for i in range(min(files_per_dir, total_files - created)):
+                (directory / f"file_{i}{EXTENSIONS[i % len(EXTENSIONS)]}").touch()
+                created += 1
+            
+            if created >= total_files:
+                break
+            
+            next_frontier.extend(directory / f"dir_{i}" for i in range(fanout))
+        frontier = next_frontier
+    
+    return created
+
+
+def time_call(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DirectoryTreeBuilder on a synthetic tree.")
+    parser.add_argument('--files', type=int, default=1000000, help='Number of files to create')
+    parser.add_argument('--fanout', type=int, default=10, help='Subdirectories per directory')
+    parser.add_argument('--files-per-dir', type=int, default=100, help='Files per directory')
+    parser.add_argument('--root', help='Reuse or create the synthetic tree here instead of a temp dir')
+    args = parser.parse_args()
+    
+    root = Path(args.root) if args.root else Path(tempfile.mkdtemp(prefix="tree_bench_"))
+    
+    try:
+        if not (root / "file_0.py").exists():
+            created, elapsed = time_call(lambda: make_synthetic_tree(root, args.files, args.fanout, args.files_per_dir))
+            print(f"Created {created} files under {root} in {elapsed:.1f}s")
+        
+        builder = DirectoryTreeBuilder(root)
+        
+        first_file, elapsed = time_call(lambda: next(builder.iter_source_files()))
+        print(f"First source file streamed after {elapsed * 1000:.2f} ms: {first_file}")
+        
+        (tree, source_files), elapsed = time_call(builder.build)
+        print(f"build(): {len(source_files)} source files, {len(tree.splitlines())} tree lines in {elapsed:.2f}s "
+              f"({len(source_files) / elapsed:,.0f} files/sec)")
+    finally:
+        if not args.root:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
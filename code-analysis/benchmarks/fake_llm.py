@@ -0,0 +1,100 @@
+import re
+import threading
+import time
+import zlib
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+SENTENCE_TOKENS = 18
+
+
+class FakeLLMManager:
+    def __init__(self, batch_latency_ms=5.0, prefill_us_per_token=20.0, decode_ms_per_step=1.0,
+                 max_context_tokens=16000, vocab_size=32000):
+        self.batch_latency_ms = batch_latency_ms
+        self.prefill_us_per_token = prefill_us_per_token
+        self.decode_ms_per_step = decode_ms_per_step
+        self.max_context_tokens = max_context_tokens
+        self.vocab_size = vocab_size
+        self.speculation = {"proposed": 0, "accepted": 0, "new_tokens": 0}
+        self.decoding = {"rows": 0, "budget": 0, "steps": 0}
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.generated_tokens = 0
+        self.metrics = None
+        self._prefix = None
+        self._lock = threading.Lock()
+    
+    def is_loaded(self):
+        return True
+    
+    def load_model(self, **load_options):
+        pass
+    
+    def unload_model(self):
+        pass
+    
+    def acceptance_rate(self):
+        return 0.0
+    
+    def encode(self, texts):
+        return [
+            [zlib.crc32(token.encode('utf-8')) % self.vocab_size for token in TOKEN_PATTERN.findall(text)][:self.max_context_tokens]
+            for text in texts
+        ]
+    
+    def count_tokens(self, texts):
+        return [len(ids) for ids in self.encode(texts)]
+    
+    def cache_prefix(self, text):
+        self._prefix = self.encode([text])[0][:-1]
+        return len(self._prefix)
+    
+    def _prefill_tokens(self, ids):
+        if self._prefix and ids[:len(self._prefix)] == self._prefix:
+            return len(ids) - len(self._prefix)
+        return len(ids)
+    
+    def _summary(self, ids, max_new_tokens, max_sentences, stop_sequences):
+        digest = zlib.crc32(bytes(str(ids), 'utf-8'))
+        # Unstopped output rambles on after the summary; stop rules end it after a few sentences
+        words = min(max_new_tokens, 20 + digest % 120)
+        if max_sentences:
+            words = min(words, max_sentences * SENTENCE_TOKENS)
+        elif stop_sequences:
+            words = min(words, 20 + digest % 60)
+        return f"Synthetic summary {digest:08x} of a module with {len(ids)} prompt tokens.", words
+    
+    def generate_batch(self, prompts, max_new_tokens=256, input_ids=None, max_sentences=None, stop_sequences=None):
+        if input_ids is None:
+            input_ids = self.encode(prompts) if prompts else []
+        
+        if not input_ids:
+            return []
+        
+        start = time.perf_counter()
+        budgets = max_new_tokens if isinstance(max_new_tokens, list) else [max_new_tokens] * len(input_ids)
+        sentences = max_sentences if isinstance(max_sentences, list) else [max_sentences] * len(input_ids)
+        results = [
+            self._summary(ids, budget, limit, stop_sequences)
+            for ids, budget, limit in zip(input_ids, budgets, sentences)
+        ]
+        steps = max(words for _, words in results)
+        prefill = max(self._prefill_tokens(ids) for ids in input_ids) * len(input_ids)
+        
+        time.sleep((self.batch_latency_ms + steps * self.decode_ms_per_step) / 1000 + prefill * self.prefill_us_per_token / 1e6)
+        
+        if self.metrics is not None:
+            self.metrics.record_generation(time.perf_counter() - start, sum(len(ids) for ids in input_ids), sum(words for _, words in results))
+        
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += sum(len(ids) for ids in input_ids)
+            self.generated_tokens += sum(words for _, words in results)
+            self.decoding["rows"] += len(results)
+            self.decoding["budget"] += sum(budgets)
+            self.decoding["steps"] += sum(words for _, words in results)
+        
+        return [summary for summary, _ in results]
+    
+    def generate(self, prompt, max_new_tokens=256, max_sentences=None, stop_sequences=None):
+        return self.generate_batch([prompt], max_new_tokens=max_new_tokens, max_sentences=max_sentences, stop_sequences=stop_sequences)[0]
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def do_GET(self):
+        if self.path.rstrip("/") == "/v1/models":
+            self._send(200, {"object": "list", "data": [{"id": self.server.model, "object": "model"}]})
+        else:
+            self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+    
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        
+        if self.path.rstrip("/") != "/v1/completions":
+            self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        
+        self.server.record(self.client_address)
+        
+        if self.server.rng.random() < self.server.failure_rate:
+            self._send(503, {"error": {"message": "Stub server overloaded"}})
+            return
+        
+        prompt = request["prompt"]
+        prompt_tokens = len(prompt.split())
+        completion_tokens = min(request.get("max_tokens", 16), 24)
+        time.sleep((self.server.latency_ms + completion_tokens * self.server.decode_ms_per_token) / 1000)
+        
+        digest = zlib.crc32(prompt.encode('utf-8'))
+        self._send(200, {
+            "object": "text_completion",
+            "model": request.get("model"),
+            "choices": [{"index": 0, "text": f" Stub summary {digest:08x} of {prompt_tokens} words.", "finish_reason": "length"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+        })
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    
+    def __init__(self, address, model="stub", latency_ms=50.0, decode_ms_per_token=1.0, failure_rate=0.0, seed=0):
+        super().__init__(address, StubHandler)
+        self.model = model
+        self.latency_ms = latency_ms
+        self.decode_ms_per_token = decode_ms_per_token
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.connections = set()
+        self._lock = threading.Lock()
+    
+    def record(self, client_address):
+        with self._lock:
+            self.requests += 1
+            self.connections.add(client_address)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible completions stub for LLM_BACKEND=openai.")
+    parser.add_argument('--port', type=int, default=8000, help='Port to listen on (API base http://127.0.0.1:PORT/v1)')
+    parser.add_argument('--model', default="stub", help='Model id reported by /v1/models')
+    parser.add_argument('--latency-ms', type=float, default=50.0, help='Fixed latency per request')
+    parser.add_argument('--decode-ms-per-token', type=float, default=1.0, help='Latency per completion token')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='Fraction of requests answered with 503')
+    args = parser.parse_args()
+    
+    server = StubServer(("127.0.0.1", args.port), args.model, args.latency_ms, args.decode_ms_per_token, args.failure_rate)
+    print(f"Stub completions API on http://127.0.0.1:{args.port}/v1 (Ctrl+C to stop)")
+    
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"{server.requests} requests over {len(server.connections)} connections")
+
+
+if __name__ == "__main__":
+    main()
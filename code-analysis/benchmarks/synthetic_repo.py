@@ -0,0 +1,83 @@
+import random
+import subprocess
+from pathlib import Path
+
+BASE_CLASSES = ["object", "ABC", "Exception", "dict"]
+
+README_TEMPLATE = """# {name}
+
+Synthetic package {name} generated for benchmarks.
+
+It contains {count} modules built around factories, registries and strategies.
+"""
+
+
+def _module_source(rng, module_name, known_classes, classes, methods, lines_per_method):
+    lines = ["import os", "import json", "from abc import ABC, abstractmethod", ""]
+    defined = []
+    
+    for c in range(classes):
+        class_name = f"{module_name.title().replace('_', '')}Class{c}"
+        base = rng.choice(known_classes + defined) if (known_classes or defined) and rng.random() < 0.6 else rng.choice(BASE_CLASSES)
+        lines.append(f"class {class_name}({base}):")
+        lines.append(f'    """{class_name} handles part of the {module_name} workflow."""')
+        lines.append("")
+        
+        for m in range(methods):
+            lines.append(f"    def method_{m}(self, value, option=None):")
+            for step in range(lines_per_method):
+                lines.append(f"        value = self._step_{step % 5}(value, {rng.randint(0, 1000)})")
+            lines.append("        return value")
+            lines.append("")
+        
+        defined.append(class_name)
+    
+    lines.append(f"def create_{module_name}(kind):")
+    lines.append(f"    registry = {{{', '.join(repr(name) + ': ' + name for name in defined)}}}")
+    lines.append("    return registry[kind]()")
+    lines.append("")
+    
+    return "\n".join(lines), defined
+
+
+def make_synthetic_repo(root, files=1000, depth=3, fanout=4, classes=3, methods=4, lines_per_method=6,
+                        duplicate_ratio=0.1, seed=0, git=False):
+    root = Path(root)
+    rng = random.Random(seed)
+    
+    directories = [root]
+    frontier = [root]
+    for level in range(depth):
+        frontier = [directory / f"pkg_{level}_{i}" for directory in frontier for i in range(fanout)]
+        directories.extend(frontier)
+    
+    created = []
+    known_classes = []
+    per_directory = {}
+    
+    for i in range(files):
+        directory = directories[i % len(directories)]
+        directory.mkdir(parents=True, exist_ok=True)
+        module_name = f"module_{i}"
+        path = directory / f"{module_name}.py"
+        
+        if created and rng.random() < duplicate_ratio:
+            path.write_text(rng.choice(created).read_text(encoding='utf-8'), encoding='utf-8')
+        else:
+            source, defined = _module_source(rng, module_name, known_classes[-50:], classes, methods, lines_per_method)
+            path.write_text(source, encoding='utf-8')
+            known_classes.extend(defined)
+        
+        created.append(path)
+        per_directory[directory] = per_directory.get(directory, 0) + 1
+    
+    for directory, count in per_directory.items():
+        if directory != root:
+            (directory / "__init__.py").write_text(f"from .{next(directory.glob('module_*.py')).stem} import *\n", encoding='utf-8')
+        (directory / "README.md").write_text(README_TEMPLATE.format(name=directory.name, count=count), encoding='utf-8')
+    
+    if git:
+        for args in (["init", "-q"], ["add", "-A"], ["-c", "user.name=bench", "-c", "user.email=bench@example.com", "commit", "-q", "-m", "synthetic"]):
+            subprocess.run(["git", *args], cwd=root, check=True, capture_output=True)
+    
+    return created
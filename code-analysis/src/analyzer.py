@@ -1,68 +1,306 @@
+import shutil
+import time
 from pathlib import Path
 from repository import RepositoryManager
 from tree_builder import DirectoryTreeBuilder
-from file_reader import FileReader
-from llm_manager import LLMManager
+from file_reader import LazyDocuments
 from indexer import CodeIndexer
+from summary_cache import SummaryCache
+from summary_store import SummaryStore
+from metrics import RunMetrics, instrumented
+from config import (
+    SUMMARY_BATCH_SIZE,
+    SUMMARY_PREFILTER,
+    SUMMARY_PRIORITY_ORDER,
+    INDEX_WORKERS,
+    SUMMARIES_FILE,
+    SUMMARIES_STORE_FILE,
+    SYMBOLS_FILE,
+    VECTOR_INDEX_DIR,
+    RUN_REPORT_FILE,
+    PROMETHEUS_FILE,
+    TRACE_FILE,
+    PIPELINE_CONCURRENCY,
+    SUMMARY_STREAM_POLL_SECONDS,
+    DIRECTORY_PROMPT_TEMPLATE,
+    DIRECTORY_ROLLUP
+)
 
 
 class PatternAnalyzer:
-    def __init__(self, target_dir="./target_repo"):
-        self.repo_manager = RepositoryManager(target_dir)
-        self.llm_manager = LLMManager()
+    def __init__(self, target_dir="./target_repo", use_repo_cache=True, sparse=False):
+        self.repo_manager = RepositoryManager(target_dir, use_cache=use_repo_cache, sparse=sparse)
+        self._llm_manager = None
         self.indexer = None
         self.directory_tree = None
         self.source_files = []
         self.doc_files = {}
         self.summaries_path = None
+        self.summaries_json_path = None
+        self.repository_summary = None
         self.repo_path = None
+        self.vector_index = None
+        self.symbol_index = None
+        self.symbols_path = None
+        self.metrics = RunMetrics()
     
+    @property
+    def llm_manager(self):
+        if self._llm_manager is None:
+            from llm_manager import LLMManager
+            self._llm_manager = LLMManager()
+            self._llm_manager.metrics = self.metrics
+        return self._llm_manager
+    
+    @instrumented
     def phase_0_clone_and_map(self, repo_url):
         print("Cloning repository...")
-        self.repo_path = self.repo_manager.clone(repo_url)
-        
-        print("Building directory tree...")
-        tree_builder = DirectoryTreeBuilder(self.repo_path)
-        self.directory_tree, self.source_files = tree_builder.build()
+        with self.metrics.phase("clone"):
+            self.repo_path = self.repo_manager.clone(repo_url)
         
-        print("Finding documentation files...")
-        reader = FileReader()
-        self.doc_files = reader.find_documentation_files(self.repo_path)
+        print("Building directory tree and finding documentation files...")
+        with self.metrics.phase("tree_build"):
+            tree_builder = DirectoryTreeBuilder(self.repo_path)
+            self.directory_tree, self.source_files = tree_builder.build()
+            self.doc_files = LazyDocuments(self.repo_path, tree_builder.doc_files)
         
         return self.repo_path
     
-    def phase_1_load_model(self):
-        self.llm_manager.load_model()
+    @instrumented
+    def build_symbol_index(self):
+        from symbol_index import SymbolIndex
+        
+        if self.repo_path is None:
+            raise RuntimeError("Repository not cloned. Run phase_0_clone_and_map() first.")
+        
+        self.symbol_index = SymbolIndex.build(self.repo_path, self.source_files)
+        self.symbols_path = self.symbol_index.save(self.repo_path.parent / SYMBOLS_FILE)
+        
+        return self.symbol_index
     
-    def phase_2_generate_summaries(self):
+    @instrumented
+    def prioritize_files(self):
+        from priority import ImportanceScorer
+        
+        symbol_index = self.symbol_index or self.build_symbol_index()
+        scorer = ImportanceScorer(self.repo_path, symbol_index)
+        self.source_files = scorer.order(self.source_files)
+        
+        return scorer
+    
+    @instrumented
+    def phase_1_load_model(self, **load_options):
+        self.llm_manager.load_model(**load_options)
+    
+    @instrumented
+    def phase_2_generate_summaries(self, batch_size=SUMMARY_BATCH_SIZE, use_cache=True, resume=False, prefilter=SUMMARY_PREFILTER,
+                                   workers=INDEX_WORKERS, load_options=None, prioritize=SUMMARY_PRIORITY_ORDER, deadline=None):
         if self.repo_path is None:
             raise RuntimeError("Repository not cloned. Run phase_0_clone_and_map() first.")
         
+        if prioritize:
+            scorer = self.prioritize_files()
+            top = ", ".join(f"{file_path.relative_to(self.repo_path)} ({scorer.importers(file_path)} importers)" for file_path in self.source_files[:3])
+            print(f"\nSummarizing in order of importance, starting with: {top}")
+        
         print(f"\nGenerating summaries for {len(self.source_files)} files...")
         
-        self.indexer = CodeIndexer(self.repo_path, self.llm_manager)
-        self.indexer.generate_summaries(self.source_files, show_progress=True)
+        cache = SummaryCache() if use_cache else None
+        
+        if workers > 1:
+            from sharded_indexer import ShardedIndexer
+            
+            self.indexer = ShardedIndexer(
+                self.repo_path,
+                workers,
+                batch_size=batch_size,
+                use_cache=use_cache,
+                prefilter=prefilter,
+                load_options=load_options,
+                keep_order=prioritize
+            )
+            try:
+                self.indexer.generate_summaries(self.source_files, show_progress=True, resume=resume, deadline=deadline)
+            finally:
+                for stats in self.indexer.worker_stats:
+                    if stats.get("llm_calls"):
+                        self.metrics.record_generation(stats["llm_seconds"], stats["prompt_tokens"], stats["generated_tokens"], calls=stats["llm_calls"])
+        else:
+            self.llm_manager.metrics = self.metrics
+            self.indexer = CodeIndexer(self.repo_path, self.llm_manager, batch_size=batch_size, cache=cache, prefilter=prefilter)
+            self.indexer.generate_summaries(self.source_files, show_progress=True, resume=resume, deadline=deadline)
+        self.metrics.record_stages("phase_2_generate_summaries", self.indexer.stage_times)
+        self.metrics.record_decoding("phase_2_generate_summaries", self.indexer.decoding)
         
-        self.summaries_path = self.indexer.save_summaries()
+        self.summaries_path = self.indexer.store.path
+        
+        if cache is not None:
+            cache.evict()
         
         print(f"Summaries saved to: {self.summaries_path}")
         
         return self.summaries_path
     
+    @instrumented
+    def summarize_directories(self, use_cache=True, load_options=None, deadline=None):
+        from hierarchy import DirectorySummarizer
+        
+        if self.repo_path is None:
+            raise RuntimeError("Repository not cloned. Run phase_0_clone_and_map() first.")
+        
+        if deadline is not None and time.time() >= deadline:
+            print("\nTime budget used up; directory summaries not updated")
+            return None
+        
+        self.llm_manager.metrics = self.metrics
+        
+        print("\nRolling file summaries up into directory summaries...")
+        cache = SummaryCache(prompt_template=DIRECTORY_PROMPT_TEMPLATE) if use_cache else None
+        with SummaryStore(self.repo_path.parent / SUMMARIES_STORE_FILE).open() as store:
+            summarizer = DirectorySummarizer(store, self.llm_manager, cache=cache, load_options=load_options)
+            self.repository_summary = summarizer.summarize()
+        self.metrics.record_decoding("summarize_directories", summarizer.decoding)
+        
+        return self.repository_summary
+    
+    def export_summaries(self, output_path=None, prefix=""):
+        store = self.indexer.store if self.indexer is not None else SummaryStore(Path(self.repo_manager.target_dir).parent / SUMMARIES_STORE_FILE)
+        self.summaries_json_path = Path(store.save_json(output_path or store.path.parent / SUMMARIES_FILE, prefix=prefix))
+        return self.summaries_json_path
+    
+    @instrumented
     def phase_3_analyze_documentation(self):
         pass
     
-    def phase_4_investigate_code(self):
-        pass
+    @instrumented
+    def build_vector_index(self, index_dir=None, until=None, since=0.0):
+        from vector_index import VectorIndex, iter_records
+        
+        if self.repo_path is None:
+            raise RuntimeError("Repository not cloned. Run phase_0_clone_and_map() first.")
+        
+        store = self.indexer.store if self.indexer is not None else SummaryStore(self.repo_path.parent / SUMMARIES_STORE_FILE)
+        index_dir = index_dir or self.repo_path.parent / VECTOR_INDEX_DIR
+        
+        self.vector_index = VectorIndex.build(index_dir, iter_records(self.repo_path, self._summary_records(store, until, since)))
+        
+        return self.vector_index
+    
+    def _summary_records(self, store, until=None, since=0.0):
+        seen = set()
+        
+        if until is not None:
+            # Follow the store while phase 2 writes it; until is set once indexing has finished (or failed)
+            last_rowid = 0
+            while True:
+                finished = until.is_set()
+                for record in store.read_new(last_rowid, since):
+                    last_rowid = record["rowid"]
+                    if record["path"] not in seen:
+                        seen.add(record["path"])
+                        yield record
+                if finished:
+                    break
+                until.wait(SUMMARY_STREAM_POLL_SECONDS)
+        
+        # Everything not streamed: the whole store when not following, rows kept from an earlier run with --resume
+        for record in store.read():
+            if record["path"] not in seen:
+                seen.add(record["path"])
+                yield record
+        
+        # Files a time-budgeted run never reached still get their code indexed, just without a summary
+        for file_path in self.source_files:
+            path = str(file_path.relative_to(self.repo_path))
+            if path not in seen:
+                yield {"path": path, "summary": None}
+    
+    def load_vector_index(self, index_dir=None):
+        from vector_index import VectorIndex
+        
+        index_dir = index_dir or Path(self.repo_manager.target_dir).parent / VECTOR_INDEX_DIR
+        self.vector_index = VectorIndex(index_dir)
+        
+        return self.vector_index
     
+    @instrumented
+    def phase_4_investigate_code(self, queries=(), k=10):
+        if self.vector_index is None:
+            self.build_vector_index()
+        
+        return {query: self.vector_index.search(query, k=k) for query in queries}
+    
+    @instrumented
     def phase_5_collect_evidence(self):
         pass
     
+    def run(self, repo_url, load_options=None, concurrency=PIPELINE_CONCURRENCY, **summary_options):
+        from pipeline import TaskGraph
+        
+        load_options = load_options or {}
+        local_model = summary_options.get("workers", INDEX_WORKERS) <= 1
+        # With one phase at a time the vector index cannot follow phase 2, so it waits for it instead
+        streaming = concurrency != 1
+        since = time.time()
+        
+        graph = TaskGraph(concurrency)
+        graph.add("clone", lambda: self.phase_0_clone_and_map(repo_url))
+        if local_model:
+            graph.add("load_model", lambda: self.phase_1_load_model(**load_options))
+        graph.add("symbols", self.build_symbol_index, after=["clone"])
+        graph.add(
+            "summaries",
+            lambda: self.phase_2_generate_summaries(load_options=load_options, **summary_options),
+            after=["symbols", "load_model"] if local_model else ["symbols"]
+        )
+        if DIRECTORY_ROLLUP:
+            graph.add(
+                "directories",
+                lambda: self.summarize_directories(
+                    use_cache=summary_options.get("use_cache", True),
+                    load_options=load_options,
+                    deadline=summary_options.get("deadline")
+                ),
+                after=["summaries"]
+            )
+        graph.add("documentation", self.phase_3_analyze_documentation, after=["clone"])
+        graph.add(
+            "vector_index",
+            lambda: self.build_vector_index(until=graph.finished["summaries"] if streaming else None, since=since),
+            after=["clone"] if streaming else ["clone", "summaries"]
+        )
+        graph.add("evidence", self.phase_5_collect_evidence, after=["vector_index", "documentation"])
+        
+        with self.metrics.phase("pipeline"):
+            return graph.run_sync()
+    
+    def export_metrics(self, output_dir=None):
+        output_dir = Path(output_dir or Path(self.repo_manager.target_dir).parent)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        
+        report_path = self.metrics.write_json(output_dir / RUN_REPORT_FILE)
+        prometheus_path = self.metrics.write_prometheus(output_dir / PROMETHEUS_FILE)
+        trace_path = self.metrics.write_trace(output_dir / TRACE_FILE)
+        
+        return report_path, prometheus_path, trace_path
+    
     def cleanup(self, keep_summaries=True):
-        self.llm_manager.unload_model()
+        if self._llm_manager is not None:
+            self._llm_manager.unload_model()
+        
+        if self.vector_index is not None:
+            self.vector_index.close()
+            if not keep_summaries:
+                shutil.rmtree(self.vector_index.index_dir, ignore_errors=True)
+        
+        if not keep_summaries and self.summaries_json_path and self.summaries_json_path.exists():
+            self.summaries_json_path.unlink()
+        
+        if not keep_summaries and self.symbols_path and self.symbols_path.exists():
+            self.symbols_path.unlink()
         
-        if not keep_summaries and self.summaries_path and self.summaries_path.exists():
-            self.summaries_path.unlink()
+        if not keep_summaries and self.indexer is not None:
+            self.indexer.store.remove()
         
         self.repo_manager.cleanup()
 
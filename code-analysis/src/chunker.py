@@ -0,0 +1,81 @@
+import re
+
+
+DEFINITION_PATTERN = re.compile(
+    r"^(?:@"
+    r"|(?:export\s+)?(?:default\s+)?(?:(?:public|private|protected|internal|static|abstract|final|async|sealed|partial)\s+)*"
+    r"(?:def|class|function|func|fn|interface|struct|enum|module|namespace|impl|trait|type)\b)"
+)
+
+
+class CodeChunker:
+    def __init__(self, count_tokens, max_tokens):
+        self.count_tokens = count_tokens
+        self.max_tokens = max_tokens
+    
+    @staticmethod
+    def _split_definitions(code):
+        segments = []
+        current = []
+        previous_is_decorator = False
+        
+        for line in code.splitlines(keepends=True):
+            is_boundary = bool(DEFINITION_PATTERN.match(line))
+            if is_boundary and current and not previous_is_decorator:
+                segments.append("".join(current))
+                current = []
+            
+            current.append(line)
+            if line.strip():
+                previous_is_decorator = line.startswith("@")
+        
+        if current:
+            segments.append("".join(current))
+        
+        return segments
+    
+    def _split_lines(self, segment):
+        lines = segment.splitlines(keepends=True)
+        pieces = []
+        current = []
+        current_tokens = 0
+        
+        for line, tokens in zip(lines, self.count_tokens(lines)):
+            if current and current_tokens + tokens > self.max_tokens:
+                pieces.append("".join(current))
+                current = []
+                current_tokens = 0
+            current.append(line)
+            current_tokens += tokens
+        
+        if current:
+            pieces.append("".join(current))
+        
+        return pieces
+    
+    def split(self, code):
+        segments = self._split_definitions(code)
+        chunks = []
+        current = []
+        current_tokens = 0
+        
+        for segment, tokens in zip(segments, self.count_tokens(segments)):
+            if tokens > self.max_tokens:
+                pieces = self._split_lines(segment)
+                pieces_tokens = self.count_tokens(pieces)
+            else:
+                pieces = [segment]
+                pieces_tokens = [tokens]
+            
+            for piece, piece_tokens in zip(pieces, pieces_tokens):
+                if current and current_tokens + piece_tokens > self.max_tokens:
+                    chunks.append("".join(current))
+                    current = []
+                    current_tokens = 0
+                current.append(piece)
+                current_tokens += piece_tokens
+        
+        if current:
+            chunks.append("".join(current))
+        
+        return chunks
@@ -3,6 +3,7 @@
 import click
 from analyzer import PatternAnalyzer
 from tree_builder import DirectoryTreeBuilder
+from config import SUMMARY_BATCH_SIZE, SUMMARY_CACHE_MAX_AGE_DAYS, SUMMARY_CACHE_MAX_MB, MODEL_SERVER_SOCKET, INDEX_WORKERS, PIPELINE_CONCURRENCY, DIRECTORY_ROLLUP
 
 
 def print_section(title):
@@ -11,6 +12,31 @@ def print_section(title):
     print(f"{'='*80}\n")
 
 
+def model_options(command):
+    command = click.option('--threads', type=int, default=None, help='torch CPU thread count (overrides LLM_CPU_THREADS)')(command)
+    command = click.option('--quantize', type=click.Choice(['none', 'int8']), default=None, help='CPU dynamic quantization (overrides LLM_CPU_QUANTIZE)')(command)
+    command = click.option('--dtype', type=click.Choice(['float32', 'bfloat16']), default=None, help='CPU weight dtype (overrides LLM_CPU_DTYPE)')(command)
+    command = click.option('--device', type=click.Choice(['auto', 'cuda', 'cpu']), default=None, help='Inference device (overrides LLM_DEVICE)')(command)
+    return command
+
+
+def parse_budget(ctx, param, value):
+    from priority import parse_duration
+    
+    if value is None:
+        return None
+    try:
+        return parse_duration(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+
+def repo_options(command):
+    command = click.option('--sparse', is_flag=True, help='Blob-filtered sparse checkout of source and documentation files only')(command)
+    command = click.option('--no-repo-cache', is_flag=True, help='Fresh shallow clone instead of the cached local mirror')(command)
+    return command
+
+
 @click.group()
 def cli():
     """Design Pattern Detection Tool - Analyzes codebases to identify design patterns."""
@@ -19,8 +45,9 @@ def cli():
 
 @cli.command()
 @click.option('--model', help='Model name (overrides LLM_MODEL env var)')
-def load_model(model):
-    """Load the LLM model into memory (GPU/CPU)."""
+@model_options
+def load_model(model, device, dtype, quantize, threads):
+    """Load the LLM model into memory (GPU/CPU) and report its throughput."""
     
     print_section("Loading Language Model")
     
@@ -35,7 +62,7 @@ def load_model(model):
     click.echo(f"Model: {MODEL_NAME}")
     
     llm_manager = LLMManager()
-    llm_manager.load_model()
+    llm_manager.load_model(device=device, dtype=dtype, quantize=quantize, threads=threads)
     
     click.echo("\nModel loaded successfully!")
     click.echo("\nNext steps:")
@@ -46,12 +73,13 @@ def load_model(model):
 @cli.command()
 @click.argument('repository_url')
 @click.option('--target-dir', default='./target_repo', help='Directory to clone repository into')
-def clone(repository_url, target_dir):
+@repo_options
+def clone(repository_url, target_dir, no_repo_cache, sparse):
     """Clone repository and generate directory tree."""
     
     print_section("PHASE 0: Clone and Map Repository")
     
-    analyzer = PatternAnalyzer(target_dir)
+    analyzer = PatternAnalyzer(target_dir, use_repo_cache=not no_repo_cache, sparse=sparse)
     
     repo_path = analyzer.phase_0_clone_and_map(repository_url)
     click.echo(f"Repository cloned to: {repo_path}")
@@ -69,16 +97,32 @@ def clone(repository_url, target_dir):
 
 @cli.command()
 @click.option('--target-dir', default='./target_repo', help='Directory containing cloned repository')
-def index(target_dir):
+@click.option('--batch-size', default=SUMMARY_BATCH_SIZE, show_default=True, help='Number of files summarized per forward pass')
+@click.option('--no-cache', is_flag=True, help='Ignore the persistent summary cache and re-summarize every file')
+@click.option('--resume', is_flag=True, help='Skip files already stored in summaries.db by a previous run')
+@click.option('--no-prefilter', is_flag=True, help='Send trivial and generated files to the model instead of using template summaries')
+@click.option('--workers', default=INDEX_WORKERS, show_default=True, help='Indexer processes, each loading its own model (or API connection)')
+@click.option('--no-priority', is_flag=True, help='Summarize in directory-walk order instead of most imported/central files first')
+@click.option('--budget', default=None, callback=parse_budget, help='Wall-clock limit such as 20m or 1h30m; stops cleanly, --resume continues later')
+@click.option('--no-rollup', is_flag=True, help='Skip rolling file summaries up into directory and repository summaries')
+@click.option('--metrics-dir', default=None, help='Where run_report.json and metrics.prom are written (default: next to the target dir)')
+@model_options
+def index(target_dir, batch_size, no_cache, resume, no_prefilter, workers, no_priority, budget, no_rollup, metrics_dir, device, dtype, quantize, threads):
     """Generate file summaries (loads model automatically if needed)."""
     
+    import time
+    
+    # The budget covers the whole command, model loading included
+    deadline = time.time() + budget if budget is not None else None
+    
     print_section("PHASE 2: Generate File Summaries (Indexer)")
     
     analyzer = PatternAnalyzer(target_dir)
     
     click.echo("Loading repository information...")
-    tree_builder = DirectoryTreeBuilder(analyzer.repo_manager.target_dir)
-    analyzer.directory_tree, analyzer.source_files = tree_builder.build()
+    with analyzer.metrics.phase("tree_build"):
+        tree_builder = DirectoryTreeBuilder(analyzer.repo_manager.target_dir)
+        analyzer.directory_tree, analyzer.source_files = tree_builder.build()
     analyzer.repo_path = analyzer.repo_manager.target_dir
     
     if not analyzer.source_files:
@@ -87,29 +131,184 @@ def index(target_dir):
     
     click.echo(f"Found {len(analyzer.source_files)} source files")
     
-    click.echo("\nLoading model (if not already loaded)...")
-    analyzer.phase_1_load_model()
+    load_options = {"device": device, "dtype": dtype, "quantize": quantize, "threads": threads}
+    
+    if workers <= 1:
+        click.echo("\nLoading model (if not already loaded)...")
+        analyzer.phase_1_load_model(**load_options)
+    
+    summaries_path = analyzer.phase_2_generate_summaries(
+        batch_size=batch_size,
+        use_cache=not no_cache,
+        resume=resume,
+        prefilter=not no_prefilter,
+        workers=workers,
+        load_options=load_options,
+        prioritize=not no_priority,
+        deadline=deadline
+    )
+    
+    if analyzer.indexer.expired:
+        click.echo(f"\nTime budget used up with {analyzer.indexer.store.count()} of {len(analyzer.source_files)} files summarized. "
+                   f"Partial summaries saved to: {summaries_path} (run again with --resume to continue)")
+    else:
+        click.echo(f"\nIndexing complete! Summaries saved to: {summaries_path}")
+    click.echo(f"Throughput: {analyzer.indexer.files_per_second:.2f} files/sec")
+    click.echo(f"LLM summaries avoided: {analyzer.indexer.llm_calls_avoided()}")
+    
+    if DIRECTORY_ROLLUP and not no_rollup:
+        analyzer.summarize_directories(use_cache=not no_cache, load_options=load_options, deadline=deadline)
+    
+    report_path, prometheus_path, trace_path = analyzer.export_metrics(metrics_dir)
+    click.echo(f"Run report: {report_path} (Prometheus: {prometheus_path}, timeline: {trace_path})")
+
+
+@cli.command()
+@click.option('--target-dir', default='./target_repo', help='Directory containing cloned repository')
+@click.option('--no-cache', is_flag=True, help='Ignore the persistent summary cache and re-summarize every changed directory')
+@click.option('--metrics-dir', default=None, help='Where run_report.json and metrics.prom are written (default: next to the target dir)')
+@model_options
+def rollup(target_dir, no_cache, metrics_dir, device, dtype, quantize, threads):
+    """Summarize directories and the repository from summaries.db, redoing only directories whose contents changed."""
     
-    summaries_path = analyzer.phase_2_generate_summaries()
+    print_section("Directory Summaries")
     
-    click.echo(f"\nIndexing complete! Summaries saved to: {summaries_path}")
+    analyzer = PatternAnalyzer(target_dir)
+    analyzer.repo_path = analyzer.repo_manager.target_dir
+    
+    repository_summary = analyzer.summarize_directories(
+        use_cache=not no_cache,
+        load_options={"device": device, "dtype": dtype, "quantize": quantize, "threads": threads}
+    )
+    
+    if repository_summary is None:
+        click.echo("Error: No stored file summaries. Did you run 'analyze index' first?")
+    else:
+        click.echo(f"\nRepository summary:\n  {repository_summary}")
+    
+    report_path, prometheus_path, trace_path = analyzer.export_metrics(metrics_dir)
+    click.echo(f"Run report: {report_path} (Prometheus: {prometheus_path}, timeline: {trace_path})")
+
+
+@cli.command()
+@click.option('--target-dir', default='./target_repo', help='Directory containing cloned repository')
+def build_index(target_dir):
+    """Build the vector index over summaries.db and source code chunks."""
+    
+    print_section("Build Vector Index")
+    
+    import time
+    
+    analyzer = PatternAnalyzer(target_dir)
+    analyzer.repo_path = analyzer.repo_manager.target_dir
+    
+    start = time.perf_counter()
+    # Source files without a stored summary (a --budget run stopped early) still get their code indexed
+    analyzer.directory_tree, analyzer.source_files = DirectoryTreeBuilder(analyzer.repo_path).build()
+    vector_index = analyzer.build_vector_index()
+    elapsed = time.perf_counter() - start
+    
+    click.echo(f"Indexed {vector_index.count} chunks into {vector_index.index_dir} in {elapsed:.2f}s")
+    if vector_index.centroids is not None:
+        click.echo(f"Cluster index: {len(vector_index.centroids)} lists")
+    
+    vector_index.close()
+
+
+@cli.command()
+@click.argument('query')
+@click.option('--target-dir', default='./target_repo', help='Directory containing cloned repository')
+@click.option('-k', 'k', default=10, show_default=True, help='Number of results')
+def search(query, target_dir, k):
+    """Search the vector index built by 'analyze build-index'."""
+    
+    import time
+    
+    analyzer = PatternAnalyzer(target_dir)
+    vector_index = analyzer.load_vector_index()
+    
+    start = time.perf_counter()
+    results = vector_index.search(query, k=k)
+    elapsed = time.perf_counter() - start
+    
+    for score, meta in results:
+        location = meta["path"]
+        if meta["kind"] == "code":
+            location += f":{meta['start_line']}-{meta['end_line']}"
+        click.echo(f"{score:.3f}  [{meta['kind']}] {location}")
+    
+    click.echo(f"\n{len(results)} results in {elapsed * 1000:.1f} ms")
+    vector_index.close()
+
+
+@cli.command()
+@click.option('--target-dir', default='./target_repo', help='Directory containing cloned repository')
+@click.option('--prefix', default='', help='Only files whose repository path starts with this prefix')
+@click.option('--output', default=None, help='JSON file to write (default: summaries.json next to the target dir)')
+def export_summaries(target_dir, prefix, output):
+    """Export summaries.db to the summaries.json format."""
+    
+    analyzer = PatternAnalyzer(target_dir)
+    output_path = analyzer.export_summaries(output, prefix=prefix)
+    click.echo(f"Summaries exported to: {output_path}")
+
+
+@cli.command()
+@click.argument('prefix', default='')
+@click.option('--target-dir', default='./target_repo', help='Directory containing cloned repository')
+@click.option('--directories', is_flag=True, help='Print directory summaries instead of file summaries')
+def summaries(prefix, target_dir, directories):
+    """Print stored summaries of files (or directories) under a path prefix."""
+    
+    from pathlib import Path
+    from summary_store import SummaryStore
+    from config import SUMMARIES_STORE_FILE
+    
+    store = SummaryStore(Path(target_dir).parent / SUMMARIES_STORE_FILE)
+    count = 0
+    
+    if directories:
+        for record in store.read_directories(prefix):
+            click.echo(f"{record['path']}/  ({record['model']})\n  {record['summary']}\n")
+            count += 1
+        click.echo(f"{count} stored directory summaries")
+        return
+    
+    for record in store.read(prefix):
+        seconds = f", {record['seconds']:.2f}s" if record["seconds"] else ""
+        click.echo(f"{record['path']}  ({record['model']}{seconds})\n  {record['summary']}\n")
+        count += 1
+    
+    click.echo(f"{count} of {store.count()} stored summaries")
 
 
 @cli.command()
 @click.argument('repository_url')
 @click.option('--keep-repo', is_flag=True, help='Keep cloned repository after analysis')
-@click.option('--keep-summaries', is_flag=True, help='Keep generated summaries JSON')
+@click.option('--keep-summaries', is_flag=True, help='Keep the generated summaries store (summaries.db)')
 @click.option('--target-dir', default='./target_repo', help='Directory to clone repository into')
-def analyze(repository_url, keep_repo, keep_summaries, target_dir):
-    """Full analysis pipeline: clone and generate summaries (requires model loaded)."""
+@click.option('--metrics-dir', default=None, help='Where run_report.json, metrics.prom and trace.json are written (default: next to the target dir)')
+@click.option('--sequential', is_flag=True, help='Run one phase at a time instead of independent phases concurrently')
+@repo_options
+@model_options
+def analyze(repository_url, keep_repo, keep_summaries, target_dir, metrics_dir, sequential, no_repo_cache, sparse, device, dtype, quantize, threads):
+    """Full analysis pipeline: clone, load the model, summarize and index, with independent phases running concurrently."""
     
-    analyzer = PatternAnalyzer(target_dir)
+    analyzer = PatternAnalyzer(target_dir, use_repo_cache=not no_repo_cache, sparse=sparse)
     
     try:
-        print_section("PHASE 0: Clone and Map Repository")
+        print_section("Analysis Pipeline")
+        click.echo("Clone and model load run together; documentation analysis and the vector index")
+        click.echo("run alongside summary generation, the vector index embedding summaries as they are stored.\n")
         
-        repo_path = analyzer.phase_0_clone_and_map(repository_url)
-        click.echo(f"Repository cloned to: {repo_path}")
+        analyzer.run(
+            repository_url,
+            load_options={"device": device, "dtype": dtype, "quantize": quantize, "threads": threads},
+            concurrency=1 if sequential else PIPELINE_CONCURRENCY
+        )
+        
+        print_section("PHASE 0: Clone and Map Repository")
+        click.echo(f"Repository cloned to: {analyzer.repo_path}")
         
         click.echo(f"\nDirectory structure ({len(analyzer.source_files)} source files found):\n")
         click.echo(analyzer.directory_tree)
@@ -119,26 +318,126 @@ def analyze(repository_url, keep_repo, keep_summaries, target_dir):
             for doc_path in analyzer.doc_files.keys():
                 click.echo(f"  - {doc_path}")
         
+        symbol_index = analyzer.symbol_index
+        click.echo(f"\nSymbol index: {len(symbol_index.classes)} classes, {len(symbol_index.functions)} functions "
+                   f"in {len(symbol_index.files)} Python files")
+        
         print_section("PHASE 2: Generate File Summaries (Indexer)")
-        summaries_path = analyzer.phase_2_generate_summaries()
-        click.echo(f"\nIndexing complete! Summaries saved to: {summaries_path}")
+        click.echo(f"Summaries saved to: {analyzer.summaries_path}")
+        if analyzer.repository_summary:
+            click.echo(f"\nRepository summary:\n  {analyzer.repository_summary}")
         
         print_section("PHASE 3: Documentation Analysis (Not Implemented)")
         click.echo("Agent 1 will analyze documentation for architectural patterns.")
         
-        print_section("PHASE 4: Code Investigation (Not Implemented)")
-        click.echo("Agent 2 will investigate code using RAG.")
+        print_section("PHASE 4: Code Investigation")
+        click.echo(f"Vector index built over {analyzer.vector_index.count} chunks at: {analyzer.vector_index.index_dir}")
+        click.echo("Agent 2 will investigate code using RAG over this index (not implemented).")
         
         print_section("PHASE 5: Evidence Collection (Not Implemented)")
         click.echo("Agent 3 will collect code evidence for detected patterns.")
-        
+    
     finally:
+        report_path, prometheus_path, trace_path = analyzer.export_metrics(metrics_dir)
+        click.echo(f"\nRun report: {report_path} (Prometheus: {prometheus_path}, timeline: {trace_path})")
+        
         analyzer.cleanup(keep_summaries=keep_summaries)
         
         if not keep_repo:
             click.echo("\nCleanup completed.")
         else:
-            click.echo(f"\nRepository kept at: {repo_path}")
+            click.echo(f"\nRepository kept at: {analyzer.repo_path}")
+
+
+@cli.command()
+@click.option('--socket', 'socket_path', default=MODEL_SERVER_SOCKET, show_default=True, help='Unix socket the server listens on')
+@model_options
+def serve(socket_path, device, dtype, quantize, threads):
+    """Keep the model loaded in a local server that other commands reuse."""
+    
+    print_section("Model Server")
+    
+    from llm_manager import LLMManager
+    from model_server import ModelServer
+    from config import MODEL_NAME
+    
+    llm_manager = LLMManager()
+    llm_manager.load_model(device=device, dtype=dtype, quantize=quantize, threads=threads, use_server=False)
+    
+    server = ModelServer(llm_manager, socket_path, MODEL_NAME)
+    click.echo(f"\nServing {MODEL_NAME} on {socket_path} (Ctrl+C to stop)")
+    
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        click.echo("\nModel server stopped.")
+
+
+@cli.command()
+@click.option('--socket', 'socket_path', default=MODEL_SERVER_SOCKET, show_default=True, help='Unix socket of the running server')
+def stop_server(socket_path):
+    """Stop a running model server."""
+    
+    from model_server import ModelClient
+    
+    client = ModelClient.connect(socket_path)
+    if client is None:
+        click.echo(f"No model server listening on {socket_path}")
+        return
+    
+    client.call("shutdown")
+    client.close()
+    click.echo("Model server stopped.")
+
+
+@cli.command()
+@click.option('--max-age-days', type=float, default=SUMMARY_CACHE_MAX_AGE_DAYS, show_default=True, help='Remove entries not used for this many days')
+@click.option('--max-size-mb', type=float, default=SUMMARY_CACHE_MAX_MB, show_default=True, help='Keep at most this many MB of the most recently used entries')
+def prune_cache(max_age_days, max_size_mb):
+    """Evict old or excess entries from the persistent summary cache."""
+    
+    from summary_cache import SummaryCache
+    
+    cache = SummaryCache()
+    removed = cache.evict(max_age_days=max_age_days, max_mb=max_size_mb)
+    stats = cache.stats()
+    
+    click.echo(f"Removed {removed} cache entries from {cache.cache_dir}")
+    click.echo(f"Remaining: {stats['entries']} entries ({stats['size_bytes'] / (1024 * 1024):.1f} MB)")
+
+
+@cli.command()
+@click.argument('directory')
+@click.option('--subclasses-of', 'base_class', help='List every direct and indirect subclass of this class')
+@click.option('--workers', type=int, default=None, help='Parser processes (overrides SYMBOL_INDEX_WORKERS)')
+def symbols(directory, base_class, workers):
+    """Build the Python class/function symbol index for a local repository."""
+    
+    import time
+    from symbol_index import SymbolIndex
+    from config import SYMBOL_INDEX_WORKERS
+    
+    tree_builder = DirectoryTreeBuilder(directory)
+    _, source_files = tree_builder.build()
+    
+    start = time.perf_counter()
+    symbol_index = SymbolIndex.build(directory, source_files, workers=SYMBOL_INDEX_WORKERS if workers is None else workers)
+    elapsed = time.perf_counter() - start
+    
+    click.echo(f"Indexed {len(symbol_index.files)} Python files in {elapsed:.2f}s ({symbol_index.cache_hits} from cache)")
+    click.echo(f"Classes: {len(symbol_index.classes)}, functions: {len(symbol_index.functions)}")
+    
+    if base_class:
+        click.echo(f"\nSubclasses of {base_class}:")
+        for path, cls in symbol_index.descendants(base_class):
+            click.echo(f"  {cls['name']} ({', '.join(cls['bases'])})  {path}:{cls['line']}")
+    else:
+        click.echo("\nAbstract classes:")
+        for path, cls in symbol_index.abstract_classes():
+            click.echo(f"  {cls['name']}  {path}:{cls['line']}")
 
 
 @cli.command()
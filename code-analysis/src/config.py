@@ -16,10 +16,96 @@ IGNORE_DIRS = {
     'target'
 }
 
+DOC_PATTERNS = [
+    pattern.strip()
+    for pattern in os.getenv("DOC_PATTERNS", "README.md,README.rst,ARCHITECTURE.md,DESIGN.md").split(",")
+    if pattern.strip()
+]
+
+REPO_CACHE_DIR = os.getenv(
+    "REPO_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "code-analysis", "repos")
+)
+
 MODEL_NAME = os.getenv("LLM_MODEL", "deepseek-ai/deepseek-coder-6.7b-instruct")
+DRAFT_MODEL_NAME = os.getenv("LLM_DRAFT_MODEL", "")  # e.g. deepseek-ai/deepseek-coder-1.3b-instruct; empty disables
+DRAFT_NUM_TOKENS = int(os.getenv("LLM_DRAFT_TOKENS", "5"))  # Tokens proposed by the draft model per step
+LLM_DEVICE = os.getenv("LLM_DEVICE", "auto")  # auto, cuda or cpu
+CPU_DTYPE = os.getenv("LLM_CPU_DTYPE", "float32")  # float32 or bfloat16
+CPU_QUANTIZE = os.getenv("LLM_CPU_QUANTIZE", "none")  # none or int8 (dynamic)
+CPU_THREADS = int(os.getenv("LLM_CPU_THREADS", "0"))  # 0 keeps the torch default
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "local")  # local (in-process transformers) or openai (HTTP completions API)
+LLM_API_BASE = os.getenv("LLM_API_BASE", "http://localhost:8000/v1")
+LLM_API_KEY = os.getenv("LLM_API_KEY", "")
+LLM_API_MODEL = os.getenv("LLM_API_MODEL", "")  # Model name sent to the API; empty uses LLM_MODEL
+LLM_API_CONCURRENCY = int(os.getenv("LLM_API_CONCURRENCY", "8"))  # Requests in flight (and pooled connections)
+LLM_API_RETRIES = int(os.getenv("LLM_API_RETRIES", "3"))  # Retries on connection errors, 429 and 5xx
+LLM_API_TIMEOUT = float(os.getenv("LLM_API_TIMEOUT", "120"))
+
+MODEL_SERVER_SOCKET = os.getenv(
+    "LLM_SERVER_SOCKET",
+    os.path.join(os.path.expanduser("~"), ".cache", "code-analysis", "model.sock")
+)
+USE_MODEL_SERVER = os.getenv("LLM_USE_SERVER", "1") != "0"
+PREFIX_CACHE = os.getenv("LLM_PREFIX_CACHE", "1") != "0"  # Reuse the KV cache of the fixed prompt prefix
 MAX_CONTEXT_TOKENS = 16000
-MAX_FILE_SIZE_BYTES = 100000
+MAX_FILE_SIZE_BYTES = 2000000  # Larger files are usually generated or minified; smaller ones are chunked
 SUMMARIES_FILE = "summaries.json"
+SUMMARIES_STORE_FILE = "summaries.db"  # SQLite (WAL) store; summaries.json is only written on export
+SUMMARY_MAX_NEW_TOKENS = 150
+SUMMARY_MIN_NEW_TOKENS = 48  # Floor of the adaptive per-file budget
+SUMMARY_ADAPTIVE_BUDGET = os.getenv("SUMMARY_ADAPTIVE_BUDGET", "1") != "0"  # Scale max_new_tokens with file size and definitions
+SUMMARY_STOP_CRITERIA = os.getenv("SUMMARY_STOP_CRITERIA", "1") != "0"  # Stop at the requested sentence count or a stop sequence
+SUMMARY_STOP_SEQUENCES = ["\n\n", "\nCode:"]
+SUMMARY_SENTENCES = 3  # Must match the sentence counts asked for in the prompt templates below
+CHUNK_SENTENCES = 2
+REPETITION_PENALTY = 1.2
+SUMMARY_BATCH_SIZE = int(os.getenv("SUMMARY_BATCH_SIZE", "8"))
+SUMMARY_BUCKET_BATCHES = 4  # Batches buffered and sorted by token length before generation
+SUMMARY_READER_THREADS = int(os.getenv("SUMMARY_READER_THREADS", "4"))
+SUMMARY_PREFETCH_FILES = int(os.getenv("SUMMARY_PREFETCH_FILES", "64"))
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "3000"))
+SUMMARY_REDUCE_FANOUT = 16  # Chunk summaries combined per reduce prompt
+DIRECTORY_FANOUT = 24  # Children per directory prompt; wider directories are summarized in parts first
+DIRECTORY_ROLLUP = os.getenv("DIRECTORY_ROLLUP", "1") != "0"  # Roll file summaries up into directory and repository summaries
+INDEX_WORKERS = int(os.getenv("INDEX_WORKERS", "1"))  # Indexer processes, each with its own model or API connection
+SHARD_TASK_FILES = 16  # Files handed to a worker at a time; small tasks let idle workers take over the tail
+SUMMARY_PRIORITY_ORDER = os.getenv("SUMMARY_PRIORITY_ORDER", "1") != "0"  # Summarize the most imported/central files first
+PRIORITY_WEIGHTS = {"importers": 1.0, "centrality": 1.0, "package": 0.5, "size": 0.25}  # Each applied to log1p of the signal
+PRIORITY_PAGERANK_ITERATIONS = 20
+SUMMARY_PREFILTER = os.getenv("SUMMARY_PREFILTER", "1") != "0"  # Template summaries for trivial/generated files
+VENDORED_DIRS = {'vendor', 'vendored', 'third_party', 'thirdparty', '_vendor'}  # Not 'external': often first-party integrations
+TRIVIAL_MAX_LINES = 5  # __init__.py files with at most this many code lines get a template summary
+MINIFIED_MIN_LINE_LENGTH = 300  # Average characters per line above which a file is treated as minified
+
+VECTOR_INDEX_DIR = "vector_index"
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "hashing")  # hashing or a Hugging Face encoder name
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "512"))  # Only used by the hashing embedder
+VECTOR_INDEX_IVF_THRESHOLD = 100000  # Rows above which a coarse cluster index is built
+VECTOR_INDEX_CHUNK_WORDS = 400  # Code is split into chunks of about this many words before embedding
+VECTOR_INDEX_N_PROBE = int(os.getenv("VECTOR_INDEX_N_PROBE", "8"))
+
+RUN_REPORT_FILE = "run_report.json"  # Per-phase wall time, tokens, queue waits and memory
+PROMETHEUS_FILE = "metrics.prom"  # Same figures in Prometheus text format (node_exporter textfile collector)
+TRACE_FILE = "trace.json"  # Phase timeline per thread in Chrome trace format (chrome://tracing, ui.perfetto.dev)
+PIPELINE_CONCURRENCY = int(os.getenv("PIPELINE_CONCURRENCY", "0"))  # Phases run at once by PatternAnalyzer.run; 0 = no limit
+SUMMARY_STREAM_POLL_SECONDS = 0.5  # How often consumers look for newly stored summaries while indexing runs
+
+SYMBOLS_FILE = "symbols.json"
+SYMBOL_CACHE_DIR = os.getenv(
+    "SYMBOL_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "code-analysis", "symbols")
+)
+SYMBOL_INDEX_WORKERS = int(os.getenv("SYMBOL_INDEX_WORKERS", "0"))  # 0 uses one process per CPU
+SYMBOL_INDEX_VERSION = 1  # Bump when the extracted fields change to invalidate cached entries
+
+SUMMARY_CACHE_DIR = os.getenv(
+    "SUMMARY_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "code-analysis", "summaries")
+)
+SUMMARY_CACHE_MAX_AGE_DAYS = float(os.getenv("SUMMARY_CACHE_MAX_AGE_DAYS", "30"))
+SUMMARY_CACHE_MAX_MB = float(os.getenv("SUMMARY_CACHE_MAX_MB", "512"))
 
 SUMMARY_PROMPT_TEMPLATE = """You are a code analysis assistant. Summarize the following code file in 3 sentences.
 Focus on: main classes/functions, their responsibilities, and key inheritance/dependencies.
@@ -29,3 +115,27 @@ Code:
 
 Summary:"""
 
+CHUNK_PROMPT_TEMPLATE = """You are a code analysis assistant. The following code is part {part} of {total} of the file {path}.
+Summarize this part in 2 sentences, focusing on the classes/functions it defines and their responsibilities.
+
+Code:
+{code}
+
+Summary:"""
+
+DIRECTORY_PROMPT_TEMPLATE = """You are a code analysis assistant. Below are summaries of the files and subdirectories in the directory {path} of a repository.
+Summarize the directory as a whole in 3 sentences: its responsibility in the project, its main components and how they relate.
+
+Contents:
+{children}
+
+Summary:"""
+
+REDUCE_PROMPT_TEMPLATE = """You are a code analysis assistant. Below are summaries of consecutive parts of the file {path}.
+Combine them into a single summary of the whole file in 3 sentences.
+Focus on: main classes/functions, their responsibilities, and key inheritance/dependencies.
+
+Part summaries:
+{summaries}
+
+Summary:"""
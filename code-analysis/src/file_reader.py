@@ -1,4 +1,27 @@
+from collections.abc import Mapping
 from pathlib import Path
+from tree_builder import DirectoryTreeBuilder
+
+
+class LazyDocuments(Mapping):
+    def __init__(self, root_path, doc_paths):
+        self.root_path = Path(root_path)
+        self._paths = {str(Path(path).relative_to(self.root_path)): Path(path) for path in doc_paths}
+        self._contents = {}
+    
+    def __getitem__(self, relative_path):
+        if relative_path not in self._contents:
+            self._contents[relative_path] = FileReader.read_source_file(self._paths[relative_path])
+        return self._contents[relative_path]
+    
+    def __iter__(self):
+        return iter(self._paths)
+    
+    def __len__(self):
+        return len(self._paths)
+    
+    def path(self, relative_path):
+        return self._paths[relative_path]
 
 
 class FileReader:
@@ -12,17 +35,7 @@ class FileReader:
     
     @staticmethod
     def find_documentation_files(root_path):
-        root = Path(root_path)
-        doc_files = {}
+        tree_builder = DirectoryTreeBuilder(root_path)
+        tree_builder.build()
         
-        for pattern in ['README.md', 'README.rst', 'ARCHITECTURE.md', 'DESIGN.md']:
-            matches = list(root.rglob(pattern))
-            for match in matches:
-                try:
-                    with open(match, 'r', encoding='utf-8') as f:
-                        doc_files[str(match.relative_to(root))] = f.read()
-                except (UnicodeDecodeError, PermissionError):
-                    continue
-        
-        return doc_files
-
+        return LazyDocuments(root_path, tree_builder.doc_files)
@@ -0,0 +1,103 @@
+import re
+
+
+def _translate(pattern):
+    parts = []
+    i = 0
+    
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            parts.append("/.*")
+            i += 3
+        elif pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            parts.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            parts.append("[^/]")
+            i += 1
+        elif pattern[i] == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                parts.append(re.escape(pattern[i]))
+                i += 1
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                parts.append(f"[{body}]")
+                i = end + 1
+        elif pattern[i] == "\\" and i + 1 < len(pattern):
+            parts.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    
+    return "".join(parts)
+
+
+class GitIgnoreRule:
+    def __init__(self, base, pattern, negate=False):
+        self.base = base
+        self.negate = negate
+        
+        self.dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        
+        anchored = "/" in pattern
+        pattern = pattern.lstrip("/")
+        
+        body = _translate(pattern)
+        self.regex = re.compile(f"^{body}$" if anchored else f"^(?:.*/)?{body}$")
+    
+    def matches(self, relative_path, is_dir):
+        if self.dir_only and not is_dir:
+            return False
+        
+        if self.base:
+            if not relative_path.startswith(self.base + "/"):
+                return False
+            relative_path = relative_path[len(self.base) + 1:]
+        
+        return self.regex.match(relative_path) is not None
+
+
+class GitIgnore:
+    def __init__(self, rules=()):
+        self.rules = tuple(rules)
+    
+    @staticmethod
+    def parse(text, base=""):
+        rules = []
+        for line in text.splitlines():
+            line = line.rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate or line.startswith("\\#") or line.startswith("\\!"):
+                line = line[1:]
+            if line:
+                rules.append(GitIgnoreRule(base, line, negate))
+        return rules
+    
+    def extend(self, directory, base):
+        try:
+            with open(directory / ".gitignore", 'r', encoding='utf-8') as f:
+                rules = self.parse(f.read(), base)
+        except (OSError, UnicodeDecodeError):
+            return self
+        
+        return GitIgnore(self.rules + tuple(rules)) if rules else self
+    
+    def is_ignored(self, relative_path, is_dir):
+        ignored = False
+        for rule in self.rules:
+            if rule.matches(relative_path, is_dir):
+                ignored = not rule.negate
+        return ignored
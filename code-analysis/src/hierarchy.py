@@ -0,0 +1,203 @@
+import time
+from collections import defaultdict
+from pathlib import PurePosixPath
+from summary_cache import content_hash
+from stopping import decoding_report
+from config import (
+    DIRECTORY_PROMPT_TEMPLATE,
+    DIRECTORY_FANOUT,
+    SUMMARY_BATCH_SIZE,
+    SUMMARY_MAX_NEW_TOKENS,
+    SUMMARY_STOP_CRITERIA,
+    SUMMARY_STOP_SEQUENCES,
+    SUMMARY_SENTENCES
+)
+
+ROOT = "."
+
+
+def _parent(path):
+    return str(PurePosixPath(path).parent)
+
+
+def _depth(path):
+    return 0 if path == ROOT else len(PurePosixPath(path).parts)
+
+
+class DirectorySummarizer:
+    def __init__(self, store, llm_manager, cache=None, batch_size=SUMMARY_BATCH_SIZE, fanout=DIRECTORY_FANOUT, load_options=None):
+        self.store = store
+        self.llm_manager = llm_manager
+        self.load_options = load_options or {}
+        self.cache = cache
+        self.batch_size = max(1, batch_size, getattr(llm_manager, "concurrency", 1))
+        self.fanout = max(2, fanout)
+        # Model and prompt are folded into every subtree hash, so a stored row is only reused for the same setup
+        self.salt = content_hash(f"{store.model_name}:{DIRECTORY_PROMPT_TEMPLATE}")
+        self.hashes = {}
+        self.summaries = {}
+        # Directories whose summary is an error or was built without a failed child; never stored, so retried next run
+        self.failed = set()
+        self.regenerated = 0
+        self.reused = {"store": 0, "cache": 0}
+        self.llm_prompts = 0
+        self.decoding = {"baseline": 0, "budget": 0, "steps": 0}
+    
+    def build_tree(self):
+        files = defaultdict(dict)
+        directories = defaultdict(set)
+        directories[ROOT]
+        
+        for record in self.store.read():
+            summary = record["summary"]
+            # Error placeholders say nothing about the code and would change on every retry
+            if not summary or summary.startswith("["):
+                continue
+            
+            path = record["path"]
+            parent = _parent(path)
+            files[parent][PurePosixPath(path).name] = (content_hash(f"{record['code_hash']}:{summary}"), summary)
+            directories[parent]
+            while parent != ROOT:
+                directories[_parent(parent)].add(parent)
+                parent = _parent(parent)
+        
+        return files, directories
+    
+    def _subtree_hash(self, path, files, directories):
+        entries = [f"f {name} {leaf}" for name, (leaf, _) in files.get(path, {}).items()]
+        entries += [f"d {PurePosixPath(child).name} {self.hashes[child]}" for child in directories.get(path, ())]
+        return content_hash(self.salt + "\n" + "\n".join(sorted(entries)))
+    
+    def _children(self, path, files, directories):
+        lines = [f"- {name}: {summary}" for name, (_, summary) in sorted(files.get(path, {}).items())]
+        lines += [
+            f"- {PurePosixPath(child).name}/: {self.summaries[child]}"
+            for child in sorted(directories.get(path, ()))
+            if not self.summaries[child].startswith("[")
+        ]
+        return lines
+    
+    def _generate(self, prompts, show_progress):
+        # Loaded on the first prompt: an unchanged tree, or a parent process of sharded workers, never pays for it
+        if prompts and not self.llm_manager.is_loaded():
+            self.llm_manager.load_model(**self.load_options)
+        
+        summaries = []
+        for i in range(0, len(prompts), self.batch_size):
+            batch = prompts[i:i + self.batch_size]
+            steps = self.llm_manager.decoding["steps"]
+            try:
+                results = self.llm_manager.generate_batch(
+                    batch,
+                    max_new_tokens=SUMMARY_MAX_NEW_TOKENS,
+                    max_sentences=SUMMARY_SENTENCES if SUMMARY_STOP_CRITERIA else None,
+                    stop_sequences=SUMMARY_STOP_SEQUENCES if SUMMARY_STOP_CRITERIA else None
+                )
+            except Exception as e:
+                results = [f"[Error: {str(e)}]"] * len(batch)
+            self.llm_prompts += len(batch)
+            self.decoding["baseline"] += len(batch) * SUMMARY_MAX_NEW_TOKENS
+            self.decoding["budget"] += len(batch) * SUMMARY_MAX_NEW_TOKENS
+            self.decoding["steps"] += self.llm_manager.decoding["steps"] - steps
+            summaries.extend(results)
+            
+            if show_progress:
+                print(f"\r  {self.llm_prompts} directory prompts", end="", flush=True)
+        return summaries
+    
+    def _rollup(self, pending, show_progress):
+        # pending: directory path -> lines describing its children
+        while True:
+            # Directories wider than the fanout are summarized in parts, all of this depth's parts in one pass
+            wide = {path: lines for path, lines in pending.items() if len(lines) > self.fanout}
+            if not wide:
+                break
+            
+            prompts, owners = [], []
+            for path, lines in wide.items():
+                groups = [lines[i:i + self.fanout] for i in range(0, len(lines), self.fanout)]
+                for number, group in enumerate(groups, 1):
+                    prompts.append(DIRECTORY_PROMPT_TEMPLATE.format(path=f"{path} (part {number} of {len(groups)})", children="\n".join(group)))
+                    owners.append((path, number))
+                pending[path] = []
+            
+            for (path, number), summary in zip(owners, self._generate(prompts, show_progress)):
+                if summary.startswith("["):
+                    self.failed.add(path)
+                else:
+                    pending[path].append(f"- part {number}: {summary}")
+        
+        paths = list(pending)
+        prompts = [DIRECTORY_PROMPT_TEMPLATE.format(path=path if path != ROOT else "at the repository root", children="\n".join(pending[path])) for path in paths]
+        return dict(zip(paths, self._generate(prompts, show_progress)))
+    
+    def summarize(self, show_progress=True):
+        files, directories = self.build_tree()
+        if not files:
+            return None
+        
+        stored = {row["subtree_hash"]: row["summary"] for row in self.store.read_directories() if not row["summary"].startswith("[")}
+        
+        # Deepest directories first: a directory's hash and summary need those of its subdirectories
+        for depth in sorted({_depth(path) for path in directories}, reverse=True):
+            level = sorted(path for path in directories if _depth(path) == depth)
+            pending = {}
+            records = []
+            
+            for path in level:
+                self.hashes[path] = self._subtree_hash(path, files, directories)
+                summary = stored.get(self.hashes[path])
+                if summary is not None:
+                    self.reused["store"] += 1
+                elif self.cache is not None:
+                    summary = self.cache.get(self.hashes[path])
+                    if summary is not None:
+                        self.reused["cache"] += 1
+                
+                children = directories.get(path, ())
+                if summary is None and any(child in self.failed for child in children):
+                    self.failed.add(path)
+                
+                lines = self._children(path, files, directories) if summary is None else None
+                if summary is None and not files.get(path) and len(children) == 1 and lines:
+                    # A directory holding a single subdirectory (src/, a namespace package) says no more than it does
+                    summary = self.summaries[next(iter(children))]
+                elif lines == []:
+                    summary = "[Error: no summarized contents]"
+                    self.failed.add(path)
+                
+                if summary is None:
+                    pending[path] = lines
+                else:
+                    self.summaries[path] = summary
+                    records.append({"path": path, "subtree_hash": self.hashes[path], "summary": summary})
+            
+            if pending:
+                start = time.perf_counter()
+                generated = self._rollup(pending, show_progress)
+                seconds = (time.perf_counter() - start) / len(generated)
+                for path, summary in generated.items():
+                    self.summaries[path] = summary
+                    self.regenerated += 1
+                    if summary.startswith("["):
+                        self.failed.add(path)
+                    records.append({"path": path, "subtree_hash": self.hashes[path], "summary": summary, "seconds": seconds})
+                    if self.cache is not None and path not in self.failed:
+                        self.cache.put(self.hashes[path], summary)
+            
+            # Saved level by level, so an interrupted rollup keeps every directory it finished
+            self.store.append_directories([record for record in records if record["path"] not in self.failed])
+        
+        self.store.append_directories([], keep_paths=set(self.hashes))
+        
+        if show_progress:
+            if self.llm_prompts:
+                print()
+            print(f"Directory summaries: {len(self.hashes)} directories, {self.regenerated} regenerated with {self.llm_prompts} LLM prompts, "
+                  f"{self.reused['store'] + self.reused['cache']} unchanged ({self.reused['store']} stored, {self.reused['cache']} cached)"
+                  + (f", {len(self.failed)} failed (retried next run)" if self.failed else ""))
+            if self.llm_prompts:
+                print(decoding_report(self.decoding))
+        
+        return self.summaries.get(ROOT)
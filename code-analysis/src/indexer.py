@@ -1,65 +1,424 @@
 import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from queue import Queue
 from file_reader import FileReader
-from llm_manager import LLMManager
-from config import SUMMARY_PROMPT_TEMPLATE, MAX_FILE_SIZE_BYTES, SUMMARIES_FILE
+from summary_cache import content_hash
+from summary_store import SummaryStore
+from chunker import CodeChunker
+from prefilter import classify
+from stopping import summary_budget, decoding_report
+from config import (
+    SUMMARY_PROMPT_TEMPLATE,
+    CHUNK_PROMPT_TEMPLATE,
+    REDUCE_PROMPT_TEMPLATE,
+    MAX_FILE_SIZE_BYTES,
+    SUMMARIES_FILE,
+    SUMMARIES_STORE_FILE,
+    SUMMARY_BATCH_SIZE,
+    SUMMARY_BUCKET_BATCHES,
+    SUMMARY_MAX_NEW_TOKENS,
+    SUMMARY_ADAPTIVE_BUDGET,
+    SUMMARY_STOP_CRITERIA,
+    SUMMARY_STOP_SEQUENCES,
+    SUMMARY_SENTENCES,
+    CHUNK_SENTENCES,
+    SUMMARY_READER_THREADS,
+    SUMMARY_PREFETCH_FILES,
+    SUMMARY_CHUNK_TOKENS,
+    SUMMARY_REDUCE_FANOUT,
+    SUMMARY_PREFILTER,
+    PREFIX_CACHE
+)
 
 
 class CodeIndexer:
-    def __init__(self, repo_path, llm_manager):
+    def __init__(self, repo_path, llm_manager, batch_size=SUMMARY_BATCH_SIZE, cache=None,
+                 reader_threads=SUMMARY_READER_THREADS, prefetch=SUMMARY_PREFETCH_FILES, store_path=None,
+                 chunk_tokens=SUMMARY_CHUNK_TOKENS, prefilter=SUMMARY_PREFILTER):
         self.repo_path = Path(repo_path)
         self.llm_manager = llm_manager
-        self.summaries = {}
+        # Remote backends send one request per prompt, so a batch is as wide as the allowed concurrency
+        self.batch_size = max(1, batch_size, getattr(llm_manager, "concurrency", 1))
+        self.cache = cache
+        self.reader_threads = max(1, reader_threads)
+        self.prefetch = max(1, prefetch)
+        self.chunker = CodeChunker(llm_manager.count_tokens, chunk_tokens)
+        self.store = SummaryStore(store_path or self.repo_path.parent / SUMMARIES_STORE_FILE)
+        self.prefilter = prefilter
+        self.skipped = {"duplicate": 0, "trivial": 0}
+        self.files_per_second = 0.0
+        self.completed = 0
+        self.expired = False
+        self.stage_times = {"read": 0.0, "tokenize": 0.0, "queue_wait": 0.0, "generate": 0.0}
+        self.decoding = {"baseline": 0, "budget": 0, "steps": 0}
+        self._timing_lock = threading.Lock()
+        self._seen_hashes = set()
+        self._hash_summaries = {}
+        self._followers = {}
+        self._producer_error = None
+        self._reorder = {}
+        self._next_index = 0
+        self._window = []
     
-    def generate_summaries(self, source_files, show_progress=True):
-        total = len(source_files)
+    def _read_code(self, file_path):
+        if file_path.stat().st_size > MAX_FILE_SIZE_BYTES:
+            return None, "[File too large to process]"
+        
+        code_content = FileReader.read_source_file(file_path)
+        
+        if code_content is None:
+            return None, "[Unable to read file]"
+        
+        if len(code_content.strip()) == 0:
+            return None, "[Empty file]"
+        
+        return code_content, None
+    
+    def _build_prompt(self, code_content):
+        return SUMMARY_PROMPT_TEMPLATE.format(code=code_content)
+    
+    def _add_time(self, stage, seconds):
+        with self._timing_lock:
+            self.stage_times[stage] += seconds
+    
+    def _budget(self, code_content):
+        return summary_budget(code_content) if SUMMARY_ADAPTIVE_BUDGET else SUMMARY_MAX_NEW_TOKENS
+    
+    def _new_jobs(self, item, input_ids, final, budgets, sentences):
+        state = {
+            "item": item,
+            "results": [None] * len(input_ids),
+            "remaining": len(input_ids),
+            "error": None,
+            "final": final
+        }
+        return [
+            {"input_ids": ids, "state": state, "slot": slot, "max_new_tokens": budget, "sentences": sentences}
+            for slot, (ids, budget) in enumerate(zip(input_ids, budgets))
+        ]
+    
+    def _chunk_prompts(self, path, code_content):
+        chunks = self.chunker.split(code_content)
+        prompts = [
+            CHUNK_PROMPT_TEMPLATE.format(part=part, total=len(chunks), path=path, code=chunk)
+            for part, chunk in enumerate(chunks, 1)
+        ]
+        return prompts, [self._budget(chunk) for chunk in chunks]
+    
+    def _prepare(self, index, file_path):
+        item = {
+            "index": index,
+            "path": str(file_path.relative_to(self.repo_path)),
+            "summary": None,
+            "code_hash": None,
+            "duplicate": False,
+            "jobs": None,
+            "seconds": 0.0
+        }
+        
+        read_start = time.perf_counter()
+        try:
+            code_content, placeholder = self._read_code(file_path)
+        except Exception as e:
+            code_content, placeholder = None, f"[Error: {str(e)}]"
+        
+        if code_content is not None:
+            item["code_hash"] = content_hash(code_content)
+            if self.prefilter:
+                placeholder = classify(item["path"], code_content)
+                if placeholder is not None:
+                    with self._timing_lock:
+                        self.skipped["trivial"] += 1
+            if placeholder is None and self.cache is not None:
+                placeholder = self.cache.get(item["code_hash"])
+        self._add_time("read", time.perf_counter() - read_start)
+        
+        if code_content is None or placeholder is not None:
+            item["summary"] = placeholder
+            return item
+        
+        with self._timing_lock:
+            item["duplicate"] = item["code_hash"] in self._seen_hashes
+            self._seen_hashes.add(item["code_hash"])
+            if item["duplicate"]:
+                self.skipped["duplicate"] += 1
+                return item
+        
+        # Out of time: not worth tokenizing a file that will not be summarized in this run
+        if self.expired:
+            return item
+        
+        tokenize_start = time.perf_counter()
+        if self.llm_manager.count_tokens([code_content])[0] <= self.chunker.max_tokens:
+            prompts, budgets, sentences = [self._build_prompt(code_content)], [self._budget(code_content)], SUMMARY_SENTENCES
+        else:
+            (prompts, budgets), sentences = self._chunk_prompts(item["path"], code_content), CHUNK_SENTENCES
+        item["jobs"] = self._new_jobs(item, self.llm_manager.encode(prompts), len(prompts) == 1, budgets, sentences)
+        self._add_time("tokenize", time.perf_counter() - tokenize_start)
+        
+        return item
+    
+    def _produce(self, source_files, ready):
+        in_flight = deque()
+        
+        try:
+            with ThreadPoolExecutor(max_workers=self.reader_threads) as executor:
+                for index, file_path in enumerate(source_files):
+                    in_flight.append(executor.submit(self._prepare, index, file_path))
+                    if len(in_flight) >= self.prefetch:
+                        ready.put(in_flight.popleft().result())
+                
+                while in_flight:
+                    ready.put(in_flight.popleft().result())
+        except BaseException as e:
+            self._producer_error = e
+        finally:
+            ready.put(None)
+    
+    def _emit(self, items, summaries):
+        for item, summary in zip(items, summaries):
+            # None marks a file left for --resume: nothing is stored, but the files after it keep streaming
+            self._reorder[item["index"]] = None if summary is None else {
+                "path": item["path"],
+                "summary": summary,
+                "code_hash": item["code_hash"],
+                "seconds": item["seconds"]
+            }
+        
+        records = []
+        while self._next_index in self._reorder:
+            record = self._reorder.pop(self._next_index)
+            self._next_index += 1
+            if record is not None:
+                records.append(record)
+        
+        if records:
+            self.store.append(records)
+            self.completed += len(records)
+    
+    def _flush(self):
+        # Out-of-order results held back by an unfinished earlier file; the store is keyed by path, so gaps are fine
+        records = [self._reorder[index] for index in sorted(self._reorder) if self._reorder[index] is not None]
+        self._reorder = {}
+        if records:
+            self.store.append(records)
+            self.completed += len(records)
+    
+    def _out_of_time(self, deadline):
+        if deadline is not None and time.time() >= deadline:
+            self.expired = True
+        return self.expired
+    
+    def _reduce(self, item, summaries):
+        groups = [summaries[i:i + SUMMARY_REDUCE_FANOUT] for i in range(0, len(summaries), SUMMARY_REDUCE_FANOUT)]
+        prompts = [
+            REDUCE_PROMPT_TEMPLATE.format(path=item["path"], summaries="\n".join(f"- {summary}" for summary in group))
+            for group in groups
+        ]
+        # A combined summary covers the whole file, so it keeps the full budget
+        budgets = [SUMMARY_MAX_NEW_TOKENS] * len(prompts)
+        self._window.extend(self._new_jobs(item, self.llm_manager.encode(prompts), len(groups) == 1, budgets, SUMMARY_SENTENCES))
+    
+    def _complete(self, job, summary, error=None):
+        state = job["state"]
+        state["results"][job["slot"]] = summary
+        state["remaining"] -= 1
+        if error is not None:
+            state["error"] = error
+        
+        if state["remaining"]:
+            return
+        
+        item = state["item"]
+        
+        if state["error"] is not None:
+            self._resolve(item, state["error"])
+        elif state["final"]:
+            if self.cache is not None:
+                self.cache.put(item["code_hash"], state["results"][0])
+            self._resolve(item, state["results"][0])
+        else:
+            self._reduce(item, state["results"])
+    
+    def _count_decoding(self, rows, budget, steps):
+        self.decoding["baseline"] += rows * SUMMARY_MAX_NEW_TOKENS
+        self.decoding["budget"] += budget
+        self.decoding["steps"] += steps
+    
+    def _resolve(self, item, summary):
+        self._hash_summaries[item["code_hash"]] = summary
+        followers = self._followers.pop(item["code_hash"], [])
+        self._emit([item] + followers, [summary] * (len(followers) + 1))
+    
+    def _abandon(self, jobs=()):
+        # Out of time: files with unfinished jobs (and their duplicates) are left for --resume
+        jobs, self._window = list(jobs) + self._window, []
+        for item in {id(job["state"]["item"]): job["state"]["item"] for job in jobs}.values():
+            self._resolve(item, None)
+    
+    def _follow(self, item):
+        if item["code_hash"] in self._hash_summaries:
+            self._emit([item], [self._hash_summaries[item["code_hash"]]])
+        else:
+            self._followers.setdefault(item["code_hash"], []).append(item)
+    
+    def _summarize_window(self, total, show_progress, deadline=None):
+        jobs = sorted(self._window, key=lambda job: len(job["input_ids"]))
+        self._window = []
         
-        for idx, file_path in enumerate(source_files, 1):
-            relative_path = str(file_path.relative_to(self.repo_path))
+        for i in range(0, len(jobs), self.batch_size):
+            # A batch already running finishes; no new one starts after the deadline
+            if self._out_of_time(deadline):
+                self._abandon(jobs[i:])
+                return
+            
+            bucket = jobs[i:i + self.batch_size]
             
             if show_progress:
-                print(f"\r[{idx}/{total}] Processing: {relative_path[:60]:<60}", end="", flush=True)
+                path = bucket[0]["state"]["item"]["path"]
+                print(f"\r[{self.completed}/{total}] Processing batch of {len(bucket)}: {path[:50]:<50}", end="", flush=True)
             
+            budgets = [job["max_new_tokens"] for job in bucket]
+            steps = self.llm_manager.decoding["steps"]
+            generate_start = time.perf_counter()
             try:
-                if file_path.stat().st_size > MAX_FILE_SIZE_BYTES:
-                    self.summaries[relative_path] = "[File too large to process]"
-                    continue
+                summaries = self.llm_manager.generate_batch(
+                    None,
+                    max_new_tokens=budgets,
+                    input_ids=[job["input_ids"] for job in bucket],
+                    max_sentences=[job["sentences"] for job in bucket] if SUMMARY_STOP_CRITERIA else None,
+                    stop_sequences=SUMMARY_STOP_SEQUENCES if SUMMARY_STOP_CRITERIA else None
+                )
+                error = None
+            except Exception as e:
+                summaries = [None] * len(bucket)
+                error = f"[Error: {str(e)}]"
+            generate_seconds = time.perf_counter() - generate_start
+            self._add_time("generate", generate_seconds)
+            self._count_decoding(len(bucket), sum(budgets), self.llm_manager.decoding["steps"] - steps)
+            
+            for job, summary in zip(bucket, summaries):
+                # Batch time is split evenly across its rows; chunked files add up their parts
+                job["state"]["item"]["seconds"] += generate_seconds / len(bucket)
+                self._complete(job, summary, error)
+    
+    def generate_summaries(self, source_files, show_progress=True, resume=False, append=False, deadline=None):
+        if resume:
+            done_paths = self.store.completed_paths()
+            source_files = [f for f in source_files if str(f.relative_to(self.repo_path)) not in done_paths]
+            if show_progress:
+                print(f"Resuming: {len(done_paths)} files already summarized in {self.store.path}")
+        
+        total = len(source_files)
+        start = time.perf_counter()
+        
+        self.stage_times = {stage: 0.0 for stage in self.stage_times}
+        self.decoding = {key: 0 for key in self.decoding}
+        self._producer_error = None
+        self._reorder = {}
+        self._next_index = 0
+        self._window = []
+        self._seen_hashes = set()
+        self._hash_summaries = {}
+        self._followers = {}
+        self.skipped = {"duplicate": 0, "trivial": 0}
+        self.completed = 0
+        self.expired = False
+        
+        if PREFIX_CACHE:
+            self.llm_manager.cache_prefix(SUMMARY_PROMPT_TEMPLATE.split("{code}")[0])
+        
+        window_size = self.batch_size * SUMMARY_BUCKET_BATCHES
+        
+        ready = Queue(maxsize=self.prefetch)
+        producer = threading.Thread(target=self._produce, args=(source_files, ready), daemon=True)
+        producer.start()
+        
+        with self.store.open():
+            while True:
+                wait_start = time.perf_counter()
+                item = ready.get()
+                self._add_time("queue_wait", time.perf_counter() - wait_start)
                 
-                code_content = FileReader.read_source_file(file_path)
+                if item is None:
+                    break
                 
-                if code_content is None:
-                    self.summaries[relative_path] = "[Unable to read file]"
+                if item["duplicate"]:
+                    self._follow(item)
                     continue
                 
-                if len(code_content.strip()) == 0:
-                    self.summaries[relative_path] = "[Empty file]"
+                if item["jobs"] is None:
+                    # No summary means the file was read after the deadline and left for --resume
+                    if item["summary"] is not None:
+                        self._emit([item], [item["summary"]])
+                    else:
+                        self._resolve(item, None)
                     continue
                 
-                truncated_code = code_content[:8000]
-                prompt = SUMMARY_PROMPT_TEMPLATE.format(code=truncated_code)
-                
-                summary = self.llm_manager.generate(prompt, max_new_tokens=150)
-                self.summaries[relative_path] = summary
+                # Past the deadline the queue is still drained: template, cached and duplicate summaries cost no model time
+                if self._out_of_time(deadline):
+                    self._abandon(item["jobs"])
+                    continue
                 
-            except Exception as e:
-                self.summaries[relative_path] = f"[Error: {str(e)}]"
+                self._window.extend(item["jobs"])
+                if len(self._window) >= window_size:
+                    self._summarize_window(total, show_progress, deadline)
+            
+            while self._window and not self._out_of_time(deadline):
+                self._summarize_window(total, show_progress, deadline)
+            self._abandon()
+            
+            self._flush()
+            producer.join()
+            
+            if not (resume or append or self.expired) and self._producer_error is None:
+                self.store.retain(str(file_path.relative_to(self.repo_path)) for file_path in source_files)
+        
+        if self._producer_error is not None:
+            raise self._producer_error
+        
+        elapsed = time.perf_counter() - start
+        self.files_per_second = self.completed / elapsed if elapsed > 0 else 0.0
         
         if show_progress:
-            print("\n")
+            print(f"\r[{self.completed}/{total}] Done in {elapsed:.1f}s ({self.files_per_second:.2f} files/sec)" + " " * 40)
+            if self.expired:
+                print(f"Time budget reached: {total - self.completed} files left unsummarized (rerun with --resume to continue)")
+            print(
+                "Stage times: "
+                + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in self.stage_times.items())
+                + f" (read/tokenize summed over {self.reader_threads} threads)"
+            )
+            if self.cache is not None:
+                print(f"Summary cache: {self.cache.hits} hits, {self.cache.misses} misses")
+            if self.llm_manager.speculation["proposed"]:
+                print(f"Speculative decoding: {self.llm_manager.acceptance_rate():.0%} of draft tokens accepted")
+            if self.decoding["baseline"]:
+                print(decoding_report(self.decoding))
+            print(
+                f"LLM summaries avoided: {self.llm_calls_avoided()} "
+                f"({self.skipped['duplicate']} duplicates, {self.skipped['trivial']} trivial/generated"
+                + (f", {self.cache.hits} cached)" if self.cache is not None else ")")
+            )
+            print()
         
-        return self.summaries
+        return self.store.path
+    
+    def llm_calls_avoided(self):
+        cached = self.cache.hits if self.cache is not None else 0
+        return self.skipped["duplicate"] + self.skipped["trivial"] + cached
     
     def save_summaries(self, output_path=None):
-        if output_path is None:
-            output_path = self.repo_path.parent / SUMMARIES_FILE
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(self.summaries, f, indent=2, ensure_ascii=False)
-        
-        return output_path
+        return self.store.save_json(output_path or self.repo_path.parent / SUMMARIES_FILE)
     
     @staticmethod
     def load_summaries(summaries_path):
+        if Path(summaries_path).suffix == ".db":
+            return {record["path"]: record["summary"] for record in SummaryStore(summaries_path).read()}
+        
         with open(summaries_path, 'r', encoding='utf-8') as f:
             return json.load(f)
-
@@ -1,6 +1,28 @@
-import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM
-from config import MODEL_NAME, MAX_CONTEXT_TOKENS
+import copy
+import threading
+import time
+from model_server import ModelClient
+from stopping import StopRule, stopping_criteria
+from config import (
+    MODEL_NAME,
+    MAX_CONTEXT_TOKENS,
+    LLM_DEVICE,
+    CPU_DTYPE,
+    CPU_QUANTIZE,
+    CPU_THREADS,
+    DRAFT_MODEL_NAME,
+    DRAFT_NUM_TOKENS,
+    LLM_BACKEND,
+    LLM_API_BASE,
+    LLM_API_KEY,
+    LLM_API_MODEL,
+    LLM_API_CONCURRENCY,
+    LLM_API_RETRIES,
+    LLM_API_TIMEOUT,
+    MODEL_SERVER_SOCKET,
+    USE_MODEL_SERVER,
+    REPETITION_PENALTY
+)
 
 
 class LLMManager:
@@ -8,6 +30,14 @@ class LLMManager:
     _model = None
     _tokenizer = None
     _device = None
+    _client = None
+    _backend = None
+    _draft_model = None
+    _prefixes = []
+    speculation = {"proposed": 0, "accepted": 0, "new_tokens": 0}
+    decoding = {"rows": 0, "budget": 0, "steps": 0}
+    metrics = None
+    _tokenizer_lock = threading.Lock()
     
     def __new__(cls):
         if cls._instance is None:
@@ -26,65 +56,486 @@ class LLMManager:
     def device(self):
         return self._device
     
+    @property
+    def concurrency(self):
+        return self._backend.concurrency if self._backend is not None else 1
+    
     def is_loaded(self):
-        return self._model is not None
+        return self._model is not None or self._client is not None or self._backend is not None
     
-    def load_model(self):
-        if self._model is not None:
+    def _connect_server(self):
+        client = ModelClient.connect(MODEL_SERVER_SOCKET)
+        if client is None:
+            return False
+        
+        try:
+            info = client.call("info")
+        except (OSError, RuntimeError, ValueError):
+            client.close()
+            return False
+        
+        if info["model"] != MODEL_NAME:
+            print(f"Model server at {MODEL_SERVER_SOCKET} serves {info['model']}, loading {MODEL_NAME} locally")
+            client.close()
+            return False
+        
+        self._client = client
+        self._device = info["device"]
+        print(f"Using warm model server at {MODEL_SERVER_SOCKET} (model: {MODEL_NAME}, device: {self._device})")
+        return True
+    
+    def load_model(self, device=None, dtype=None, quantize=None, threads=None, use_server=USE_MODEL_SERVER, backend=None):
+        if self.is_loaded():
             return
         
-        self._device = "cuda" if torch.cuda.is_available() else "cpu"
+        if (backend or LLM_BACKEND) == "openai":
+            self._load_http_backend()
+            return
+        
+        if use_server and self._connect_server():
+            return
+        
+        import torch
+        from transformers import AutoTokenizer, AutoModelForCausalLM
+        
+        device = device or LLM_DEVICE
+        if device == "auto":
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+        elif device == "cuda" and not torch.cuda.is_available():
+            raise Exception("No CUDA device found")
+        
+        self._device = device
         
         print(f"Loading model: {MODEL_NAME}")
         print(f"Device: {self._device}")
         
-        if self._device == "cpu":
-            print("ERROR: No GPU (cuda) detected.")
-            print("This model requires GPU to run efficiently.")
-            print("In Colab: Runtime -> Change runtime type -> T4 GPU")
-            raise Exception("No CUDA device found")
+        self._tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME, trust_remote_code=True)
+        
+        if self._device == "cuda":
+            self._model = AutoModelForCausalLM.from_pretrained(
+                MODEL_NAME,
+                trust_remote_code=True,
+                torch_dtype=torch.float16,
+                device_map="auto"
+            )
+        else:
+            self._model = self._load_cpu_model(dtype or CPU_DTYPE, quantize or CPU_QUANTIZE, threads or CPU_THREADS)
+        
+        self._model.eval()
         
+        if DRAFT_MODEL_NAME:
+            self._load_draft_model(DRAFT_MODEL_NAME)
+        
+        print("Model loaded successfully")
+        print(f"Throughput: {self.measure_tokens_per_second():.1f} tokens/sec")
+    
+    def _load_http_backend(self):
+        from transformers import AutoTokenizer
+        from http_backend import OpenAIBackend
+        
+        # Only the tokenizer is loaded locally; it is still needed for chunking and prompt budgets
         self._tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME, trust_remote_code=True)
-        self._model = AutoModelForCausalLM.from_pretrained(
+        self._backend = OpenAIBackend(
+            LLM_API_BASE,
+            LLM_API_MODEL or MODEL_NAME,
+            api_key=LLM_API_KEY,
+            concurrency=LLM_API_CONCURRENCY,
+            retries=LLM_API_RETRIES,
+            timeout=LLM_API_TIMEOUT
+        )
+        self._device = "remote"
+        print(f"Using OpenAI-compatible API at {LLM_API_BASE} (model: {self._backend.model}, {self._backend.concurrency} concurrent requests)")
+    
+    def _complete(self, start, prompts, budgets, rules):
+        sampling = {"temperature": 0.0}
+        if rules[0].stop_sequences:
+            sampling["stop"] = rules[0].stop_sequences
+        
+        results = self._backend.complete_many(prompts, budgets, **sampling)
+        # The server stops at the first match even before any text, e.g. a completion that opens with a blank line;
+        # those rows are asked again without stop sequences and trimmed here
+        empty = [i for i, (text, _) in enumerate(results) if "stop" in sampling and not text]
+        if empty:
+            retried = self._backend.complete_many([prompts[i] for i in empty], [budgets[i] for i in empty], temperature=0.0)
+            for i, result in zip(empty, retried):
+                results[i] = result
+        
+        generated_tokens = sum(usage.get("completion_tokens", 0) for _, usage in results)
+        self._record(start, sum(usage.get("prompt_tokens", 0) for _, usage in results), generated_tokens)
+        self._count_decoding(budgets, generated_tokens)
+        
+        # The API has no sentence limit, so extra sentences are only trimmed afterwards
+        return [rule.trim(text) for (text, _), rule in zip(results, rules)]
+    
+    def _load_cpu_model(self, dtype, quantize, threads):
+        import torch
+        from transformers import AutoModelForCausalLM
+        
+        if threads:
+            torch.set_num_threads(threads)
+        
+        if quantize == "int8" and dtype != "float32":
+            print(f"Dynamic int8 quantization requires float32 weights, ignoring dtype {dtype}")
+            dtype = "float32"
+        
+        print(f"CPU mode: dtype={dtype}, quantize={quantize}, threads={torch.get_num_threads()}")
+        
+        model = AutoModelForCausalLM.from_pretrained(
             MODEL_NAME,
             trust_remote_code=True,
-            torch_dtype=torch.float16,
-            device_map="auto"
+            torch_dtype=getattr(torch, dtype),
+            low_cpu_mem_usage=True
         )
         
-        self._model.eval()
+        if quantize == "int8":
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
         
-        print("Model loaded successfully")
+        return model
+    
+    def _load_draft_model(self, draft_name):
+        from transformers import AutoModelForCausalLM
+        
+        print(f"Loading draft model: {draft_name} ({DRAFT_NUM_TOKENS} speculative tokens per step)")
+        
+        draft_model = AutoModelForCausalLM.from_pretrained(
+            draft_name,
+            trust_remote_code=True,
+            torch_dtype=self._model.dtype,
+            low_cpu_mem_usage=True
+        )
+        draft_model.generation_config.num_assistant_tokens = DRAFT_NUM_TOKENS
+        self._draft_model = draft_model.to(self._device).eval()
+    
+    def acceptance_rate(self):
+        proposed = self.speculation["proposed"]
+        return self.speculation["accepted"] / proposed if proposed else 0.0
+    
+    def _generation_kwargs(self, max_new_tokens, pad_token_id):
+        return {
+            "max_new_tokens": max_new_tokens,
+            "do_sample": False,
+            "temperature": None,
+            "top_p": None,
+            "repetition_penalty": REPETITION_PENALTY,
+            "pad_token_id": pad_token_id
+        }
+    
+    def _speculate(self, input_ids, max_new_tokens, pad_token_id, rule=None):
+        import torch
+        
+        passes = {"target": 0, "draft": 0}
+        
+        def count(name):
+            return lambda *_: passes.__setitem__(name, passes[name] + 1)
+        
+        handles = [
+            self._model.register_forward_hook(count("target")),
+            self._draft_model.register_forward_hook(count("draft"))
+        ]
+        
+        try:
+            with torch.no_grad():
+                outputs = self._model.generate(
+                    input_ids=torch.tensor([input_ids], device=self._device),
+                    attention_mask=torch.ones(1, len(input_ids), dtype=torch.long, device=self._device),
+                    assistant_model=self._draft_model,
+                    stopping_criteria=stopping_criteria([rule], self._tokenizer, len(input_ids)) if rule is not None and rule.active else None,
+                    **self._generation_kwargs(max_new_tokens, pad_token_id)
+                )
+        finally:
+            for handle in handles:
+                handle.remove()
+        
+        # Every target pass verifies the draft tokens and adds one token of its own
+        new_tokens = outputs.shape[1] - len(input_ids)
+        self.speculation["proposed"] += passes["draft"]
+        self.speculation["accepted"] += max(0, new_tokens - passes["target"])
+        self.speculation["new_tokens"] += new_tokens
+        
+        return outputs[0]
+    
+    def _decode_speculative(self, input_ids, max_new_tokens, rule):
+        output = self._speculate(input_ids, max_new_tokens, self._tokenizer.eos_token_id, rule)
+        self._count_decoding([max_new_tokens], len(output) - len(input_ids))
+        return rule.trim(self._tokenizer.decode(output[len(input_ids):], skip_special_tokens=True))
     
-    def generate(self, prompt, max_new_tokens=256):
+    def _count_decoding(self, budgets, steps):
+        self.decoding["rows"] += len(budgets)
+        self.decoding["budget"] += sum(budgets)
+        self.decoding["steps"] += steps
+    
+    def _eos_token_ids(self):
+        eos = self._model.generation_config.eos_token_id
+        eos = set(eos if isinstance(eos, (list, tuple)) else [eos]) - {None}
+        eos.add(self._tokenizer.eos_token_id)
+        return eos
+    
+    def _decode_batch(self, inputs, budgets, rules):
+        import torch
+        from transformers import DynamicCache
+        
+        input_ids = inputs["input_ids"]
+        attention_mask = inputs["attention_mask"]
+        past_key_values = inputs.get("past_key_values") or DynamicCache(config=self._model.config)
+        cached = past_key_values.get_seq_length()
+        
+        # Same positions as generate() derives for left (or prefix-middle) padding
+        position_ids = attention_mask.long().cumsum(-1) - 1
+        position_ids.masked_fill_(attention_mask == 0, 1)
+        next_positions = position_ids[:, -1] + 1
+        
+        eos_ids = self._eos_token_ids()
+        rows = list(range(input_ids.shape[0]))
+        generated = [[] for _ in rows]
+        sequences = input_ids
+        
+        with torch.no_grad():
+            logits = self._model(
+                input_ids=input_ids[:, cached:],
+                attention_mask=attention_mask,
+                position_ids=position_ids[:, cached:],
+                past_key_values=past_key_values,
+                use_cache=True
+            ).logits[:, -1].float()
+            
+            while True:
+                # Greedy decoding with the repetition penalty of generate(), applied over prompt and output
+                scores = torch.gather(logits, 1, sequences)
+                logits = logits.scatter(1, sequences, torch.where(scores < 0, scores * REPETITION_PENALTY, scores / REPETITION_PENALTY))
+                tokens = logits.argmax(-1)
+                
+                keep = []
+                for i, (row, token) in enumerate(zip(rows, tokens.tolist())):
+                    generated[row].append(token)
+                    if token in eos_ids or len(generated[row]) >= budgets[row]:
+                        continue
+                    if rules[row].active and rules[row].done(self._tokenizer.decode(generated[row], skip_special_tokens=True)):
+                        continue
+                    keep.append(i)
+                
+                if not keep:
+                    break
+                
+                # Finished rows leave the batch, so later steps only run the sequences still generating
+                if len(keep) < len(rows):
+                    index = torch.tensor(keep, device=tokens.device)
+                    past_key_values.batch_select_indices(index)
+                    tokens = tokens[index]
+                    sequences = sequences[index]
+                    attention_mask = attention_mask[index]
+                    next_positions = next_positions[index]
+                    rows = [rows[i] for i in keep]
+                
+                sequences = torch.cat([sequences, tokens[:, None]], dim=1)
+                attention_mask = torch.cat([attention_mask, attention_mask.new_ones(len(rows), 1)], dim=1)
+                logits = self._model(
+                    input_ids=tokens[:, None],
+                    attention_mask=attention_mask,
+                    position_ids=next_positions[:, None],
+                    past_key_values=past_key_values,
+                    use_cache=True
+                ).logits[:, -1].float()
+                next_positions = next_positions + 1
         
-        inputs = self._tokenizer(prompt, return_tensors="pt", truncation=True, max_length=MAX_CONTEXT_TOKENS)
+        return generated
+    
+    def measure_tokens_per_second(self, new_tokens=32):
+        import torch
+        
+        inputs = self._tokenizer("def main():", return_tensors="pt")
         inputs = {k: v.to(self._device) for k, v in inputs.items()}
         
+        start = time.perf_counter()
         with torch.no_grad():
             outputs = self._model.generate(
                 **inputs,
-                max_new_tokens=max_new_tokens,
+                min_new_tokens=new_tokens,
+                max_new_tokens=new_tokens,
                 do_sample=False,
-                temperature=None,
-                top_p=None,
-                repetition_penalty=1.2,
                 pad_token_id=self._tokenizer.eos_token_id
             )
+        elapsed = time.perf_counter() - start
+        
+        generated = outputs.shape[1] - inputs["input_ids"].shape[1]
+        return generated / elapsed if elapsed > 0 else 0.0
+    
+    def _record(self, start, prompt_tokens, generated_tokens):
+        if self.metrics is not None:
+            self.metrics.record_generation(time.perf_counter() - start, prompt_tokens, generated_tokens)
+    
+    def _record_remote(self, start, prompts, input_ids, outputs, max_new_tokens):
+        # The server only returns (trimmed) text, so token counts are recovered by re-tokenizing
+        elapsed = time.perf_counter() - start
+        generated_tokens = sum(self.count_tokens(outputs)) if outputs else 0
+        self._count_decoding(max_new_tokens if isinstance(max_new_tokens, list) else [max_new_tokens] * len(outputs), generated_tokens)
         
-        generated_text = self._tokenizer.decode(outputs[0], skip_special_tokens=True)
+        if self.metrics is not None:
+            prompt_tokens = sum(len(ids) for ids in input_ids) if input_ids is not None else sum(self.count_tokens(prompts))
+            self.metrics.record_generation(elapsed, prompt_tokens, generated_tokens)
+    
+    def _stop_rules(self, count, max_sentences, stop_sequences):
+        sentences = max_sentences if isinstance(max_sentences, list) else [max_sentences] * count
+        return [StopRule(n, stop_sequences) for n in sentences]
+    
+    def generate(self, prompt, max_new_tokens=256, max_sentences=None, stop_sequences=None):
+        return self.generate_batch(
+            [prompt],
+            max_new_tokens=max_new_tokens,
+            max_sentences=max_sentences,
+            stop_sequences=stop_sequences
+        )[0]
+    
+    def cache_prefix(self, text):
+        if self._client is not None:
+            return self._client.call("cache_prefix", text=text)
+        
+        import torch
         
-        response = generated_text[len(prompt):].strip()
+        with self._tokenizer_lock:
+            # The last token may merge with whatever follows the prefix, so it is left out of the cache
+            prefix_ids = self._tokenizer(text)["input_ids"][:-1]
         
-        return response
+        if self._backend is not None:
+            # Prefix reuse is left to the inference server (e.g. vLLM automatic prefix caching)
+            return len(prefix_ids)
+        
+        if not prefix_ids or any(ids == prefix_ids for ids, _ in self._prefixes):
+            return len(prefix_ids)
+        
+        with torch.no_grad():
+            outputs = self._model(torch.tensor([prefix_ids], device=self._device), use_cache=True)
+        
+        self._prefixes = self._prefixes + [(prefix_ids, outputs.past_key_values)]
+        return len(prefix_ids)
+    
+    def clear_prefixes(self):
+        self._prefixes = []
+    
+    def _match_prefix(self, input_ids):
+        for prefix_ids, cache in self._prefixes:
+            length = len(prefix_ids)
+            if all(len(ids) > length and ids[:length] == prefix_ids for ids in input_ids):
+                return prefix_ids, cache
+        return None
+    
+    def _prefixed_inputs(self, prefix, input_ids):
+        import torch
+        
+        prefix_ids, cache = prefix
+        prefix_length = len(prefix_ids)
+        length = max(len(ids) for ids in input_ids)
+        
+        # Padding goes between the shared prefix and each suffix so every row starts with the cached tokens
+        rows = []
+        masks = []
+        for ids in input_ids:
+            padding = length - len(ids)
+            rows.append(prefix_ids + [self._tokenizer.pad_token_id] * padding + ids[prefix_length:])
+            masks.append([1] * prefix_length + [0] * padding + [1] * (len(ids) - prefix_length))
+        
+        past_key_values = copy.deepcopy(cache)
+        past_key_values.batch_repeat_interleave(len(input_ids))
+        
+        return {
+            "input_ids": torch.tensor(rows, device=self._device),
+            "attention_mask": torch.tensor(masks, device=self._device),
+            "past_key_values": past_key_values
+        }
+    
+    def encode(self, texts):
+        if self._client is not None:
+            return self._client.call("encode", texts=texts)
+        
+        with self._tokenizer_lock:
+            encoded = self._tokenizer(texts, truncation=True, max_length=MAX_CONTEXT_TOKENS)
+        return encoded["input_ids"]
+    
+    def count_tokens(self, texts):
+        return [len(ids) for ids in self.encode(texts)]
+    
+    def generate_batch(self, prompts, max_new_tokens=256, input_ids=None, max_sentences=None, stop_sequences=None):
+        start = time.perf_counter()
+        
+        if self._client is not None:
+            outputs = self._client.call(
+                "generate_batch",
+                prompts=prompts,
+                max_new_tokens=max_new_tokens,
+                input_ids=input_ids,
+                max_sentences=max_sentences,
+                stop_sequences=stop_sequences
+            )
+            self._record_remote(start, prompts, input_ids, outputs, max_new_tokens)
+            return outputs
+        
+        if input_ids is None:
+            input_ids = self.encode(prompts) if prompts else []
+        
+        if not input_ids:
+            return []
+        
+        budgets = max_new_tokens if isinstance(max_new_tokens, list) else [max_new_tokens] * len(input_ids)
+        rules = self._stop_rules(len(input_ids), max_sentences, stop_sequences)
+        
+        if self._backend is not None:
+            with self._tokenizer_lock:
+                prompts = self._tokenizer.batch_decode(input_ids, skip_special_tokens=True)
+            return self._complete(start, prompts, budgets, rules)
+        
+        prompt_tokens = sum(len(ids) for ids in input_ids)
+        
+        if self._draft_model is not None:
+            # Assisted generation verifies one sequence at a time, so rows are not padded into a batch
+            new_tokens = self.speculation["new_tokens"]
+            responses = [self._decode_speculative(ids, budget, rule) for ids, budget, rule in zip(input_ids, budgets, rules)]
+            self._record(start, prompt_tokens, self.speculation["new_tokens"] - new_tokens)
+            return responses
+        
+        with self._tokenizer_lock:
+            self._tokenizer.padding_side = "left"
+            if self._tokenizer.pad_token is None:
+                self._tokenizer.pad_token = self._tokenizer.eos_token
+            
+            prefix = self._match_prefix(input_ids)
+            if prefix is None:
+                inputs = self._tokenizer.pad({"input_ids": input_ids}, padding=True, return_tensors="pt")
+                inputs = {k: v.to(self._device) for k, v in inputs.items()}
+        
+        if prefix is not None:
+            inputs = self._prefixed_inputs(prefix, input_ids)
+        
+        outputs = self._decode_batch(inputs, budgets, rules)
+        
+        steps = sum(len(output) for output in outputs)
+        self._record(start, prompt_tokens, steps)
+        self._count_decoding(budgets, steps)
+        
+        return [
+            rule.trim(self._tokenizer.decode(output, skip_special_tokens=True))
+            for output, rule in zip(outputs, rules)
+        ]
     
     def unload_model(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+            self._device = None
+        
+        if self._backend is not None:
+            self._backend.close()
+            self._backend = None
+            self._tokenizer = None
+            self._device = None
+        
         if self._model is not None:
             del self._model
             del self._tokenizer
             if self._device == "cuda":
+                import torch
                 torch.cuda.empty_cache()
             self._model = None
             self._tokenizer = None
+            self._draft_model = None
             self._device = None
+            self._prefixes = []
             print("Model unloaded")
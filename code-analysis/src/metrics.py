@@ -0,0 +1,205 @@
+import contextvars
+import functools
+import json
+import platform
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+PROMETHEUS_PREFIX = "code_analysis"
+
+PROMETHEUS_METRICS = [
+    ("seconds", "Wall time spent in the phase"),
+    ("calls", "Times the phase ran"),
+    ("llm_calls", "LLM generate calls made during the phase"),
+    ("llm_seconds", "Wall time spent inside LLM generate calls"),
+    ("prompt_tokens", "Prompt tokens sent to the LLM"),
+    ("generated_tokens", "Tokens generated by the LLM"),
+    ("tokens_per_second", "Generated tokens per second of LLM time"),
+    ("queue_wait_seconds", "Time the consumer waited on the prepared-file queue"),
+    ("decode_steps", "Summary tokens actually decoded"),
+    ("decode_budget", "Summary tokens allowed by the per-file budgets"),
+    ("decode_baseline", "Summary tokens a fixed max_new_tokens budget would allow"),
+    ("peak_rss_bytes", "Peak resident set size of the process at the end of the phase"),
+    ("accelerator_peak_bytes", "Peak accelerator memory allocated during the phase (since the outermost open phase began)")
+]
+
+
+def peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _cuda():
+    # Only report accelerator memory when the model code already imported torch (and is not still importing it on another thread)
+    torch = sys.modules.get("torch")
+    if torch is None or getattr(torch.__spec__, "_initializing", False):
+        return None
+    if torch.cuda.is_available() and torch.cuda.is_initialized():
+        return torch.cuda
+    return None
+
+
+class RunMetrics:
+    def __init__(self):
+        self.phases = {}
+        self.timeline = []
+        self.started_at = time.time()
+        self._origin = time.perf_counter()
+        # Per context rather than per instance: phases running concurrently in pipeline threads each see their own stack
+        self._stack = contextvars.ContextVar(f"phase_stack_{id(self)}", default=())
+        self._open = 0
+        self._lock = threading.Lock()
+    
+    def _entry(self, name):
+        if name not in self.phases:
+            self.phases[name] = {
+                "seconds": 0.0,
+                "calls": 0,
+                "llm_calls": 0,
+                "llm_seconds": 0.0,
+                "prompt_tokens": 0,
+                "generated_tokens": 0,
+                "queue_wait_seconds": 0.0,
+                "decode_steps": 0,
+                "decode_budget": 0,
+                "decode_baseline": 0,
+                "stage_seconds": {},
+                "peak_rss_bytes": 0,
+                "accelerator_peak_bytes": 0
+            }
+        return self.phases[name]
+    
+    @contextmanager
+    def phase(self, name):
+        with self._lock:
+            # The peak counter is process-wide: resetting it under an open phase (nested, or concurrent in the
+            # task graph) would wipe that phase's peak. Overlapping phases report the peak since the outermost began
+            if self._open == 0:
+                cuda = _cuda()
+                if cuda is not None:
+                    cuda.reset_peak_memory_stats()
+            self._open += 1
+            self._entry(name)
+        parents = self._stack.get()
+        token = self._stack.set(parents + (name,))
+        
+        start = time.perf_counter()
+        try:
+            yield self.phases[name]
+        finally:
+            elapsed = time.perf_counter() - start
+            cuda = _cuda()
+            self._stack.reset(token)
+            
+            with self._lock:
+                self._open -= 1
+                self.timeline.append({
+                    "phase": name,
+                    "parent": parents[-1] if parents else None,
+                    "thread": threading.current_thread().name,
+                    "start": start - self._origin,
+                    "end": start - self._origin + elapsed
+                })
+                entry = self.phases[name]
+                entry["seconds"] += elapsed
+                entry["calls"] += 1
+                entry["peak_rss_bytes"] = max(entry["peak_rss_bytes"], peak_rss_bytes())
+                if cuda is not None:
+                    entry["accelerator_peak_bytes"] = max(entry["accelerator_peak_bytes"], cuda.max_memory_allocated())
+    
+    def record_generation(self, seconds, prompt_tokens, generated_tokens, calls=1):
+        stack = self._stack.get()
+        with self._lock:
+            # Nested phases (phase_4 building the vector index) attribute generation to the innermost one
+            entry = self._entry(stack[-1] if stack else "unattributed")
+            entry["llm_calls"] += calls
+            entry["llm_seconds"] += seconds
+            entry["prompt_tokens"] += prompt_tokens
+            entry["generated_tokens"] += generated_tokens
+    
+    def record_stages(self, name, stage_times):
+        with self._lock:
+            entry = self._entry(name)
+            for stage, seconds in stage_times.items():
+                entry["stage_seconds"][stage] = entry["stage_seconds"].get(stage, 0.0) + seconds
+            entry["queue_wait_seconds"] = entry["stage_seconds"].get("queue_wait", 0.0)
+    
+    def record_decoding(self, name, decoding):
+        with self._lock:
+            entry = self._entry(name)
+            for key in ("steps", "budget", "baseline"):
+                entry[f"decode_{key}"] += decoding[key]
+    
+    def report(self):
+        phases = {}
+        for name, entry in self.phases.items():
+            phases[name] = dict(entry, tokens_per_second=entry["generated_tokens"] / entry["llm_seconds"] if entry["llm_seconds"] else 0.0)
+        
+        return {
+            "started_at": self.started_at,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "peak_rss_bytes": peak_rss_bytes(),
+            "phases": phases,
+            "timeline": sorted(self.timeline, key=lambda event: event["start"])
+        }
+    
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
+        return Path(path)
+    
+    def write_prometheus(self, path):
+        phases = self.report()["phases"]
+        lines = []
+        
+        for metric, description in PROMETHEUS_METRICS:
+            name = f"{PROMETHEUS_PREFIX}_phase_{metric}"
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} gauge")
+            for phase, entry in phases.items():
+                lines.append(f'{name}{{phase="{phase}"}} {entry[metric]}')
+        
+        name = f"{PROMETHEUS_PREFIX}_phase_stage_seconds"
+        lines.append(f"# HELP {name} Indexer pipeline stage time within the phase")
+        lines.append(f"# TYPE {name} gauge")
+        for phase, entry in phases.items():
+            for stage, seconds in entry["stage_seconds"].items():
+                lines.append(f'{name}{{phase="{phase}",stage="{stage}"}} {seconds}')
+        
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        return Path(path)
+    
+    def write_trace(self, path):
+        # Chrome trace event format: open in chrome://tracing or ui.perfetto.dev, one row per thread
+        threads = {}
+        events = []
+        for event in sorted(self.timeline, key=lambda event: event["start"]):
+            tid = threads.setdefault(event["thread"], len(threads))
+            events.append({
+                "name": event["phase"],
+                "ph": "X",
+                "pid": 0,
+                "tid": tid,
+                "ts": round(event["start"] * 1e6),
+                "dur": round((event["end"] - event["start"]) * 1e6)
+            })
+        events.extend({"name": "thread_name", "ph": "M", "pid": 0, "tid": tid, "args": {"name": name}} for name, tid in threads.items())
+        
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return Path(path)
+
+
+def instrumented(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.metrics.phase(method.__name__):
+            return method(self, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,110 @@
+import json
+import os
+import socket
+import socketserver
+import threading
+from pathlib import Path
+
+
+class ModelClient:
+    def __init__(self, sock):
+        self._sock = sock
+        self._reader = sock.makefile('r', encoding='utf-8')
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def connect(cls, socket_path, timeout=1.0):
+        if not Path(socket_path).exists():
+            return None
+        
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(str(socket_path))
+        except OSError:
+            sock.close()
+            return None
+        
+        sock.settimeout(None)
+        return cls(sock)
+    
+    def call(self, method, **kwargs):
+        request = json.dumps({"method": method, "args": kwargs}) + "\n"
+        
+        with self._lock:
+            self._sock.sendall(request.encode('utf-8'))
+            line = self._reader.readline()
+        
+        if not line:
+            raise ConnectionError("Model server closed the connection")
+        
+        response = json.loads(line)
+        if "error" in response:
+            raise RuntimeError(f"Model server error: {response['error']}")
+        
+        return response["result"]
+    
+    def close(self):
+        self._reader.close()
+        self._sock.close()
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            request = {}
+            try:
+                request = json.loads(line)
+                result = self.server.dispatch(request["method"], request.get("args", {}))
+                response = {"result": result}
+            except Exception as e:
+                response = {"error": f"{type(e).__name__}: {e}"}
+            
+            self.wfile.write((json.dumps(response) + "\n").encode('utf-8'))
+            self.wfile.flush()
+            
+            if request.get("method") == "shutdown":
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                return
+
+
+class ModelServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    
+    def __init__(self, llm_manager, socket_path, model_name):
+        self.llm_manager = llm_manager
+        self.socket_path = Path(socket_path)
+        self.model_name = model_name
+        self._model_lock = threading.Lock()
+        
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.socket_path.exists():
+            client = ModelClient.connect(self.socket_path)
+            if client is not None:
+                client.close()
+                raise RuntimeError(f"A model server is already listening on {self.socket_path}")
+            self.socket_path.unlink()
+        
+        super().__init__(str(self.socket_path), _RequestHandler)
+        os.chmod(self.socket_path, 0o600)
+    
+    def dispatch(self, method, args):
+        if method == "info":
+            return {"model": self.model_name, "device": self.llm_manager.device, "pid": os.getpid()}
+        
+        if method == "shutdown":
+            return True
+        
+        if method == "encode":
+            return self.llm_manager.encode(**args)
+        
+        if method in ("generate", "generate_batch", "cache_prefix"):
+            with self._model_lock:
+                return getattr(self.llm_manager, method)(**args)
+        
+        raise ValueError(f"Unknown method: {method}")
+    
+    def server_close(self):
+        super().server_close()
+        if self.socket_path.exists():
+            self.socket_path.unlink()
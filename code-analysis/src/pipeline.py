@@ -0,0 +1,83 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TaskGraph:
+    def __init__(self, concurrency=0):
+        self.concurrency = concurrency
+        self.tasks = {}
+        # Set once a task has succeeded, failed or been skipped; lets a streaming consumer know its producer is done
+        self.finished = {}
+        self.results = {}
+        self.errors = {}
+        self.skipped = []
+    
+    def add(self, name, function, after=()):
+        if name in self.tasks:
+            raise ValueError(f"Duplicate task: {name}")
+        missing = [dependency for dependency in after if dependency not in self.tasks]
+        if missing:
+            # Dependencies must be added first, which also rules out cycles
+            raise ValueError(f"Task {name} depends on unknown task(s): {', '.join(missing)}")
+        
+        self.tasks[name] = (function, tuple(after))
+        self.finished[name] = threading.Event()
+        return self
+    
+    async def _run_task(self, name, pending, executor, limit):
+        function, after = self.tasks[name]
+        
+        try:
+            try:
+                await asyncio.gather(*(pending[dependency] for dependency in after))
+            except Exception:
+                self.skipped.append(name)
+                raise
+            
+            async with limit:
+                loop = asyncio.get_running_loop()
+                # Phases are blocking (git, torch, SQLite); each runs on its own thread with the caller's context
+                self.results[name] = await loop.run_in_executor(executor, _bind(name, function))
+            return self.results[name]
+        finally:
+            self.finished[name].set()
+    
+    async def run(self):
+        workers = self.concurrency or len(self.tasks) or 1
+        limit = asyncio.Semaphore(workers)
+        pending = {}
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="phase") as executor:
+            for name in self.tasks:
+                pending[name] = asyncio.ensure_future(self._run_task(name, pending, executor, limit))
+            
+            outcomes = await asyncio.gather(*pending.values(), return_exceptions=True)
+        
+        for name, outcome in zip(pending, outcomes):
+            if isinstance(outcome, BaseException) and name not in self.skipped:
+                self.errors[name] = outcome
+        
+        if self.errors:
+            name, error = next(iter(self.errors.items()))
+            raise RuntimeError(f"Pipeline task {name} failed" + (f" (skipped: {', '.join(self.skipped)})" if self.skipped else "")) from error
+        
+        return self.results
+    
+    def run_sync(self):
+        return asyncio.run(self.run())
+
+
+def _bind(name, function):
+    context = contextvars.copy_context()
+    
+    def call():
+        # Named after the task so the timeline trace shows one row per pipeline task
+        thread = threading.current_thread()
+        previous, thread.name = thread.name, name
+        try:
+            return context.run(function)
+        finally:
+            thread.name = previous
+    return call
@@ -0,0 +1,82 @@
+import re
+from pathlib import PurePosixPath
+from config import VENDORED_DIRS, TRIVIAL_MAX_LINES, MINIFIED_MIN_LINE_LENGTH
+
+
+# Only headers that generators actually write; a bare "do not edit" also shows up in hand-written config code
+GENERATED_MARKERS = re.compile(
+    r"@generated\b|^\s*(?:#|//|/?\*)\s*Code generated .* DO NOT EDIT\.|"
+    r"Generated by the protocol buffer compiler\.\s+DO NOT EDIT!",
+    re.MULTILINE
+)
+
+COMMENT_PREFIXES = ("#", "//", '"""', "'''")
+
+STATEMENT_PATTERN = re.compile(
+    r"^(?:import\s|from\s+\S+\s+import\s|#include\s|using\s|package\s|require\(|export\s+\*|__all__\s*=)"
+)
+
+
+def _significant_lines(code):
+    lines = []
+    in_docstring = None
+    in_block = False
+    
+    for raw_line in code.splitlines():
+        line = raw_line.strip()
+        
+        # " * text" is a comment only inside /* ... */; elsewhere "*p = x;" is a pointer dereference
+        if in_block:
+            in_block = "*/" not in line
+            continue
+        
+        if in_docstring:
+            if in_docstring in line:
+                in_docstring = None
+            continue
+        
+        if line.startswith(('"""', "'''")):
+            quote = line[:3]
+            if line.count(quote) == 1:
+                in_docstring = quote
+            continue
+        
+        if line.startswith("/*"):
+            in_block = "*/" not in line[2:]
+            continue
+        
+        if line and (STATEMENT_PATTERN.match(line) or not line.startswith(COMMENT_PREFIXES)):
+            lines.append(line)
+    
+    return lines
+
+
+def classify(path, code):
+    parts = PurePosixPath(path).parts
+    name = parts[-1]
+    
+    vendored = next((part for part in parts[:-1] if part in VENDORED_DIRS), None)
+    if vendored is not None:
+        return f"Vendored third-party file {name} (under {vendored}/); not part of the project's own design."
+    
+    if GENERATED_MARKERS.search(code[:2000]):
+        return f"Generated source file {name}; produced by a code generator rather than written by hand."
+    
+    lines = code.splitlines()
+    if lines and len(code) / len(lines) >= MINIFIED_MIN_LINE_LENGTH:
+        return f"Minified or bundled file {name}; contains machine-compacted code."
+    
+    significant = _significant_lines(code)
+    
+    if not significant:
+        return f"File {name} contains only comments or docstrings and no code."
+    
+    if all(STATEMENT_PATTERN.match(line) or line.startswith(")") or line.endswith(",") for line in significant):
+        if name == "__init__.py":
+            return f"Package initializer for {parts[-2] if len(parts) > 1 else 'the root package'} that only imports and re-exports names."
+        return f"File {name} only imports or re-exports other modules."
+    
+    if len(significant) <= TRIVIAL_MAX_LINES and name == "__init__.py":
+        return f"Package initializer for {parts[-2] if len(parts) > 1 else 'the root package'} with minimal setup code."
+    
+    return None
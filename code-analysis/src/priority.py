@@ -0,0 +1,121 @@
+import math
+import re
+from collections import defaultdict
+from pathlib import Path, PurePosixPath
+from config import PRIORITY_WEIGHTS, PRIORITY_PAGERANK_ITERATIONS
+
+DURATION = re.compile(r"(\d+(?:\.\d+)?)([hms]?)")
+DURATION_UNITS = {"h": 3600, "m": 60, "s": 1, "": 1}
+PAGERANK_DAMPING = 0.85
+
+
+def parse_duration(text):
+    # "20m", "1h30m", "90s" or plain seconds
+    text = text.strip().lower().replace(" ", "")
+    matches = list(DURATION.finditer(text))
+    if not text or "".join(match.group(0) for match in matches) != text:
+        raise ValueError(f"Invalid duration: {text!r} (use e.g. 20m, 1h30m or 90s)")
+    return sum(float(value) * DURATION_UNITS[unit] for value, unit in (match.groups() for match in matches))
+
+
+def _module_names(path):
+    parts = list(PurePosixPath(path).with_suffix("").parts)
+    if parts and parts[-1] == "__init__":
+        parts = parts[:-1]
+    # Every dotted suffix, so "src/pkg/mod.py" answers to "pkg.mod" and to script-style "mod"
+    return [".".join(parts[i:]) for i in range(len(parts))]
+
+
+def _shared_parts(a, b):
+    count = 0
+    for left, right in zip(PurePosixPath(a).parts, PurePosixPath(b).parts):
+        if left != right:
+            break
+        count += 1
+    return count
+
+
+class ImportanceScorer:
+    def __init__(self, repo_path, symbol_index, weights=PRIORITY_WEIGHTS):
+        self.repo_path = Path(repo_path)
+        self.weights = weights
+        self.modules = defaultdict(list)
+        for path in symbol_index.files:
+            for name in _module_names(path):
+                self.modules[name].append(path)
+        
+        self.imports = defaultdict(set)
+        for name, importers in symbol_index.importers.items():
+            for importer in importers:
+                target = self._resolve(importer, name)
+                if target is not None and target != importer:
+                    self.imports[target].add(importer)
+        
+        self.package_importers = defaultdict(set)
+        for target, importers in self.imports.items():
+            package = str(PurePosixPath(target).parent)
+            self.package_importers[package].update(importer for importer in importers if str(PurePosixPath(importer).parent) != package)
+        
+        self.centrality = self._pagerank(list(symbol_index.files))
+    
+    def _resolve(self, importer, name):
+        if name.startswith("."):
+            level = len(name) - len(name.lstrip("."))
+            package = list(PurePosixPath(importer).parent.parts)
+            package = package[:len(package) - (level - 1)] if level > 1 else package
+            name = ".".join(package + [part for part in name.lstrip(".").split(".") if part])
+        
+        # "pkg.mod.Class" and "pkg.mod.function" come from from-imports; drop names until a module matches
+        parts = name.split(".")
+        while parts:
+            candidates = self.modules.get(".".join(parts))
+            if candidates:
+                return max(candidates, key=lambda candidate: _shared_parts(importer, candidate))
+            parts.pop()
+        return None
+    
+    def _pagerank(self, paths):
+        if not paths:
+            return {}
+        
+        count = len(paths)
+        outgoing = defaultdict(list)
+        for target, importers in self.imports.items():
+            for importer in importers:
+                outgoing[importer].append(target)
+        
+        rank = dict.fromkeys(paths, 1.0 / count)
+        for _ in range(PRIORITY_PAGERANK_ITERATIONS):
+            dangling = sum(rank[path] for path in paths if path not in outgoing)
+            base = (1 - PAGERANK_DAMPING) / count + PAGERANK_DAMPING * dangling / count
+            following = dict.fromkeys(paths, base)
+            for importer, targets in outgoing.items():
+                share = PAGERANK_DAMPING * rank[importer] / len(targets)
+                for target in targets:
+                    following[target] += share
+            rank = following
+        
+        # Scaled so an average module scores 1.0 whatever the repository size
+        return {path: value * count for path, value in rank.items()}
+    
+    def score(self, file_path):
+        path = str(Path(file_path).relative_to(self.repo_path))
+        try:
+            size = Path(file_path).stat().st_size
+        except OSError:
+            size = 0
+        
+        return (
+            self.weights["importers"] * math.log1p(len(self.imports.get(path, ())))
+            + self.weights["centrality"] * math.log1p(self.centrality.get(path, 0.0))
+            + self.weights["package"] * math.log1p(len(self.package_importers.get(str(PurePosixPath(path).parent), ())))
+            + self.weights["size"] * math.log1p(size / 1024)
+        )
+    
+    def order(self, source_files):
+        scores = {file_path: self.score(file_path) for file_path in source_files}
+        # Stable sort keeps walk order among equally scored files (e.g. a non-Python repository's same-size files)
+        return sorted(source_files, key=lambda file_path: -scores[file_path])
+    
+    def importers(self, file_path):
+        return len(self.imports.get(str(Path(file_path).relative_to(self.repo_path)), ()))
@@ -1,28 +1,114 @@
 import subprocess
-import os
+import hashlib
+import re
 import shutil
 from pathlib import Path
+from config import REPO_CACHE_DIR, SUPPORTED_EXTENSIONS, DOC_PATTERNS
 
 
 class RepositoryManager:
-    def __init__(self, target_dir="./target_repo"):
+    def __init__(self, target_dir="./target_repo", cache_dir=REPO_CACHE_DIR, use_cache=True, sparse=False):
         self.target_dir = Path(target_dir)
+        self.cache_dir = Path(cache_dir)
+        self.use_cache = use_cache
+        self.sparse = sparse
+        self.mirror_dir = None
     
-    def clone(self, repo_url):
+    @staticmethod
+    def _git(*args, cwd=None):
+        result = subprocess.run(
+            ["git", *args],
+            cwd=cwd,
+            check=True,
+            capture_output=True,
+            text=True
+        )
+        return result.stdout.strip()
+    
+    def mirror_path(self, repo_url):
+        name = re.sub(r"[^A-Za-z0-9._-]", "_", repo_url.rstrip("/").split("/")[-1])
+        digest = hashlib.sha256(repo_url.encode('utf-8')).hexdigest()[:16]
+        if not name.endswith(".git"):
+            name += ".git"
+        return self.cache_dir / f"{digest}-{name}"
+    
+    def sparse_patterns(self):
+        patterns = [f"*{extension}" for extension in sorted(SUPPORTED_EXTENSIONS)]
+        return patterns + list(DOC_PATTERNS)
+    
+    def _update_mirror(self, repo_url):
+        mirror_dir = self.mirror_path(repo_url)
+        
+        if mirror_dir.exists():
+            self._limit_refs(mirror_dir)
+            self._git("fetch", "--prune", "--quiet", "origin", cwd=mirror_dir)
+        else:
+            mirror_dir.parent.mkdir(parents=True, exist_ok=True)
+            filter_args = ["--filter=blob:none"] if self.sparse else []
+            self._git("clone", "--bare", "--quiet", *filter_args, repo_url, str(mirror_dir))
+            self._limit_refs(mirror_dir)
+        
+        return mirror_dir
+    
+    def _limit_refs(self, mirror_dir):
+        # Only branches and tags: a --mirror refspec (refs/*) would also fetch every refs/pull/* head on GitHub
+        self._git("config", "remote.origin.mirror", "false", cwd=mirror_dir)
+        self._git("config", "--replace-all", "remote.origin.fetch", "+refs/heads/*:refs/heads/*", cwd=mirror_dir)
+        self._git("config", "--add", "remote.origin.fetch", "+refs/tags/*:refs/tags/*", cwd=mirror_dir)
+    
+    def _is_worktree_of(self, mirror_dir):
+        if not (self.target_dir / ".git").is_file():
+            return False
+        
+        try:
+            common_dir = self._git("rev-parse", "--path-format=absolute", "--git-common-dir", cwd=self.target_dir)
+        except subprocess.CalledProcessError:
+            return False
+        
+        return Path(common_dir).resolve() == mirror_dir.resolve()
+    
+    def _checkout(self, mirror_dir):
+        commit = self._git("rev-parse", "HEAD", cwd=mirror_dir)
+        
+        if self._is_worktree_of(mirror_dir):
+            self._git("checkout", "--force", "--detach", commit, cwd=self.target_dir)
+            self._git("clean", "-fdxq", cwd=self.target_dir)
+            return
+        
         if self.target_dir.exists():
             shutil.rmtree(self.target_dir)
+        self._git("worktree", "prune", cwd=mirror_dir)
         
-        self.target_dir.mkdir(parents=True, exist_ok=True)
+        if self.sparse:
+            self._git("worktree", "add", "--no-checkout", "--detach", str(self.target_dir.resolve()), commit, cwd=mirror_dir)
+            self._git("sparse-checkout", "set", "--no-cone", *self.sparse_patterns(), cwd=self.target_dir)
+            self._git("checkout", "--detach", commit, cwd=self.target_dir)
+        else:
+            self._git("worktree", "add", "--detach", str(self.target_dir.resolve()), commit, cwd=mirror_dir)
+    
+    def clone(self, repo_url):
+        if not self.use_cache:
+            if self.target_dir.exists():
+                shutil.rmtree(self.target_dir)
+            
+            self.target_dir.mkdir(parents=True, exist_ok=True)
+            
+            subprocess.run(
+                ["git", "clone", "--depth", "1", repo_url, str(self.target_dir)],
+                check=True,
+                capture_output=True
+            )
+            
+            return self.target_dir
         
-        subprocess.run(
-            ["git", "clone", "--depth", "1", repo_url, str(self.target_dir)],
-            check=True,
-            capture_output=True
-        )
+        self.mirror_dir = self._update_mirror(repo_url)
+        self._checkout(self.mirror_dir)
         
         return self.target_dir
     
     def cleanup(self):
+        if self.mirror_dir is not None and self._is_worktree_of(self.mirror_dir):
+            self._git("worktree", "remove", "--force", str(self.target_dir.resolve()), cwd=self.mirror_dir)
+        
         if self.target_dir.exists():
             shutil.rmtree(self.target_dir)
-
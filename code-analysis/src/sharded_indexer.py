@@ -0,0 +1,273 @@
+import hashlib
+import multiprocessing
+import os
+import queue
+import time
+import traceback
+from collections import defaultdict
+from pathlib import Path
+from summary_store import SummaryStore
+from stopping import decoding_report
+from config import (
+    CPU_THREADS,
+    MAX_FILE_SIZE_BYTES,
+    SHARD_TASK_FILES,
+    SUMMARIES_FILE,
+    SUMMARIES_STORE_FILE,
+    SUMMARY_BATCH_SIZE,
+    SUMMARY_PREFILTER
+)
+
+
+def _worker(worker_id, options, tasks, results):
+    totals = {"prompt_tokens": 0, "generated_tokens": 0, "llm_seconds": 0.0, "llm_calls": 0, "load_seconds": 0.0}
+    
+    try:
+        from llm_manager import LLMManager
+        from indexer import CodeIndexer
+        from metrics import RunMetrics
+        from summary_cache import SummaryCache
+        
+        load_start = time.perf_counter()
+        llm_manager = LLMManager()
+        llm_manager.load_model(use_server=False, **options["load_options"])
+        llm_manager.metrics = RunMetrics()
+        totals["load_seconds"] = time.perf_counter() - load_start
+        
+        cache = SummaryCache() if options["use_cache"] else None
+        indexer = CodeIndexer(
+            options["repo_path"],
+            llm_manager,
+            batch_size=options["batch_size"],
+            cache=cache,
+            store_path=options["store_path"],
+            prefilter=options["prefilter"]
+        )
+        
+        while True:
+            task = tasks.get()
+            # Past the deadline the remaining tasks stay queued for a --resume run
+            if task is None or (options["deadline"] is not None and time.time() >= options["deadline"]):
+                break
+            
+            start = time.perf_counter()
+            cache_hits = cache.hits if cache is not None else 0
+            indexer.generate_summaries([Path(path) for path in task], show_progress=False, append=True, deadline=options["deadline"])
+            
+            results.put(("task", worker_id, {
+                "files": indexer.completed,
+                "expired": indexer.expired,
+                "seconds": time.perf_counter() - start,
+                "stage_times": indexer.stage_times,
+                "decoding": indexer.decoding,
+                "skipped": indexer.skipped,
+                "cache_hits": (cache.hits if cache is not None else 0) - cache_hits
+            }))
+        
+        for entry in llm_manager.metrics.phases.values():
+            for key in ("prompt_tokens", "generated_tokens", "llm_seconds", "llm_calls"):
+                totals[key] += entry[key]
+    except BaseException:
+        results.put(("error", worker_id, traceback.format_exc()))
+    finally:
+        results.put(("exit", worker_id, totals))
+
+
+class ShardedIndexer:
+    def __init__(self, repo_path, workers, batch_size=SUMMARY_BATCH_SIZE, use_cache=True, prefilter=SUMMARY_PREFILTER,
+                 load_options=None, task_files=SHARD_TASK_FILES, store_path=None, keep_order=False):
+        self.repo_path = Path(repo_path)
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.use_cache = use_cache
+        self.prefilter = prefilter
+        self.load_options = dict(load_options or {})
+        self.task_files = max(1, task_files)
+        self.keep_order = keep_order
+        self.store = SummaryStore(store_path or self.repo_path.parent / SUMMARIES_STORE_FILE)
+        self.skipped = {"duplicate": 0, "trivial": 0}
+        self.cache_hits = 0
+        self.completed = 0
+        self.expired = False
+        self.files_per_second = 0.0
+        self.stage_times = {"read": 0.0, "tokenize": 0.0, "queue_wait": 0.0, "generate": 0.0}
+        self.decoding = {"baseline": 0, "budget": 0, "steps": 0}
+        self.worker_stats = []
+        self.errors = []
+    
+    def _tasks(self, source_files):
+        sizes = {}
+        for file_path in source_files:
+            try:
+                sizes[file_path] = file_path.stat().st_size
+            except OSError:
+                sizes[file_path] = 0
+        
+        # Largest files first so the slow ones start early and small tasks fill in the tail,
+        # unless the files come already ranked by importance
+        ordered = list(source_files) if self.keep_order else sorted(source_files, key=sizes.get, reverse=True)
+        
+        tasks, task = [], []
+        for group in self._duplicate_groups(ordered, sizes):
+            task.extend(str(path) for path in group)
+            if len(task) >= self.task_files:
+                tasks.append(task)
+                task = []
+        if task:
+            tasks.append(task)
+        return tasks
+    
+    def _duplicate_groups(self, ordered, sizes):
+        # Identical files share a task: the indexer deduplicates within one generate_summaries call,
+        # so a copy sent to another task (or worker) would be summarized again. Only sizes seen twice need hashing
+        by_size = defaultdict(int)
+        for file_path in ordered:
+            by_size[sizes[file_path]] += 1
+        
+        groups = {}
+        for file_path in ordered:
+            key = file_path
+            if by_size[sizes[file_path]] > 1 and 0 < sizes[file_path] <= MAX_FILE_SIZE_BYTES:
+                try:
+                    key = (sizes[file_path], hashlib.sha256(file_path.read_bytes()).hexdigest())
+                except OSError:
+                    pass
+            groups.setdefault(key, []).append(file_path)
+        
+        # In order of each group's first file
+        return groups.values()
+    
+    def _worker_options(self, worker_id, deadline):
+        load_options = dict(self.load_options)
+        if not load_options.get("threads"):
+            load_options["threads"] = CPU_THREADS or max(1, (os.cpu_count() or 1) // self.workers)
+        
+        return {
+            "repo_path": str(self.repo_path),
+            "store_path": str(self.store.path),
+            "batch_size": self.batch_size,
+            "use_cache": self.use_cache,
+            "prefilter": self.prefilter,
+            "deadline": deadline,
+            "load_options": load_options
+        }
+    
+    def _collect(self, processes, results, total, show_progress):
+        exited = set()
+        
+        while len(exited) < len(processes):
+            try:
+                kind, worker_id, payload = results.get(timeout=1.0)
+            except queue.Empty:
+                for worker_id, process in enumerate(processes):
+                    if worker_id not in exited and not process.is_alive():
+                        self.errors.append(f"Worker {worker_id} exited with code {process.exitcode}")
+                        exited.add(worker_id)
+                continue
+            
+            stats = self.worker_stats[worker_id]
+            
+            if kind == "task":
+                self.completed += payload["files"]
+                self.expired = self.expired or payload["expired"]
+                stats["files"] += payload["files"]
+                stats["seconds"] += payload["seconds"]
+                self.cache_hits += payload["cache_hits"]
+                for stage, seconds in payload["stage_times"].items():
+                    self.stage_times[stage] += seconds
+                for key, count in payload["decoding"].items():
+                    self.decoding[key] += count
+                for reason, count in payload["skipped"].items():
+                    self.skipped[reason] += count
+                
+                if show_progress:
+                    print(f"\r[{self.completed}/{total}] worker {worker_id} finished {payload['files']} files" + " " * 20, end="", flush=True)
+            elif kind == "error":
+                self.errors.append(f"Worker {worker_id} failed:\n{payload}")
+            else:
+                stats.update(payload)
+                exited.add(worker_id)
+        
+        for process in processes:
+            process.join()
+    
+    def generate_summaries(self, source_files, show_progress=True, resume=False, deadline=None):
+        if resume:
+            done_paths = self.store.completed_paths()
+            source_files = [f for f in source_files if str(f.relative_to(self.repo_path)) not in done_paths]
+            if show_progress:
+                print(f"Resuming: {len(done_paths)} files already summarized in {self.store.path}")
+        
+        # Workers upsert into the shared store (WAL allows one writer at a time, readers never block)
+        with self.store.open():
+            pass
+        
+        total = len(source_files)
+        tasks = self._tasks(source_files)
+        self.worker_stats = [{"worker": worker_id, "files": 0, "seconds": 0.0} for worker_id in range(self.workers)]
+        self.decoding = {key: 0 for key in self.decoding}
+        self.errors = []
+        self.completed = 0
+        self.expired = False
+        
+        if show_progress:
+            print(f"Sharding {total} files into {len(tasks)} tasks across {self.workers} workers")
+        
+        # spawn: forked children would inherit torch thread pools and the tokenizer lock in an unknown state
+        context = multiprocessing.get_context("spawn")
+        task_queue = context.Queue()
+        results = context.Queue()
+        for task in tasks:
+            task_queue.put(task)
+        for _ in range(self.workers):
+            task_queue.put(None)
+        
+        start = time.perf_counter()
+        processes = [
+            context.Process(target=_worker, args=(worker_id, self._worker_options(worker_id, deadline), task_queue, results), daemon=True)
+            for worker_id in range(self.workers)
+        ]
+        for process in processes:
+            process.start()
+        
+        self._collect(processes, results, total, show_progress)
+        # Tasks left behind by workers that ran out of time must not keep the queue's feeder thread alive
+        task_queue.cancel_join_thread()
+        # Workers that found the deadline passed before taking a task report nothing
+        self.expired = self.expired or (deadline is not None and self.completed < total and not self.errors)
+        
+        elapsed = time.perf_counter() - start
+        self.files_per_second = self.completed / elapsed if elapsed > 0 else 0.0
+        
+        if show_progress:
+            print(f"\r[{self.completed}/{total}] Done in {elapsed:.1f}s ({self.files_per_second:.2f} files/sec)" + " " * 40)
+            if self.expired:
+                print(f"Time budget reached: {total - self.completed} files left unsummarized (rerun with --resume to continue)")
+            for stats in self.worker_stats:
+                rate = stats["files"] / stats["seconds"] if stats["seconds"] > 0 else 0.0
+                print(
+                    f"  worker {stats['worker']}: {stats['files']} files in {stats['seconds']:.1f}s "
+                    f"({rate:.2f} files/sec, model load {stats.get('load_seconds', 0.0):.1f}s)"
+                )
+            if self.decoding["baseline"]:
+                print(decoding_report(self.decoding))
+            print(
+                f"LLM summaries avoided: {self.llm_calls_avoided()} "
+                f"({self.skipped['duplicate']} duplicates, {self.skipped['trivial']} trivial/generated, {self.cache_hits} cached)"
+            )
+            print()
+        
+        if not (resume or self.expired or self.errors):
+            with self.store.open():
+                self.store.retain(str(file_path.relative_to(self.repo_path)) for file_path in source_files)
+        
+        if self.errors:
+            raise RuntimeError(f"{len(self.errors)} indexing worker(s) failed; rerun with --resume to finish:\n" + "\n".join(self.errors))
+        
+        return self.store.path
+    
+    def llm_calls_avoided(self):
+        return self.skipped["duplicate"] + self.skipped["trivial"] + self.cache_hits
+    
+    def save_summaries(self, output_path=None):
+        return self.store.save_json(output_path or self.repo_path.parent / SUMMARIES_FILE)
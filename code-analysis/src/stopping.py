@@ -0,0 +1,81 @@
+import re
+from config import SUMMARY_MAX_NEW_TOKENS, SUMMARY_MIN_NEW_TOKENS
+
+SENTENCE_END = re.compile(r"[.!?](?=\s)")
+ABBREVIATIONS = re.compile(r"\b(?:e\.g|i\.e|etc|vs|cf)$", re.IGNORECASE)
+DEFINITION = re.compile(r"^\s*(?:async\s+def|def|class|function|func|fn|interface|struct|enum|(?:public|private|protected|static)\s)", re.MULTILINE)
+
+
+class StopRule:
+    def __init__(self, max_sentences=None, stop_sequences=()):
+        self.max_sentences = max_sentences
+        self.stop_sequences = [sequence for sequence in stop_sequences or () if sequence]
+    
+    @property
+    def active(self):
+        return bool(self.max_sentences or self.stop_sequences)
+    
+    def _cut(self, text):
+        cut = None
+        # Completions often open with a blank line; stop sequences and sentence ends only count after the first word
+        start = len(text) - len(text.lstrip())
+        
+        for sequence in self.stop_sequences:
+            position = text.find(sequence, start)
+            if position >= 0 and (cut is None or position < cut):
+                cut = position
+        
+        if self.max_sentences:
+            sentences = 0
+            # A terminator only counts once the following whitespace shows it is not part of "os.path" or "1.5"
+            for match in SENTENCE_END.finditer(text, start):
+                if ABBREVIATIONS.search(text, 0, match.start()):
+                    continue
+                sentences += 1
+                if sentences == self.max_sentences:
+                    if cut is None or match.end() < cut:
+                        cut = match.end()
+                    break
+        
+        return cut
+    
+    def done(self, text):
+        return self._cut(text) is not None
+    
+    def trim(self, text):
+        cut = self._cut(text)
+        return (text[:cut] if cut is not None else text).strip()
+
+
+def stopping_criteria(rules, tokenizer, prompt_length):
+    import torch
+    from transformers import StoppingCriteria, StoppingCriteriaList
+    
+    class TextStoppingCriteria(StoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs):
+            return torch.tensor(
+                [
+                    rule.active and rule.done(tokenizer.decode(ids[prompt_length:], skip_special_tokens=True))
+                    for rule, ids in zip(rules, input_ids)
+                ],
+                dtype=torch.bool,
+                device=input_ids.device
+            )
+    
+    return StoppingCriteriaList([TextStoppingCriteria()])
+
+
+def summary_budget(code_content, max_tokens=SUMMARY_MAX_NEW_TOKENS, min_tokens=SUMMARY_MIN_NEW_TOKENS):
+    # Three sentences about a small module fit in the minimum; each definition and ~25 lines earn a few more tokens
+    definitions = len(DEFINITION.findall(code_content))
+    lines = sum(1 for line in code_content.splitlines() if line.strip())
+    return max(min_tokens, min(max_tokens, min_tokens + 4 * definitions + lines // 25))
+
+
+def decoding_report(decoding):
+    # baseline is every row decoding SUMMARY_MAX_NEW_TOKENS; budget is what the adaptive budgets allowed
+    saved = decoding["baseline"] - decoding["steps"]
+    return (
+        f"Decode steps: {decoding['steps']} of {decoding['baseline']} ({saved} saved: "
+        f"{decoding['baseline'] - decoding['budget']} by adaptive budgets, {decoding['budget'] - decoding['steps']} by stop criteria/EOS)"
+    )
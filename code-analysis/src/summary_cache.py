@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from config import (
+    MODEL_NAME,
+    SUMMARY_PROMPT_TEMPLATE,
+    CHUNK_PROMPT_TEMPLATE,
+    REDUCE_PROMPT_TEMPLATE,
+    SUMMARY_CACHE_DIR,
+    SUMMARY_CACHE_MAX_AGE_DAYS,
+    SUMMARY_CACHE_MAX_MB
+)
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class SummaryCache:
+    def __init__(self, cache_dir=SUMMARY_CACHE_DIR, model_name=MODEL_NAME,
+                 prompt_template=SUMMARY_PROMPT_TEMPLATE + CHUNK_PROMPT_TEMPLATE + REDUCE_PROMPT_TEMPLATE):
+        self.cache_dir = Path(cache_dir)
+        self.model_name = model_name
+        self.prompt_hash = content_hash(prompt_template)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+    
+    def key(self, code_hash):
+        return content_hash(f"{code_hash}:{self.model_name}:{self.prompt_hash}")
+    
+    def _entry_path(self, key):
+        return self.cache_dir / key[:2] / f"{key}.json"
+    
+    def get(self, code_hash):
+        entry_path = self._entry_path(self.key(code_hash))
+        
+        try:
+            with open(entry_path, 'r', encoding='utf-8') as f:
+                summary = json.load(f)["summary"]
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self.misses += 1
+            return None
+        
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        
+        with self._lock:
+            self.hits += 1
+        return summary
+    
+    def put(self, code_hash, summary):
+        entry_path = self._entry_path(self.key(code_hash))
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        tmp_path = entry_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"model": self.model_name, "summary": summary}, f, ensure_ascii=False)
+        os.replace(tmp_path, entry_path)
+    
+    def _entries(self):
+        if not self.cache_dir.exists():
+            return []
+        
+        entries = []
+        for entry_path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = entry_path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry_path))
+        
+        return entries
+    
+    def evict(self, max_age_days=SUMMARY_CACHE_MAX_AGE_DAYS, max_mb=SUMMARY_CACHE_MAX_MB):
+        entries = sorted(self._entries(), key=lambda entry: entry[0], reverse=True)
+        cutoff = time.time() - max_age_days * 86400 if max_age_days is not None else None
+        max_bytes = max_mb * 1024 * 1024 if max_mb is not None else None
+        
+        kept_bytes = 0
+        removed = 0
+        
+        for mtime, size, entry_path in entries:
+            expired = cutoff is not None and mtime < cutoff
+            oversized = max_bytes is not None and kept_bytes + size > max_bytes
+            
+            if expired or oversized:
+                try:
+                    entry_path.unlink()
+                    removed += 1
+                except OSError:
+                    pass
+            else:
+                kept_bytes += size
+        
+        return removed
+    
+    def stats(self):
+        entries = self._entries()
+        return {
+            "entries": len(entries),
+            "size_bytes": sum(size for _, size, _ in entries),
+            "hits": self.hits,
+            "misses": self.misses
+        }
@@ -0,0 +1,188 @@
+import json
+import sqlite3
+import time
+from pathlib import Path
+from config import MODEL_NAME, LLM_API_MODEL, LLM_BACKEND
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS summaries (
+    path TEXT PRIMARY KEY,
+    code_hash TEXT,
+    model TEXT,
+    summary TEXT,
+    seconds REAL,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS summaries_code_hash ON summaries (code_hash);
+CREATE TABLE IF NOT EXISTS directories (
+    path TEXT PRIMARY KEY,
+    subtree_hash TEXT,
+    model TEXT,
+    summary TEXT,
+    seconds REAL,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS directories_subtree_hash ON directories (subtree_hash);
+"""
+
+# REPLACE rather than ON CONFLICT UPDATE: a rewritten row gets a new rowid, so read_new() streams it again
+UPSERT = """
+REPLACE INTO summaries (path, code_hash, model, summary, seconds, updated_at)
+VALUES (:path, :code_hash, :model, :summary, :seconds, :updated_at)
+"""
+
+UPSERT_DIRECTORY = """
+INSERT INTO directories (path, subtree_hash, model, summary, seconds, updated_at)
+VALUES (:path, :subtree_hash, :model, :summary, :seconds, :updated_at)
+ON CONFLICT (path) DO UPDATE SET
+    subtree_hash = excluded.subtree_hash,
+    model = excluded.model,
+    summary = excluded.summary,
+    seconds = excluded.seconds,
+    updated_at = excluded.updated_at
+"""
+
+BUSY_TIMEOUT_SECONDS = 60.0
+
+
+def _prefix_end(prefix):
+    # Smallest string greater than every string starting with prefix, so the range scan uses the primary key
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class SummaryStore:
+    def __init__(self, path, model_name=None):
+        self.path = Path(path)
+        self.model_name = model_name or ((LLM_API_MODEL or MODEL_NAME) if LLM_BACKEND == "openai" else MODEL_NAME)
+        self._connection = None
+    
+    def _connect(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_SECONDS, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(SCHEMA)
+        return connection
+    
+    def open(self):
+        # Nothing is cleared here: a run that stops early (time budget, crash) must not lose the previous run's rows
+        self._connection = self._connect()
+        return self
+    
+    def append(self, records):
+        now = time.time()
+        rows = [
+            {
+                "path": record["path"],
+                "code_hash": record.get("code_hash"),
+                "model": record.get("model", self.model_name),
+                "summary": record["summary"],
+                "seconds": record.get("seconds"),
+                "updated_at": now
+            }
+            for record in records
+        ]
+        
+        # One short transaction per call keeps the write lock free for other indexer processes
+        with self._connection:
+            self._connection.executemany(UPSERT, rows)
+    
+    def append_directories(self, records, keep_paths=None):
+        now = time.time()
+        rows = [
+            {
+                "path": record["path"],
+                "subtree_hash": record["subtree_hash"],
+                "model": record.get("model", self.model_name),
+                "summary": record["summary"],
+                "seconds": record.get("seconds"),
+                "updated_at": now
+            }
+            for record in records
+        ]
+        
+        with self._connection:
+            self._connection.executemany(UPSERT_DIRECTORY, rows)
+            if keep_paths is not None:
+                # Directories that no longer hold any summarized file
+                stale = [(row[0],) for row in self._connection.execute("SELECT path FROM directories") if row[0] not in keep_paths]
+                self._connection.executemany("DELETE FROM directories WHERE path = ?", stale)
+    
+    def retain(self, paths):
+        # After a complete fresh pass, drop rows of files that are no longer among the sources
+        with self._connection:
+            self._connection.execute("CREATE TEMP TABLE IF NOT EXISTS retained (path TEXT PRIMARY KEY)")
+            self._connection.execute("DELETE FROM retained")
+            self._connection.executemany("INSERT OR IGNORE INTO retained (path) VALUES (?)", ((path,) for path in paths))
+            self._connection.execute("DELETE FROM summaries WHERE path NOT IN (SELECT path FROM retained)")
+    
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def _query(self, sql, params=()):
+        if not self.path.exists():
+            return
+        
+        # Readers use their own connection; under WAL they see the last commit without blocking the writer
+        connection = sqlite3.connect(f"{self.path.resolve().as_uri()}?mode=ro", uri=True, timeout=BUSY_TIMEOUT_SECONDS)
+        connection.row_factory = sqlite3.Row
+        try:
+            for row in connection.execute(sql, params):
+                yield dict(row)
+        finally:
+            connection.close()
+    
+    def read(self, prefix=""):
+        if prefix:
+            yield from self._query("SELECT * FROM summaries WHERE path >= ? AND path < ? ORDER BY path", (prefix, _prefix_end(prefix)))
+        else:
+            yield from self._query("SELECT * FROM summaries ORDER BY path")
+    
+    def read_new(self, after_rowid=0, since=0.0):
+        # Rows committed after after_rowid by a run that started at since; rowids grow in commit order
+        yield from self._query(
+            "SELECT rowid, * FROM summaries WHERE rowid > ? AND updated_at >= ? ORDER BY rowid",
+            (after_rowid, since)
+        )
+    
+    def read_directories(self, prefix=""):
+        if prefix:
+            yield from self._query("SELECT * FROM directories WHERE path >= ? AND path < ? ORDER BY path", (prefix, _prefix_end(prefix)))
+        else:
+            yield from self._query("SELECT * FROM directories ORDER BY path")
+    
+    def get(self, path):
+        return next(self._query("SELECT * FROM summaries WHERE path = ?", (path,)), None)
+    
+    def count(self):
+        return next(self._query("SELECT COUNT(*) AS count FROM summaries"), {"count": 0})["count"]
+    
+    def completed_paths(self):
+        # A batch that failed (OOM, lost connection) stored "[Error: ...]" placeholders; --resume retries those files
+        return {row["path"] for row in self._query("SELECT path FROM summaries WHERE summary NOT LIKE '[Error:%'")}
+    
+    def save_json(self, output_path, prefix=""):
+        count = 0
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write("{")
+            for record in self.read(prefix):
+                key = json.dumps(record["path"], ensure_ascii=False)
+                value = json.dumps(record["summary"], ensure_ascii=False)
+                f.write(f"{',' if count else ''}\n  {key}: {value}")
+                count += 1
+            f.write("\n}" if count else "}")
+        
+        return output_path
+    
+    def remove(self):
+        self.close()
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{self.path}{suffix}").unlink(missing_ok=True)
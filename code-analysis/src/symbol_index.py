@@ -0,0 +1,211 @@
+import ast
+import json
+import multiprocessing
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from file_reader import FileReader
+from summary_cache import content_hash
+from config import SYMBOL_CACHE_DIR, SYMBOL_INDEX_WORKERS, SYMBOL_INDEX_VERSION, MAX_FILE_SIZE_BYTES
+
+
+ABSTRACT_BASES = {"ABC", "ABCMeta", "Protocol"}
+
+
+def _dotted_name(node):
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        value = _dotted_name(node.value)
+        return f"{value}.{node.attr}" if value else node.attr
+    if isinstance(node, ast.Call):
+        return _dotted_name(node.func)
+    if isinstance(node, ast.Subscript):
+        return _dotted_name(node.value)
+    return None
+
+
+def _decorators(node):
+    return [name for name in (_dotted_name(decorator) for decorator in node.decorator_list) if name]
+
+
+def _function(node):
+    return {
+        "name": node.name,
+        "line": node.lineno,
+        "decorators": _decorators(node),
+        "async": isinstance(node, ast.AsyncFunctionDef)
+    }
+
+
+def _class(node):
+    bases = [name for name in (_dotted_name(base) for base in node.bases) if name]
+    metaclass = next((_dotted_name(keyword.value) for keyword in node.keywords if keyword.arg == "metaclass"), None)
+    methods = [_function(child) for child in node.body if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef))]
+    
+    abstract = (
+        any(base.split(".")[-1] in ABSTRACT_BASES for base in bases)
+        or (metaclass is not None and metaclass.split(".")[-1] == "ABCMeta")
+        or any(decorator.split(".")[-1] == "abstractmethod" for method in methods for decorator in method["decorators"])
+    )
+    
+    return {
+        "name": node.name,
+        "line": node.lineno,
+        "bases": bases,
+        "metaclass": metaclass,
+        "decorators": _decorators(node),
+        "methods": methods,
+        "abstract": abstract
+    }
+
+
+def parse_symbols(source):
+    tree = ast.parse(source)
+    classes = []
+    functions = []
+    imports = []
+    
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            classes.append(_class(node))
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            functions.append(_function(node))
+    
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            module = "." * node.level + (node.module or "")
+            imports.extend(f"{module}.{alias.name}" if module else alias.name for alias in node.names)
+    
+    return {"classes": classes, "functions": functions, "imports": sorted(set(imports))}
+
+
+def _cache_path(cache_dir, code_hash):
+    key = content_hash(f"{code_hash}:{SYMBOL_INDEX_VERSION}")
+    return Path(cache_dir) / key[:2] / f"{key}.json"
+
+
+def _extract(args):
+    file_path, cache_dir = args
+    
+    try:
+        if os.path.getsize(file_path) > MAX_FILE_SIZE_BYTES:
+            return None, False
+    except OSError:
+        return None, False
+    
+    source = FileReader.read_source_file(file_path)
+    if source is None:
+        return None, False
+    
+    entry_path = _cache_path(cache_dir, content_hash(source)) if cache_dir else None
+    
+    if entry_path is not None:
+        try:
+            with open(entry_path, 'r', encoding='utf-8') as f:
+                return json.load(f), True
+        except (OSError, ValueError):
+            pass
+    
+    try:
+        symbols = parse_symbols(source)
+    except (SyntaxError, ValueError, RecursionError):
+        symbols = None
+    
+    if entry_path is not None:
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = entry_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(symbols, f)
+        os.replace(tmp_path, entry_path)
+    
+    return symbols, False
+
+
+class SymbolIndex:
+    def __init__(self, files=None):
+        self.files = {}
+        self.classes = defaultdict(list)
+        self.functions = defaultdict(list)
+        self.subclasses = defaultdict(list)
+        self.decorated = defaultdict(list)
+        self.importers = defaultdict(list)
+        self.cache_hits = 0
+        
+        for path, symbols in (files or {}).items():
+            self.add(path, symbols)
+    
+    def add(self, path, symbols):
+        self.files[path] = symbols
+        
+        for cls in symbols["classes"]:
+            entry = (path, cls)
+            self.classes[cls["name"]].append(entry)
+            for base in cls["bases"]:
+                self.subclasses[base.split(".")[-1]].append(entry)
+            for decorator in cls["decorators"]:
+                self.decorated[decorator.split(".")[-1]].append(entry)
+        
+        for function in symbols["functions"]:
+            entry = (path, function)
+            self.functions[function["name"]].append(entry)
+            for decorator in function["decorators"]:
+                self.decorated[decorator.split(".")[-1]].append(entry)
+        
+        for module in symbols["imports"]:
+            self.importers[module].append(path)
+    
+    def _collect(self, repo_path, python_files, results):
+        for file_path, (symbols, hit) in zip(python_files, results):
+            if symbols is not None:
+                self.add(str(file_path.relative_to(repo_path)), symbols)
+                self.cache_hits += hit
+    
+    @classmethod
+    def build(cls, repo_path, source_files, cache_dir=SYMBOL_CACHE_DIR, workers=SYMBOL_INDEX_WORKERS):
+        repo_path = Path(repo_path)
+        python_files = [Path(file_path) for file_path in source_files if Path(file_path).suffix == ".py"]
+        jobs = [(str(file_path), str(cache_dir) if cache_dir else None) for file_path in python_files]
+        
+        index = cls()
+        
+        if workers == 1 or len(jobs) < 2:
+            index._collect(repo_path, python_files, map(_extract, jobs))
+        else:
+            chunksize = max(1, len(jobs) // ((workers or os.cpu_count() or 1) * 8))
+            # spawn: the pipeline may be loading torch on another thread, and forking a threaded process can deadlock
+            with ProcessPoolExecutor(max_workers=workers or None, mp_context=multiprocessing.get_context("spawn")) as executor:
+                index._collect(repo_path, python_files, executor.map(_extract, jobs, chunksize=chunksize))
+        
+        return index
+    
+    def descendants(self, class_name):
+        seen = set()
+        result = []
+        pending = [class_name]
+        
+        while pending:
+            for path, cls in self.subclasses.get(pending.pop(), ()):
+                key = (path, cls["name"])
+                if key not in seen:
+                    seen.add(key)
+                    result.append((path, cls))
+                    pending.append(cls["name"])
+        
+        return result
+    
+    def abstract_classes(self):
+        return [(path, cls) for entries in self.classes.values() for path, cls in entries if cls["abstract"]]
+    
+    def save(self, output_path):
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(self.files, f, ensure_ascii=False)
+        return output_path
+    
+    @classmethod
+    def load(cls, index_path):
+        with open(index_path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
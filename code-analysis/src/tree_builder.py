@@ -1,44 +1,122 @@
 import os
+from fnmatch import fnmatchcase
 from pathlib import Path
-from config import SUPPORTED_EXTENSIONS, IGNORE_DIRS
+from config import SUPPORTED_EXTENSIONS, IGNORE_DIRS, DOC_PATTERNS
+from gitignore import GitIgnore
 
 
 class DirectoryTreeBuilder:
-    def __init__(self, root_path):
+    def __init__(self, root_path, respect_gitignore=True, doc_patterns=DOC_PATTERNS):
         self.root_path = Path(root_path)
+        self.respect_gitignore = respect_gitignore
+        self.doc_patterns = list(doc_patterns)
         self.tree_lines = []
         self.source_files = []
+        self.doc_files = []
     
     def build(self):
         self.tree_lines = []
         self.source_files = []
-        self._walk_directory(self.root_path, prefix="")
+        
+        for line, file_path in self._walk():
+            self.tree_lines.append(line)
+            if file_path is not None:
+                self.source_files.append(file_path)
+        
         return "\n".join(self.tree_lines), self.source_files
     
-    def _walk_directory(self, path, prefix="", is_last=True):
-        if path.name in IGNORE_DIRS:
-            return
+    def iter_source_files(self):
+        for _, file_path in self._walk():
+            if file_path is not None:
+                yield file_path
+    
+    def _scan(self, path, relative, gitignore):
+        try:
+            with os.scandir(path) as iterator:
+                entries = list(iterator)
+        except (PermissionError, FileNotFoundError, NotADirectoryError):
+            return None, [], [], []
         
-        connector = "└── " if is_last else "├── "
-        self.tree_lines.append(f"{prefix}{connector}{path.name}/")
+        if self.respect_gitignore:
+            gitignore = gitignore.extend(Path(path), relative)
         
-        try:
-            entries = sorted(path.iterdir(), key=lambda x: (not x.is_dir(), x.name))
-        except PermissionError:
-            return
+        dirs = []
+        files = []
+        docs = []
         
-        dirs = [e for e in entries if e.is_dir() and e.name not in IGNORE_DIRS]
-        files = [e for e in entries if e.is_file() and e.suffix in SUPPORTED_EXTENSIONS]
+        for entry in entries:
+            is_source = is_doc = False
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name in IGNORE_DIRS:
+                        continue
+                    is_dir = True
+                elif entry.is_file():
+                    is_source = os.path.splitext(entry.name)[1] in SUPPORTED_EXTENSIONS
+                    is_doc = any(fnmatchcase(entry.name, pattern) for pattern in self.doc_patterns)
+                    if not (is_source or is_doc):
+                        continue
+                    is_dir = False
+                else:
+                    continue
+            except OSError:
+                continue
+            
+            if gitignore.rules:
+                entry_relative = f"{relative}/{entry.name}" if relative else entry.name
+                if gitignore.is_ignored(entry_relative, is_dir):
+                    continue
+            
+            if is_dir:
+                dirs.append(entry)
+            if is_source:
+                files.append(entry)
+            if is_doc:
+                docs.append(entry)
         
-        extension = "    " if is_last else "│   "
+        dirs.sort(key=lambda entry: entry.name)
+        files.sort(key=lambda entry: entry.name)
+        docs.sort(key=lambda entry: entry.name)
         
-        for i, directory in enumerate(dirs):
-            is_last_dir = (i == len(dirs) - 1) and len(files) == 0
-            self._walk_directory(directory, prefix + extension, is_last_dir)
+        return gitignore, dirs, files, docs
+    
+    def _walk(self):
+        self.doc_files = []
         
-        for i, file in enumerate(files):
-            is_last_file = i == len(files) - 1
-            file_connector = "└── " if is_last_file else "├── "
-            self.tree_lines.append(f"{prefix}{extension}{file_connector}{file.name}")
-            self.source_files.append(file)
-
+        if self.root_path.name in IGNORE_DIRS:
+            return
+        
+        stack = [(str(self.root_path), self.root_path.name, "", "", True, GitIgnore())]
+        
+        while stack:
+            frame = stack.pop()
+            
+            if frame[0] is None:
+                yield from frame[1]
+                continue
+            
+            path, name, relative, prefix, is_last, gitignore = frame
+            
+            connector = "└── " if is_last else "├── "
+            yield f"{prefix}{connector}{name}/", None
+            
+            gitignore, dirs, files, docs = self._scan(path, relative, gitignore)
+            if gitignore is None:
+                continue
+            
+            self.doc_files.extend(Path(entry.path) for entry in docs)
+            
+            extension = "    " if is_last else "│   "
+            
+            if files:
+                file_lines = []
+                for i, entry in enumerate(files):
+                    file_connector = "└── " if i == len(files) - 1 else "├── "
+                    file_lines.append((f"{prefix}{extension}{file_connector}{entry.name}", Path(entry.path)))
+                stack.append((None, file_lines))
+            
+            for i in range(len(dirs) - 1, -1, -1):
+                entry = dirs[i]
+                is_last_dir = (i == len(dirs) - 1) and len(files) == 0
+                entry_relative = f"{relative}/{entry.name}" if relative else entry.name
+                stack.append((entry.path, entry.name, entry_relative, prefix + extension, is_last_dir, gitignore))
@@ -0,0 +1,278 @@
+import json
+import math
+import re
+import zlib
+from pathlib import Path
+import numpy as np
+from chunker import CodeChunker
+from file_reader import FileReader
+from config import (
+    MAX_FILE_SIZE_BYTES,
+    VECTOR_INDEX_CHUNK_WORDS,
+    EMBEDDING_MODEL,
+    EMBEDDING_DIM,
+    VECTOR_INDEX_IVF_THRESHOLD,
+    VECTOR_INDEX_N_PROBE
+)
+
+
+# Acronyms first, so "HTTPServer" splits into HTTP + Server rather than single letters
+TOKEN_PATTERN = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z0-9]+|\d+")
+
+SCAN_BLOCK_ROWS = 65536
+
+
+class HashingEmbedder:
+    def __init__(self, dim=EMBEDDING_DIM):
+        self.dim = dim
+        self.name = "hashing"
+    
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        
+        for row, text in enumerate(texts):
+            for token in TOKEN_PATTERN.findall(text):
+                digest = zlib.crc32(token.lower().encode('utf-8'))
+                vectors[row, digest % self.dim] += 1.0 if digest & 0x80000000 else -1.0
+        
+        vectors = np.sign(vectors) * np.log1p(np.abs(vectors))
+        return _normalize(vectors)
+
+
+class TransformerEmbedder:
+    def __init__(self, model_name, batch_size=32):
+        import torch
+        from transformers import AutoTokenizer, AutoModel
+        
+        self.name = model_name
+        self.batch_size = batch_size
+        self._torch = torch
+        self._device = "cuda" if torch.cuda.is_available() else "cpu"
+        self._tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self._model = AutoModel.from_pretrained(model_name).to(self._device).eval()
+        self.dim = self._model.config.hidden_size
+    
+    def embed(self, texts):
+        torch = self._torch
+        batches = []
+        
+        for i in range(0, len(texts), self.batch_size):
+            inputs = self._tokenizer(
+                texts[i:i + self.batch_size],
+                padding=True,
+                truncation=True,
+                max_length=512,
+                return_tensors="pt"
+            ).to(self._device)
+            
+            with torch.no_grad():
+                hidden = self._model(**inputs).last_hidden_state
+            
+            mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+            batches.append(pooled.float().cpu().numpy())
+        
+        if not batches:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        
+        return _normalize(np.concatenate(batches))
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+def create_embedder(model_name=EMBEDDING_MODEL, dim=EMBEDDING_DIM):
+    if model_name == "hashing":
+        return HashingEmbedder(dim)
+    return TransformerEmbedder(model_name)
+
+
+def _count_words(texts):
+    return [len(text.split()) for text in texts]
+
+
+def iter_records(repo_path, summary_records, chunk_words=VECTOR_INDEX_CHUNK_WORDS):
+    repo_path = Path(repo_path)
+    chunker = CodeChunker(_count_words, chunk_words)
+    
+    for record in summary_records:
+        path = record["path"]
+        summary = record["summary"]
+        
+        if summary and not summary.startswith("["):
+            yield {"path": path, "kind": "summary"}, summary
+        
+        file_path = repo_path / path
+        try:
+            if file_path.stat().st_size > MAX_FILE_SIZE_BYTES:
+                continue
+        except OSError:
+            continue
+        
+        code = FileReader.read_source_file(file_path)
+        if not code or not code.strip():
+            continue
+        
+        line = 1
+        for chunk in chunker.split(code):
+            line_count = chunk.count("\n")
+            yield {"path": path, "kind": "code", "start_line": line, "end_line": line + max(line_count - 1, 0)}, chunk
+            line += line_count
+
+
+def _top_k(scores, k):
+    if len(scores) <= k:
+        order = np.argsort(-scores)
+    else:
+        candidates = np.argpartition(-scores, k)[:k]
+        order = candidates[np.argsort(-scores[candidates])]
+    return order
+
+
+def _spherical_kmeans(sample, n_lists, iterations=10, seed=0):
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), n_lists, replace=False)]
+    
+    for _ in range(iterations):
+        assignments = np.argmax(sample @ centroids.T, axis=1)
+        for cluster in range(n_lists):
+            members = sample[assignments == cluster]
+            if len(members):
+                centroids[cluster] = members.sum(axis=0)
+        centroids = _normalize(centroids)
+    
+    return centroids
+
+
+class VectorIndex:
+    def __init__(self, index_dir, embedder=None):
+        self.index_dir = Path(index_dir)
+        
+        with open(self.index_dir / "index.json", 'r', encoding='utf-8') as f:
+            self.info = json.load(f)
+        
+        self.count = self.info["count"]
+        self.dim = self.info["dim"]
+        # np.memmap refuses a zero-length file; an index over an empty repository answers every search with nothing
+        self.vectors = np.memmap(self.index_dir / "vectors.f32", dtype=np.float32, mode='r', shape=(self.count, self.dim)) if self.count else None
+        self.meta_offsets = np.load(self.index_dir / "meta_offsets.npy", mmap_mode='r')
+        self._meta_file = open(self.index_dir / "meta.jsonl", 'rb')
+        
+        self.centroids = None
+        self.list_offsets = None
+        if self.info["n_lists"]:
+            self.centroids = np.load(self.index_dir / "centroids.npy")
+            self.list_offsets = np.load(self.index_dir / "list_offsets.npy")
+        
+        self.embedder = embedder or create_embedder(self.info["embedder"], self.dim)
+    
+    @classmethod
+    def build(cls, index_dir, records, embedder=None, batch_size=256, n_lists=None):
+        index_dir = Path(index_dir)
+        index_dir.mkdir(parents=True, exist_ok=True)
+        embedder = embedder or create_embedder()
+        
+        raw_path = index_dir / "vectors.raw"
+        count = 0
+        meta_offsets = []
+        
+        with open(raw_path, 'wb') as vectors_file, open(index_dir / "meta.jsonl.raw", 'wb') as meta_file:
+            batch = []
+            
+            def flush():
+                vectors_file.write(embedder.embed([text for _, text in batch]).tobytes())
+                for meta, text in batch:
+                    meta_offsets.append(meta_file.tell())
+                    meta_file.write((json.dumps({**meta, "text": text}, ensure_ascii=False) + "\n").encode('utf-8'))
+                batch.clear()
+            
+            for meta, text in records:
+                batch.append((meta, text))
+                count += 1
+                if len(batch) >= batch_size:
+                    flush()
+            if batch:
+                flush()
+        
+        if n_lists is None:
+            n_lists = int(math.sqrt(count)) if count >= VECTOR_INDEX_IVF_THRESHOLD else 0
+        
+        vectors = np.memmap(raw_path, dtype=np.float32, mode='r', shape=(count, embedder.dim)) if count else None
+        order = np.arange(count)
+        list_offsets = None
+        
+        if n_lists and count:
+            n_lists = min(n_lists, count)
+            rng = np.random.default_rng(0)
+            sample_rows = np.sort(rng.choice(count, min(count, n_lists * 64), replace=False))
+            centroids = _spherical_kmeans(np.asarray(vectors[sample_rows]), n_lists)
+            
+            assignments = np.empty(count, dtype=np.int32)
+            for start in range(0, count, SCAN_BLOCK_ROWS):
+                block = np.asarray(vectors[start:start + SCAN_BLOCK_ROWS])
+                assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+            
+            order = np.argsort(assignments, kind='stable')
+            list_offsets = np.searchsorted(assignments[order], np.arange(n_lists + 1))
+            np.save(index_dir / "centroids.npy", centroids)
+            np.save(index_dir / "list_offsets.npy", list_offsets)
+        
+        with open(index_dir / "vectors.f32", 'wb') as f:
+            for start in range(0, count, SCAN_BLOCK_ROWS):
+                f.write(np.asarray(vectors[order[start:start + SCAN_BLOCK_ROWS]]).tobytes())
+        
+        np.save(index_dir / "meta_offsets.npy", np.asarray(meta_offsets, dtype=np.int64)[order])
+        
+        del vectors
+        raw_path.unlink()
+        (index_dir / "meta.jsonl.raw").replace(index_dir / "meta.jsonl")
+        
+        with open(index_dir / "index.json", 'w', encoding='utf-8') as f:
+            json.dump({
+                "count": count,
+                "dim": embedder.dim,
+                "embedder": embedder.name,
+                "n_lists": int(n_lists or 0)
+            }, f, indent=2)
+        
+        return cls(index_dir, embedder)
+    
+    def _meta(self, row):
+        self._meta_file.seek(int(self.meta_offsets[row]))
+        return json.loads(self._meta_file.readline())
+    
+    def _candidate_ranges(self, query, n_probe):
+        if self.centroids is None:
+            return [(0, self.count)]
+        
+        lists = _top_k(self.centroids @ query, n_probe)
+        return [(int(self.list_offsets[c]), int(self.list_offsets[c + 1])) for c in lists]
+    
+    def search(self, query_text, k=10, n_probe=VECTOR_INDEX_N_PROBE):
+        if self.count == 0:
+            return []
+        
+        query = self.embedder.embed([query_text])[0]
+        best_rows = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        
+        for start, end in self._candidate_ranges(query, n_probe):
+            for block_start in range(start, end, SCAN_BLOCK_ROWS):
+                block_end = min(end, block_start + SCAN_BLOCK_ROWS)
+                scores = self.vectors[block_start:block_end] @ query
+                keep = _top_k(scores, k)
+                best_rows = np.concatenate([best_rows, keep + block_start])
+                best_scores = np.concatenate([best_scores, scores[keep]])
+                
+                if len(best_rows) > k:
+                    keep = _top_k(best_scores, k)
+                    best_rows, best_scores = best_rows[keep], best_scores[keep]
+        
+        order = _top_k(best_scores, k)
+        return [(float(best_scores[i]), self._meta(best_rows[i])) for i in order]
+    
+    def close(self):
+        self._meta_file.close()
@@ -0,0 +1,80 @@
+import pytest
+
+CORPUS = [
+    "def main():\n    return run(argv)\n",
+    "class Repository:\n    def clone(self, url):\n        pass\n",
+    "Summarize the following code file in 3 sentences.",
+    "import os\nimport sys\nfrom pathlib import Path\n",
+    "The module defines a parser, a lexer and an interpreter."
+]
+
+
+@pytest.fixture(scope="session")
+def tiny_model(tmp_path_factory):
+    torch = pytest.importorskip("torch")
+    transformers = pytest.importorskip("transformers")
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers, trainers
+    
+    path = tmp_path_factory.mktemp("tiny-model")
+    
+    # Byte-level BPE trained on a few lines: any text encodes, nothing is downloaded
+    tokenizer = Tokenizer(models.BPE())
+    tokenizer.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tokenizer.decoder = decoders.ByteLevel()
+    tokenizer.train_from_iterator(CORPUS * 20, trainers.BpeTrainer(
+        vocab_size=400,
+        special_tokens=["<eos>"],
+        initial_alphabet=pre_tokenizers.ByteLevel.alphabet()
+    ))
+    fast = transformers.PreTrainedTokenizerFast(tokenizer_object=tokenizer, eos_token="<eos>")
+    fast.save_pretrained(path)
+    
+    config = transformers.LlamaConfig(
+        vocab_size=len(fast),
+        hidden_size=32,
+        intermediate_size=64,
+        num_hidden_layers=2,
+        num_attention_heads=4,
+        num_key_value_heads=4,
+        max_position_embeddings=2048,
+        bos_token_id=0,
+        eos_token_id=0
+    )
+    torch.manual_seed(0)
+    transformers.LlamaForCausalLM(config).save_pretrained(path)
+    
+    return path
+
+
+@pytest.fixture(scope="session")
+def tiny_draft_model(tiny_model, tmp_path_factory):
+    import torch
+    import transformers
+    
+    # Shares the tokenizer of tiny_model; one layer and other weights, so some proposals get rejected
+    path = tmp_path_factory.mktemp("tiny-draft-model")
+    config = transformers.AutoConfig.from_pretrained(tiny_model)
+    config.num_hidden_layers = 1
+    torch.manual_seed(1)
+    transformers.LlamaForCausalLM(config).save_pretrained(path)
+    return path
+
+
+@pytest.fixture
+def llm(tiny_model, monkeypatch):
+    import llm_manager
+    
+    monkeypatch.setattr(llm_manager, "MODEL_NAME", str(tiny_model))
+    monkeypatch.setattr(llm_manager, "DRAFT_MODEL_NAME", "")
+    manager = llm_manager.LLMManager()
+    manager.load_model(device="cpu", use_server=False, backend="local")
+    yield manager
+    manager.unload_model()
+
+
+@pytest.fixture
+def git_env(monkeypatch):
+    for name in ("AUTHOR", "COMMITTER"):
+        monkeypatch.setenv(f"GIT_{name}_NAME", "Test")
+        monkeypatch.setenv(f"GIT_{name}_EMAIL", "test@example.com")
+    monkeypatch.setenv("GIT_CONFIG_GLOBAL", "/dev/null")
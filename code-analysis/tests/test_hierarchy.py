@@ -0,0 +1,70 @@
+import pytest
+from fake_llm import FakeLLMManager
+from hierarchy import DirectorySummarizer
+from summary_store import SummaryStore
+
+
+class FailingLLM(FakeLLMManager):
+    def __init__(self, failing=()):
+        super().__init__(batch_latency_ms=0, prefill_us_per_token=0, decode_ms_per_step=0)
+        self.failing = set(failing)
+        self.prompts = []
+    
+    def generate_batch(self, prompts, **options):
+        self.prompts.extend(prompts)
+        if any(name in prompt for prompt in prompts for name in self.failing):
+            raise RuntimeError("out of memory")
+        return super().generate_batch(prompts, **options)
+
+
+def _records(paths):
+    return [{"path": path, "code_hash": path, "summary": f"Summary of {path}."} for path in paths]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SummaryStore(tmp_path / "summaries.db", model_name="fake").open()
+    store.append(_records(["a/b/c/one.py", "a/b/c/two.py", "a/b/three.py", "a/four.py", "x/five.py", "six.py"]))
+    yield store
+    store.close()
+
+
+def test_changed_file_regenerates_only_its_ancestors(store):
+    first = DirectorySummarizer(store, FailingLLM())
+    assert first.summarize(show_progress=False) is not None
+    assert first.regenerated == 5
+    
+    unchanged = DirectorySummarizer(store, FailingLLM())
+    unchanged.summarize(show_progress=False)
+    assert unchanged.llm_prompts == 0
+    
+    store.append([{"path": "a/b/c/one.py", "code_hash": "changed", "summary": "Changed."}])
+    changed = DirectorySummarizer(store, FailingLLM())
+    changed.summarize(show_progress=False)
+    assert changed.regenerated == 4
+    assert changed.reused["store"] == 1
+
+
+def test_up_to_date_tree_does_not_load_the_model(store):
+    DirectorySummarizer(store, FailingLLM()).summarize(show_progress=False)
+    
+    llm = FailingLLM()
+    llm.is_loaded = lambda: False
+    llm.load_model = lambda **options: pytest.fail("model loaded without a prompt")
+    DirectorySummarizer(store, llm).summarize(show_progress=False)
+
+
+def test_failed_directory_is_left_out_and_retried(store):
+    llm = FailingLLM(failing=["directory a/b/c "])
+    summarizer = DirectorySummarizer(store, llm, batch_size=1)
+    summarizer.summarize(show_progress=False)
+    
+    parent_prompt = next(prompt for prompt in llm.prompts if "directory a/b " in prompt)
+    assert "[Error" not in parent_prompt
+    assert summarizer.failed == {"a/b/c", "a/b", "a", "."}
+    assert {row["path"] for row in store.read_directories()} == {"x"}
+    
+    retry = DirectorySummarizer(store, FailingLLM())
+    retry.summarize(show_progress=False)
+    assert retry.regenerated == 4
+    assert not retry.failed
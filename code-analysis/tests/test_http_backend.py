@@ -0,0 +1,122 @@
+import threading
+import zlib
+import pytest
+from http_backend import OpenAIBackend
+from openai_stub import StubServer
+
+
+@pytest.fixture
+def stub():
+    server = StubServer(("127.0.0.1", 0), model="stub-model", latency_ms=0, decode_ms_per_token=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def _base_url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def _expected(prompt):
+    return f"Stub summary {zlib.crc32(prompt.encode('utf-8')):08x} of {len(prompt.split())} words."
+
+
+def test_complete_round_trip(stub):
+    backend = OpenAIBackend(_base_url(stub), "stub-model", concurrency=2)
+    try:
+        assert backend.models() == ["stub-model"]
+        
+        text, usage = backend.complete("summarize this file", 8)
+        assert text == _expected("summarize this file")
+        assert usage["prompt_tokens"] == 3
+        assert usage["completion_tokens"] == 8
+        assert backend.usage == {"requests": 1, "retries": 0, "prompt_tokens": 3, "completion_tokens": 8}
+    finally:
+        backend.close()
+
+
+def test_complete_many_keeps_order_and_reuses_connections(stub):
+    prompts = [f"file number {i}" for i in range(20)]
+    backend = OpenAIBackend(_base_url(stub), "stub-model", concurrency=3)
+    try:
+        results = backend.complete_many(prompts, [4, 64] * 10)
+    finally:
+        backend.close()
+    
+    assert [text for text, _ in results] == [_expected(prompt) for prompt in prompts]
+    assert [usage["completion_tokens"] for _, usage in results] == [4, 24] * 10
+    assert stub.requests == 20
+    # Keep-alive: at most one connection per concurrent slot
+    assert len(stub.connections) <= 3
+
+
+def test_overloaded_server_is_retried(stub):
+    stub.failure_rate = 0.5
+    backend = OpenAIBackend(_base_url(stub), "stub-model", concurrency=1, retries=10, backoff=0)
+    try:
+        results = backend.complete_many([f"prompt {i}" for i in range(10)], 4)
+    finally:
+        backend.close()
+    
+    assert [text for text, _ in results] == [_expected(f"prompt {i}") for i in range(10)]
+    assert backend.usage["retries"] > 0
+    assert stub.requests == 10 + backend.usage["retries"]
+
+
+def test_retries_are_bounded(stub):
+    stub.failure_rate = 1.0
+    backend = OpenAIBackend(_base_url(stub), "stub-model", retries=2, backoff=0)
+    try:
+        with pytest.raises(RuntimeError, match="503"):
+            backend.complete("prompt", 4)
+    finally:
+        backend.close()
+    
+    assert stub.requests == 3
+
+
+def test_unsupported_url_is_rejected():
+    with pytest.raises(ValueError):
+        OpenAIBackend("unix:///tmp/llm.sock", "stub-model")
+
+
+def test_llm_manager_uses_the_api(stub, tiny_model, monkeypatch):
+    import llm_manager
+    
+    monkeypatch.setattr(llm_manager, "MODEL_NAME", str(tiny_model))
+    monkeypatch.setattr(llm_manager, "LLM_API_BASE", _base_url(stub))
+    monkeypatch.setattr(llm_manager, "LLM_API_MODEL", "stub-model")
+    manager = llm_manager.LLMManager()
+    manager.load_model(backend="openai")
+    try:
+        assert manager.device == "remote"
+        assert manager.generate_batch(["def main():", "import os"], max_new_tokens=8) == [_expected("def main():"), _expected("import os")]
+        assert stub.requests == 2
+    finally:
+        manager.unload_model()
+
+
+def test_completion_cut_by_a_leading_stop_is_asked_again(stub, tiny_model, monkeypatch):
+    import llm_manager
+    
+    monkeypatch.setattr(llm_manager, "MODEL_NAME", str(tiny_model))
+    monkeypatch.setattr(llm_manager, "LLM_API_BASE", _base_url(stub))
+    monkeypatch.setattr(llm_manager, "LLM_API_MODEL", "stub-model")
+    manager = llm_manager.LLMManager()
+    manager.load_model(backend="openai")
+    complete_many = manager._backend.complete_many
+    
+    def opens_with_blank_line(prompts, max_new_tokens, **sampling):
+        # What a real server returns when the completion starts with the "\n\n" stop sequence
+        if "stop" in sampling:
+            return [("", {"prompt_tokens": 1, "completion_tokens": 1}) for _ in prompts]
+        return complete_many(prompts, max_new_tokens, **sampling)
+    
+    manager._backend.complete_many = opens_with_blank_line
+    try:
+        assert manager.generate_batch(["def main():"], max_new_tokens=8, stop_sequences=["\n\n"]) == [_expected("def main():")]
+    finally:
+        manager.unload_model()
@@ -0,0 +1,124 @@
+import time
+import pytest
+from fake_llm import FakeLLMManager
+from indexer import CodeIndexer
+from summary_store import SummaryStore
+
+
+class CountingLLM(FakeLLMManager):
+    def __init__(self, fail_batches=0):
+        super().__init__(batch_latency_ms=0, prefill_us_per_token=0, decode_ms_per_step=0)
+        self.batches = []
+        self.fail_batches = fail_batches
+    
+    def generate_batch(self, prompts, **options):
+        self.batches.append(len(options.get("input_ids") or prompts))
+        if self.fail_batches:
+            self.fail_batches -= 1
+            raise RuntimeError("CUDA out of memory")
+        return super().generate_batch(prompts, **options)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repo = tmp_path / "repo"
+    (repo / "pkg").mkdir(parents=True)
+    for i in range(6):
+        (repo / "pkg" / f"module_{i}.py").write_text(f"def function_{i}(value):\n    return value * {i} + {i}\n\n\nclass Handler{i}:\n    pass\n")
+    (repo / "pkg" / "copy.py").write_text((repo / "pkg" / "module_0.py").read_text())
+    (repo / "pkg" / "__init__.py").write_text("from .module_0 import function_0\n")
+    return repo
+
+
+def _index(repo, llm, **options):
+    indexer = CodeIndexer(repo, llm, batch_size=2, store_path=repo.parent / "summaries.db")
+    indexer.generate_summaries(sorted(repo.rglob("*.py")), show_progress=False, **options)
+    return indexer
+
+
+def test_files_are_summarized_in_batches(repo):
+    llm = CountingLLM()
+    indexer = _index(repo, llm)
+    summaries = {row["path"]: row["summary"] for row in indexer.store.read()}
+    
+    assert len(summaries) == 8
+    assert summaries["pkg/copy.py"] == summaries["pkg/module_0.py"]
+    assert summaries["pkg/__init__.py"].startswith("Package initializer")
+    assert indexer.skipped == {"duplicate": 1, "trivial": 1}
+    assert sum(llm.batches) == 6
+    assert max(llm.batches) == 2
+
+
+def test_resume_skips_stored_files_and_retries_failed_batches(repo):
+    first = _index(repo, CountingLLM(fail_batches=1))
+    failed = {row["path"] for row in first.store.read() if row["summary"].startswith("[Error:")}
+    # The copy of module_0 follows its failed original
+    assert failed == {"pkg/copy.py", "pkg/module_0.py", "pkg/module_1.py"}
+    
+    llm = CountingLLM()
+    _index(repo, llm, resume=True)
+    
+    assert sum(llm.batches) == 2
+    assert not any(row["summary"].startswith("[Error:") for row in SummaryStore(repo.parent / "summaries.db").read())
+
+
+def test_expired_budget_keeps_previous_rows(repo):
+    _index(repo, CountingLLM())
+    store = SummaryStore(repo.parent / "summaries.db")
+    before = {row["path"]: row["summary"] for row in store.read()}
+    
+    llm = CountingLLM()
+    indexer = _index(repo, llm, deadline=time.time() - 1)
+    
+    assert indexer.expired
+    assert llm.batches == []
+    # The package initializer needs no model and is still stored; nothing from the previous run is lost
+    assert indexer.completed == 1
+    assert {row["path"]: row["summary"] for row in store.read()} == before
+
+
+def test_budgeted_run_then_resume_finishes(repo):
+    llm = CountingLLM()
+    original = llm.generate_batch
+    
+    def slow(prompts, **options):
+        time.sleep(0.3)
+        return original(prompts, **options)
+    
+    llm.generate_batch = slow
+    indexer = _index(repo, llm, deadline=time.time() + 0.1)
+    assert indexer.expired
+    partial = indexer.store.count()
+    assert 0 < partial < 8
+    
+    _index(repo, CountingLLM(), resume=True)
+    assert SummaryStore(repo.parent / "summaries.db").count() == 8
+
+
+def test_fresh_run_drops_rows_of_deleted_files(repo):
+    _index(repo, CountingLLM())
+    (repo / "pkg" / "module_5.py").unlink()
+    
+    indexer = _index(repo, CountingLLM())
+    
+    assert indexer.store.get("pkg/module_5.py") is None
+    assert indexer.store.count() == 7
+
+
+def test_files_left_for_resume_do_not_hold_back_later_results(repo):
+    indexer = CodeIndexer(repo, CountingLLM(), batch_size=2, store_path=repo.parent / "summaries.db")
+    held_back = []
+    flush = indexer._flush
+    
+    def recording_flush():
+        held_back.extend(indexer._reorder)
+        flush()
+    
+    indexer._flush = recording_flush
+    files = [repo / "pkg" / "module_0.py", repo / "pkg" / "module_1.py", repo / "pkg" / "copy.py", repo / "pkg" / "__init__.py"]
+    indexer.generate_summaries(files, show_progress=False, deadline=time.time() - 1)
+    
+    # The package initializer comes after two skipped files and a duplicate of one of them, yet is streamed at once
+    assert held_back == []
+    assert indexer._followers == {}
+    assert [row["path"] for row in indexer.store.read()] == ["pkg/__init__.py"]
@@ -0,0 +1,87 @@
+import pytest
+from config import REPETITION_PENALTY
+
+PROMPTS = [
+    "def main():",
+    "class Repository:\n    def clone(self, url):",
+    "Summarize the following code file in 3 sentences.\n\nimport os\nimport sys\n"
+]
+
+
+def _reference(llm, prompts, max_new_tokens):
+    import torch
+    
+    llm.tokenizer.padding_side = "left"
+    llm.tokenizer.pad_token = llm.tokenizer.eos_token
+    inputs = llm.tokenizer(prompts, padding=True, return_tensors="pt")
+    with torch.no_grad():
+        outputs = llm.model.generate(
+            **inputs,
+            max_new_tokens=max_new_tokens,
+            do_sample=False,
+            repetition_penalty=REPETITION_PENALTY,
+            pad_token_id=llm.tokenizer.eos_token_id
+        )
+    # generate_batch strips the surrounding whitespace of each summary
+    return [llm.tokenizer.decode(row[inputs["input_ids"].shape[1]:], skip_special_tokens=True).strip() for row in outputs]
+
+
+def test_batched_decode_matches_generate(llm):
+    assert llm.generate_batch(PROMPTS, max_new_tokens=16) == _reference(llm, PROMPTS, 16)
+
+
+def test_per_row_budgets_stop_each_row_early(llm):
+    full = _reference(llm, PROMPTS, 16)
+    short = llm.generate_batch(PROMPTS, max_new_tokens=[4, 16, 8])
+    steps = llm.decoding["steps"]
+    
+    assert short[1] == full[1]
+    for text, reference in ((short[0], full[0]), (short[2], full[2])):
+        assert reference.startswith(text)
+    assert llm.generate_batch(PROMPTS, max_new_tokens=[4, 16, 8]) == short
+    assert 0 < llm.decoding["steps"] - steps <= 4 + 16 + 8
+
+
+def test_prefix_cache_gives_the_same_output(llm):
+    prompts = [f"Summarize the following code file in 3 sentences.\n\n{code}" for code in ("import os\n", "def main():\n    pass\n")]
+    plain = llm.generate_batch(prompts, max_new_tokens=12)
+    
+    llm.cache_prefix("Summarize the following code file in 3 sentences.\n\n")
+    try:
+        assert llm._match_prefix(llm.encode(prompts)) is not None
+        assert llm.generate_batch(prompts, max_new_tokens=12) == plain
+    finally:
+        llm.clear_prefixes()
+
+
+def test_stop_sequences_trim_output(llm):
+    text = llm.generate_batch(["def main():"], max_new_tokens=24)[0]
+    if len(text) < 4:
+        pytest.skip("tiny model produced too little text to split")
+    
+    stop = text[2:4]
+    stopped = llm.generate_batch(["def main():"], max_new_tokens=24, stop_sequences=[stop])[0]
+    assert stop not in stopped
+    assert text.startswith(stopped)
+
+
+def test_draft_model_keeps_greedy_output(llm, tiny_draft_model):
+    plain = llm.generate_batch(PROMPTS, max_new_tokens=[16, 24, 8])
+    
+    llm._load_draft_model(str(tiny_draft_model))
+    try:
+        proposed = llm.speculation["proposed"]
+        assert llm.generate_batch(PROMPTS, max_new_tokens=[16, 24, 8]) == plain
+        assert llm.speculation["proposed"] > proposed
+    finally:
+        llm._draft_model = None
+
+
+def test_draft_model_keeps_stop_sequences(llm, tiny_draft_model):
+    plain = llm.generate_batch(PROMPTS, max_new_tokens=24, max_sentences=1, stop_sequences=["\n\n"])
+    
+    llm._load_draft_model(str(tiny_draft_model))
+    try:
+        assert llm.generate_batch(PROMPTS, max_new_tokens=24, max_sentences=1, stop_sequences=["\n\n"]) == plain
+    finally:
+        llm._draft_model = None
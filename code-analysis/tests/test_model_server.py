@@ -0,0 +1,68 @@
+import tempfile
+import threading
+from pathlib import Path
+import pytest
+from fake_llm import FakeLLMManager
+from model_server import ModelClient, ModelServer
+
+
+class ServedLLM(FakeLLMManager):
+    device = "cpu"
+
+
+@pytest.fixture
+def server():
+    # Unix socket paths are limited to about 100 bytes, so not under pytest's long tmp_path
+    with tempfile.TemporaryDirectory(prefix="ms-") as directory:
+        server = ModelServer(ServedLLM(batch_latency_ms=0, decode_ms_per_step=0), Path(directory) / "model.sock", "fake-model")
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield server
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+def test_client_round_trip(server):
+    client = ModelClient.connect(server.socket_path)
+    try:
+        info = client.call("info")
+        assert info["model"] == "fake-model"
+        assert info["device"] == "cpu"
+        
+        assert client.call("encode", texts=["def main(): pass"]) == server.llm_manager.encode(["def main(): pass"])
+        summaries = client.call("generate_batch", prompts=["a", "b c"], max_new_tokens=[8, 16])
+        assert summaries == ServedLLM().generate_batch(["a", "b c"], max_new_tokens=[8, 16])
+        
+        with pytest.raises(RuntimeError, match="Unknown method"):
+            client.call("delete_everything")
+        # The connection survives an error response
+        assert client.call("info")["model"] == "fake-model"
+    finally:
+        client.close()
+
+
+def test_second_server_on_the_same_socket_is_refused(server):
+    with pytest.raises(RuntimeError, match="already listening"):
+        ModelServer(ServedLLM(), server.socket_path, "other")
+
+
+def test_missing_socket_gives_no_client(tmp_path):
+    assert ModelClient.connect(tmp_path / "absent.sock") is None
+
+
+def test_llm_manager_uses_a_matching_server(server, monkeypatch):
+    import llm_manager
+    
+    monkeypatch.setattr(llm_manager, "MODEL_SERVER_SOCKET", str(server.socket_path))
+    monkeypatch.setattr(llm_manager, "MODEL_NAME", "fake-model")
+    manager = llm_manager.LLMManager()
+    manager.load_model(use_server=True, backend="local")
+    try:
+        assert manager.device == "cpu"
+        assert manager.generate_batch(["x y z"], max_new_tokens=8) == ServedLLM().generate_batch(["x y z"], max_new_tokens=8)
+    finally:
+        manager.unload_model()
+    
+    monkeypatch.setattr(llm_manager, "MODEL_NAME", "another-model")
+    assert not manager._connect_server()
@@ -0,0 +1,26 @@
+from prefilter import classify
+
+CODE = "def handler(event):\n    return event['body']\n\n\nclass Settings:\n    debug = False\n    level = 3\n    name = 'x'\n"
+
+
+def test_real_generator_headers_are_skipped():
+    assert classify("api/types.go", "// Code generated by protoc-gen-go. DO NOT EDIT.\n" + CODE) is not None
+    assert classify("schema.py", "# @generated by tooling\n" + CODE) is not None
+    assert classify("msg_pb2.py", "# Generated by the protocol buffer compiler.  DO NOT EDIT!\n" + CODE) is not None
+
+
+def test_hand_written_do_not_edit_notes_are_summarized():
+    assert classify("settings.py", "# Do not edit these defaults without updating the docs\n" + CODE) is None
+    assert classify("ids.py", "# auto-generated ids are assigned by the database\n" + CODE) is None
+
+
+def test_external_is_first_party_but_vendor_is_not():
+    assert classify("src/external/stripe_client.py", CODE) is None
+    assert classify("src/vendor/six.py", CODE) is not None
+
+
+def test_block_comments_are_comments_but_dereferences_are_code():
+    header = "/*\n * Copyright (c) the authors.\n * Licensed under the MIT license.\n */\n"
+    assert classify("license.c", header) is not None
+    assert classify("swap.c", header + "*a = *b;\n*b = tmp;\n") is None
+    assert classify("swap.c", "/* swap */\n*a = *b;\n*b = tmp;\n") is None
@@ -0,0 +1,80 @@
+import subprocess
+import pytest
+from repository import RepositoryManager
+
+
+def _git(*args, cwd):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def _commit(origin, files, message):
+    for name, content in files.items():
+        path = origin / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    _git("add", "-A", cwd=origin)
+    _git("commit", "-qm", message, cwd=origin)
+    return _git("rev-parse", "HEAD", cwd=origin)
+
+
+@pytest.fixture
+def origin(tmp_path, git_env):
+    origin = tmp_path / "origin"
+    origin.mkdir()
+    _git("init", "-q", "-b", "main", cwd=origin)
+    # Partial clones of a local repository need the filter allowed on the serving side
+    _git("config", "uploadpack.allowFilter", "true", cwd=origin)
+    _commit(origin, {"src/main.py": "def main():\n    pass\n", "README.md": "# Origin\n", "logo.png": "not really a png"}, "initial")
+    return origin
+
+
+def test_mirror_clone_and_incremental_update(tmp_path, origin):
+    url = origin.as_uri()
+    manager = RepositoryManager(tmp_path / "checkout", cache_dir=tmp_path / "cache")
+    
+    checkout = manager.clone(url)
+    assert (checkout / "src" / "main.py").read_text() == "def main():\n    pass\n"
+    assert manager.mirror_dir == manager.mirror_path(url)
+    assert (manager.mirror_dir / "HEAD").is_file()
+    
+    head = _commit(origin, {"src/util.py": "VALUE = 1\n"}, "add util")
+    # A pull request head as GitHub exposes it; the cache only follows branches and tags
+    _git("update-ref", "refs/pull/1/head", head, cwd=origin)
+    _git("tag", "v1", cwd=origin)
+    (checkout / "scratch.txt").write_text("left over from the last run")
+    worktree_git = (checkout / ".git").read_text()
+    
+    manager = RepositoryManager(tmp_path / "checkout", cache_dir=tmp_path / "cache")
+    checkout = manager.clone(url)
+    
+    assert (checkout / "src" / "util.py").read_text() == "VALUE = 1\n"
+    assert _git("rev-parse", "HEAD", cwd=checkout) == head
+    assert not (checkout / "scratch.txt").exists()
+    # The same worktree of the mirror is updated in place rather than cloned again
+    assert (checkout / ".git").read_text() == worktree_git
+    assert len(list((tmp_path / "cache").iterdir())) == 1
+    refs = _git("for-each-ref", "--format=%(refname)", cwd=manager.mirror_dir).split()
+    assert refs == ["refs/heads/main", "refs/tags/v1"]
+    
+    manager.cleanup()
+    assert not checkout.exists()
+    assert _git("worktree", "list", "--porcelain", cwd=manager.mirror_dir).count("worktree ") == 1
+
+
+def test_sparse_checkout_skips_unsupported_files(tmp_path, origin):
+    manager = RepositoryManager(tmp_path / "checkout", cache_dir=tmp_path / "cache", sparse=True)
+    checkout = manager.clone(origin.as_uri())
+    
+    assert (checkout / "src" / "main.py").is_file()
+    assert (checkout / "README.md").is_file()
+    assert not (checkout / "logo.png").exists()
+    
+    manager.cleanup()
+
+
+def test_clone_without_cache(tmp_path, origin):
+    manager = RepositoryManager(tmp_path / "checkout", cache_dir=tmp_path / "cache", use_cache=False)
+    checkout = manager.clone(origin.as_uri())
+    
+    assert (checkout / "src" / "main.py").is_file()
+    assert not (tmp_path / "cache").exists()
@@ -0,0 +1,16 @@
+from sharded_indexer import ShardedIndexer
+
+
+def test_identical_files_share_a_task(tmp_path):
+    for i in range(10):
+        (tmp_path / f"unique_{i}.py").write_text(f"VALUE = {i}\n")
+    for i in range(4):
+        (tmp_path / f"copy_{i}.py").write_text("def same():\n    return 42\n")
+    files = sorted(tmp_path.glob("*.py"), key=lambda path: path.name.startswith("copy"))
+    
+    tasks = ShardedIndexer(tmp_path, 2, task_files=3, keep_order=True)._tasks(files)
+    
+    assert sorted(path for task in tasks for path in task) == sorted(str(path) for path in files)
+    copies = [task for task in tasks if any("copy_" in path for path in task)]
+    assert len(copies) == 1
+    assert sum("copy_" in path for path in copies[0]) == 4
@@ -0,0 +1,27 @@
+from stopping import StopRule
+
+STOPS = ["\n\n", "\nCode:"]
+
+
+def test_leading_blank_line_is_not_a_stop():
+    rule = StopRule(3, STOPS)
+    
+    assert not rule.done("\n\n")
+    assert not rule.done("\n\nThis module")
+    assert rule.trim("\n\nThis module parses arguments.") == "This module parses arguments."
+
+
+def test_stop_sequence_after_text_cuts():
+    rule = StopRule(None, STOPS)
+    
+    assert rule.done("\n\nThis module parses arguments.\n\nCode: def main")
+    assert rule.trim("\n\nThis module parses arguments.\n\nCode: def main") == "This module parses arguments."
+    assert rule.trim(" It runs.\nCode: x") == "It runs."
+
+
+def test_sentence_limit_ignores_abbreviations():
+    rule = StopRule(2)
+    text = "It reads files, e.g. configs. It writes reports. It exits."
+    
+    assert rule.trim(text) == "It reads files, e.g. configs. It writes reports."
+    assert not rule.done("It uses os.path to join")
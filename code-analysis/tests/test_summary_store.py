@@ -0,0 +1,21 @@
+from summary_store import SummaryStore
+
+
+def test_completed_paths_skips_error_placeholders(tmp_path):
+    with SummaryStore(tmp_path / "summaries.db", model_name="fake").open() as store:
+        store.append([
+            {"path": "ok.py", "code_hash": "1", "summary": "A module."},
+            {"path": "empty.py", "code_hash": None, "summary": "[Empty file]"},
+            {"path": "oom.py", "code_hash": "2", "summary": "[Error: CUDA out of memory]"}
+        ])
+    
+    assert SummaryStore(tmp_path / "summaries.db").completed_paths() == {"ok.py", "empty.py"}
+
+
+def test_prefix_read_and_retain(tmp_path):
+    with SummaryStore(tmp_path / "summaries.db", model_name="fake").open() as store:
+        store.append([{"path": path, "code_hash": path, "summary": path} for path in ("src/a.py", "src/b.py", "srcx.py", "gone.py")])
+        store.retain(["src/a.py", "src/b.py", "srcx.py"])
+        
+        assert [row["path"] for row in store.read("src/")] == ["src/a.py", "src/b.py"]
+        assert store.count() == 3
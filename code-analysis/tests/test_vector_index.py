@@ -0,0 +1,38 @@
+from vector_index import TOKEN_PATTERN, HashingEmbedder, VectorIndex, iter_records
+
+
+def test_token_pattern_keeps_acronyms_whole():
+    assert TOKEN_PATTERN.findall("HTTPServer") == ["HTTP", "Server"]
+    assert TOKEN_PATTERN.findall("parseJSONResponse") == ["parse", "JSON", "Response"]
+    assert TOKEN_PATTERN.findall("snake_case_v2") == ["snake", "case", "v2"]
+
+
+def test_empty_index_loads_and_searches(tmp_path):
+    index = VectorIndex.build(tmp_path / "index", [], embedder=HashingEmbedder(64))
+    
+    assert index.count == 0
+    assert index.vectors is None
+    assert index.search("anything") == []
+    index.close()
+    
+    reopened = VectorIndex(tmp_path / "index")
+    assert reopened.search("anything") == []
+    reopened.close()
+
+
+def test_search_finds_summary_and_code(tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "server.py").write_text("class HTTPServer:\n    def serve_forever(self):\n        pass\n")
+    (repo / "math_utils.py").write_text("def add(a, b):\n    return a + b\n")
+    records = [
+        {"path": "server.py", "summary": "An HTTP server that serves requests forever."},
+        {"path": "math_utils.py", "summary": "Arithmetic helpers."}
+    ]
+    
+    index = VectorIndex.build(tmp_path / "index", iter_records(repo, records), embedder=HashingEmbedder(256))
+    results = index.search("HTTP server", k=2)
+    
+    assert index.count == 4
+    assert results[0][1]["path"] == "server.py"
+    index.close()
@@ -1,6 +1,20 @@
 import os
 
 MODEL_NAME = os.getenv("LLM_MODEL", "deepseek-ai/deepseek-coder-6.7b-instruct")
+DRAFT_MODEL_NAME = os.getenv("LLM_DRAFT_MODEL", "")  # e.g. deepseek-ai/deepseek-coder-1.3b-instruct; empty disables
+DRAFT_NUM_TOKENS = int(os.getenv("LLM_DRAFT_TOKENS", "5"))  # Tokens proposed by the draft model per step
+LLM_DEVICE = os.getenv("LLM_DEVICE", "auto")  # auto, cuda or cpu
+CPU_DTYPE = os.getenv("LLM_CPU_DTYPE", "float32")  # float32 or bfloat16
+CPU_QUANTIZE = os.getenv("LLM_CPU_QUANTIZE", "none")  # none or int8 (dynamic)
+CPU_THREADS = int(os.getenv("LLM_CPU_THREADS", "0"))  # 0 keeps the torch default
+LLM_BACKEND = os.getenv("LLM_BACKEND", "local")  # local (in-process transformers) or openai (HTTP completions API)
+LLM_API_BASE = os.getenv("LLM_API_BASE", "http://localhost:8000/v1")
+LLM_API_KEY = os.getenv("LLM_API_KEY", "")
+LLM_API_MODEL = os.getenv("LLM_API_MODEL", "")  # Model name sent to the API; empty uses LLM_MODEL
+LLM_API_CONCURRENCY = int(os.getenv("LLM_API_CONCURRENCY", "8"))  # Requests in flight (and pooled connections)
+LLM_API_RETRIES = int(os.getenv("LLM_API_RETRIES", "3"))  # Retries on connection errors, 429 and 5xx
+LLM_API_TIMEOUT = float(os.getenv("LLM_API_TIMEOUT", "120"))
+PREFIX_CACHE = os.getenv("LLM_PREFIX_CACHE", "1") != "0"  # Reuse the KV cache of the system prompt
 MAX_CONTEXT_TOKENS = 16000
 MAX_FILE_SIZE_BYTES = 100000
 
@@ -8,3 +22,4 @@ MAX_FILE_SIZE_BYTES = 100000
 SUMMARIZE_THRESHOLD = 0.7  # Summarize when 70% of context is used
 MAX_HISTORY_BEFORE_SUMMARY = 10  # Max messages before forcing summarization
 RESERVED_TOKENS_FOR_RESPONSE = 512  # Tokens reserved for model response
+RESPONSE_STOP_SEQUENCES = ["\nUser:"]  # The model starts writing the next user turn once its answer is done
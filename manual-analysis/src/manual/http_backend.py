@@ -0,0 +1,132 @@
+import http.client
+import json
+import queue
+import threading
+import time
+from urllib.parse import urlsplit
+
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class ConnectionPool:
+    """Fixed-size pool of keep-alive HTTP connections to one API host."""
+    
+    def __init__(self, base_url, size, timeout):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported API URL: {base_url}")
+        
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.host = parts.hostname
+        self.port = parts.port
+        self.base_path = parts.path.rstrip("/")
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        # Each slot holds an open keep-alive connection or None until first use; the pool size bounds concurrency
+        for _ in range(size):
+            self._idle.put(None)
+    
+    def request(self, method, path, body, headers):
+        """
+        Send one request over a pooled connection, blocking while all connections are busy.
+        
+        Returns:
+            Tuple of (status, Retry-After header, response body bytes)
+        """
+        connection = self._idle.get() or self.connection_class(self.host, self.port, timeout=self.timeout)
+        try:
+            connection.request(method, self.base_path + path, body=body, headers=headers)
+            response = connection.getresponse()
+            data = response.read()
+        except BaseException:
+            connection.close()
+            self._idle.put(None)
+            raise
+        
+        if response.getheader("Connection", "").lower() == "close":
+            connection.close()
+            self._idle.put(None)
+        else:
+            self._idle.put(connection)
+        
+        return response.status, response.getheader("Retry-After"), data
+    
+    def close(self):
+        """Close every idle connection."""
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            if connection is not None:
+                connection.close()
+
+
+class OpenAIBackend:
+    """
+    Client for an OpenAI-compatible /completions endpoint (vLLM, TGI, llama.cpp server, ...).
+    
+    A trimmed copy of code-analysis/src/http_backend.py: the two projects are installed separately
+    and share no code, so fixes to the request/retry logic belong in both.
+    """
+    
+    def __init__(self, base_url, model, api_key="", concurrency=8, retries=3, timeout=120.0, backoff=0.5):
+        self.model = model
+        self.concurrency = max(1, concurrency)
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.pool = ConnectionPool(base_url, self.concurrency, timeout)
+        self.headers = {"Content-Type": "application/json"}
+        if api_key:
+            self.headers["Authorization"] = f"Bearer {api_key}"
+        self.usage = {"requests": 0, "retries": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        self._usage_lock = threading.Lock()
+    
+    def _post(self, path, payload):
+        """POST JSON, retrying connection errors, 429 and 5xx responses with exponential backoff."""
+        body = json.dumps(payload).encode('utf-8')
+        
+        for attempt in range(self.retries + 1):
+            try:
+                status, retry_after, data = self.pool.request("POST", path, body, self.headers)
+            except (OSError, http.client.HTTPException) as e:
+                if attempt == self.retries:
+                    raise ConnectionError(f"LLM API request failed after {attempt + 1} attempts: {e}") from e
+                delay = self.backoff * 2 ** attempt
+            else:
+                if status == 200:
+                    return json.loads(data)
+                if status not in RETRY_STATUSES or attempt == self.retries:
+                    raise RuntimeError(f"LLM API error {status}: {data[:500].decode('utf-8', errors='replace')}")
+                delay = float(retry_after) if retry_after and retry_after.isdigit() else self.backoff * 2 ** attempt
+            
+            with self._usage_lock:
+                self.usage["retries"] += 1
+            time.sleep(delay)
+    
+    def complete(self, prompt, max_new_tokens, **sampling):
+        """
+        Request one completion.
+        
+        Args:
+            prompt: Prompt text
+            max_new_tokens: Completion token limit
+            **sampling: Extra request fields such as temperature and top_p
+        
+        Returns:
+            Tuple of (completion text, usage dict reported by the server)
+        """
+        payload = {"model": self.model, "prompt": prompt, "max_tokens": max_new_tokens, **sampling}
+        response = self._post("/completions", payload)
+        usage = response.get("usage") or {}
+        
+        with self._usage_lock:
+            self.usage["requests"] += 1
+            self.usage["prompt_tokens"] += usage.get("prompt_tokens", 0)
+            self.usage["completion_tokens"] += usage.get("completion_tokens", 0)
+        
+        return response["choices"][0]["text"].strip(), usage
+    
+    def close(self):
+        """Close pooled connections."""
+        self.pool.close()
@@ -1,47 +1,257 @@
+import copy
+import time
 import torch
 from transformers import AutoTokenizer, AutoModelForCausalLM
-from manual.config import MODEL_NAME, MAX_CONTEXT_TOKENS
+from manual.config import (
+    MODEL_NAME,
+    DRAFT_MODEL_NAME,
+    DRAFT_NUM_TOKENS,
+    MAX_CONTEXT_TOKENS,
+    LLM_DEVICE,
+    CPU_DTYPE,
+    CPU_QUANTIZE,
+    CPU_THREADS,
+    LLM_BACKEND,
+    LLM_API_BASE,
+    LLM_API_KEY,
+    LLM_API_MODEL,
+    LLM_API_CONCURRENCY,
+    LLM_API_RETRIES,
+    LLM_API_TIMEOUT
+)
+from manual.http_backend import OpenAIBackend
 
 class LLMManager:
     _instance = None
     _model = None
     _tokenizer = None
     _device = None
+    _backend = None
+    _draft_model = None
+    _prefixes = []
+    prefix_hits = 0
+    speculation = {"proposed": 0, "accepted": 0, "new_tokens": 0}
     
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(LLMManager, cls).__new__(cls)
         return cls._instance
     
-    def load_model(self):
-            if self._model is not None:
+    def load_model(self, device=None, dtype=None, quantize=None, threads=None, backend=None):
+            if self._model is not None or self._backend is not None:
                 return
             
-            self._device = "cuda" if torch.cuda.is_available() else "cpu"
+            if (backend or LLM_BACKEND) == "openai":
+                self._load_http_backend()
+                return
+            
+            device = device or LLM_DEVICE
+            if device == "auto":
+                device = "cuda" if torch.cuda.is_available() else "cpu"
+            elif device == "cuda" and not torch.cuda.is_available():
+                raise Exception("No CUDA device found")
+            
+            self._device = device
             
             print(f"Loading model: {MODEL_NAME}")
             print(f"Device: {self._device}")
             
-            if self._device == "cpu":
-                print("ERROR: No GPU (cuda) detected.")
-                print("This model requires GPU to run efficiently.")
-                print("In Colab: Runtime -> Change runtime type -> T4 GPU")
-                raise Exception("No CUDA device found")
-            
             self._tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME, trust_remote_code=True)
-            self._model = AutoModelForCausalLM.from_pretrained(
-                MODEL_NAME,
-                trust_remote_code=True,
-                torch_dtype=torch.float16,
-                device_map="auto"
-            )
+            
+            if self._device == "cuda":
+                self._model = AutoModelForCausalLM.from_pretrained(
+                    MODEL_NAME,
+                    trust_remote_code=True,
+                    torch_dtype=torch.float16,
+                    device_map="auto"
+                )
+            else:
+                self._model = self._load_cpu_model(dtype or CPU_DTYPE, quantize or CPU_QUANTIZE, threads or CPU_THREADS)
             
             self._model.eval()
             
+            if DRAFT_MODEL_NAME:
+                self._load_draft_model(DRAFT_MODEL_NAME)
+            
             print("Model loaded successfully")
-
+            print(f"Throughput: {self.measure_tokens_per_second():.1f} tokens/sec")
+    
+    def _load_http_backend(self):
+        """
+        Use an OpenAI-compatible completions server instead of in-process weights.
+        
+        Only the tokenizer of MODEL_NAME is loaded locally, for context-size accounting.
+        """
+        self._tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME, trust_remote_code=True)
+        self._backend = OpenAIBackend(
+            LLM_API_BASE,
+            LLM_API_MODEL or MODEL_NAME,
+            api_key=LLM_API_KEY,
+            concurrency=LLM_API_CONCURRENCY,
+            retries=LLM_API_RETRIES,
+            timeout=LLM_API_TIMEOUT
+        )
+        self._device = "remote"
+        print(f"Using OpenAI-compatible API at {LLM_API_BASE} (model: {self._backend.model})")
+    
+    def close_backend(self):
+        """Close the HTTP backend, if one is in use."""
+        if self._backend is not None:
+            self._backend.close()
+            self._backend = None
+    
+    def _load_cpu_model(self, dtype, quantize, threads):
+        """
+        Load the model for CPU inference.
+        
+        Args:
+            dtype: Weight dtype name, "float32" or "bfloat16"
+            quantize: "int8" for dynamic int8 quantization of Linear layers, "none" otherwise
+            threads: torch intra-op thread count (0 keeps the torch default)
+        """
+        if threads:
+            torch.set_num_threads(threads)
+        
+        if quantize == "int8" and dtype != "float32":
+            print(f"Dynamic int8 quantization requires float32 weights, ignoring dtype {dtype}")
+            dtype = "float32"
+        
+        print(f"CPU mode: dtype={dtype}, quantize={quantize}, threads={torch.get_num_threads()}")
+        
+        model = AutoModelForCausalLM.from_pretrained(
+            MODEL_NAME,
+            trust_remote_code=True,
+            torch_dtype=getattr(torch, dtype),
+            low_cpu_mem_usage=True
+        )
+        
+        if quantize == "int8":
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        
+        return model
+    
+    def _load_draft_model(self, draft_name):
+        """
+        Load the small draft model used for assisted (speculative) decoding.
+        
+        It must share the tokenizer of MODEL_NAME; the main model verifies every proposed token,
+        so greedy outputs are unchanged.
+        
+        Args:
+            draft_name: Hugging Face name or path of the draft model
+        """
+        print(f"Loading draft model: {draft_name} ({DRAFT_NUM_TOKENS} speculative tokens per step)")
+        
+        draft_model = AutoModelForCausalLM.from_pretrained(
+            draft_name,
+            trust_remote_code=True,
+            torch_dtype=self._model.dtype,
+            low_cpu_mem_usage=True
+        )
+        draft_model.generation_config.num_assistant_tokens = DRAFT_NUM_TOKENS
+        self._draft_model = draft_model.to(self._device).eval()
+    
+    def acceptance_rate(self):
+        """Fraction of draft tokens accepted by the main model so far."""
+        proposed = self.speculation["proposed"]
+        return self.speculation["accepted"] / proposed if proposed else 0.0
+    
+    def measure_tokens_per_second(self, new_tokens=32):
+        """Measure greedy decoding throughput on a short prompt."""
+        inputs = self._tokenizer("def main():", return_tensors="pt")
+        inputs = {k: v.to(self._device) for k, v in inputs.items()}
+        
+        start = time.perf_counter()
+        with torch.no_grad():
+            outputs = self._model.generate(
+                **inputs,
+                min_new_tokens=new_tokens,
+                max_new_tokens=new_tokens,
+                do_sample=False,
+                pad_token_id=self._tokenizer.eos_token_id
+            )
+        elapsed = time.perf_counter() - start
+        
+        generated = outputs.shape[1] - inputs["input_ids"].shape[1]
+        return generated / elapsed if elapsed > 0 else 0.0
+    
+    def cache_prefix(self, text):
+        """
+        Precompute the key/value cache of a prompt prefix shared by many calls.
+        
+        Later prompts starting with the same tokens only prefill the remaining suffix.
+        
+        Args:
+            text: Fixed prompt prefix, e.g. the orchestrator system prompt
+            
+        Returns:
+            Number of cached prefix tokens
+        """
+        # Trailing whitespace and the last token may merge with whatever follows the prefix,
+        # so the cache stops before them and the prefix ids still start the tokenized prompt
+        prefix_ids = self._tokenizer(text.rstrip())["input_ids"][:-1]
+        
+        if self._backend is not None:
+            # Prefix reuse is left to the inference server (e.g. vLLM automatic prefix caching)
+            return len(prefix_ids)
+        
+        if not prefix_ids or any(ids == prefix_ids for ids, _ in self._prefixes):
+            return len(prefix_ids)
+        
+        with torch.no_grad():
+            outputs = self._model(torch.tensor([prefix_ids], device=self._device), use_cache=True)
+        
+        self._prefixes = self._prefixes + [(prefix_ids, outputs.past_key_values)]
+        return len(prefix_ids)
+    
+    def clear_prefixes(self):
+        """Drop all cached prompt prefixes."""
+        self._prefixes = []
+    
+    def _prefixed_inputs(self, input_ids):
+        """Build generate() inputs, reusing a cached prefix when the prompt starts with one."""
+        inputs = {
+            "input_ids": torch.tensor([input_ids], device=self._device),
+            "attention_mask": torch.ones(1, len(input_ids), dtype=torch.long, device=self._device)
+        }
+        
+        for prefix_ids, cache in self._prefixes:
+            if len(input_ids) > len(prefix_ids) and input_ids[:len(prefix_ids)] == prefix_ids:
+                inputs["past_key_values"] = copy.deepcopy(cache)
+                self.prefix_hits += 1
+                break
+        
+        return inputs
+    
+    def _speculate(self, inputs, gen_config):
+        """Run assisted generation with the draft model and record how many draft tokens were accepted."""
+        passes = {"target": 0, "draft": 0}
+        
+        def count(name):
+            return lambda *_: passes.__setitem__(name, passes[name] + 1)
+        
+        handles = [
+            self._model.register_forward_hook(count("target")),
+            self._draft_model.register_forward_hook(count("draft"))
+        ]
+        
+        try:
+            with torch.no_grad():
+                outputs = self._model.generate(**inputs, assistant_model=self._draft_model, **gen_config)
+        finally:
+            for handle in handles:
+                handle.remove()
+        
+        # Every main-model pass verifies the draft tokens and adds one token of its own
+        new_tokens = outputs.shape[1] - inputs["input_ids"].shape[1]
+        self.speculation["proposed"] += passes["draft"]
+        self.speculation["accepted"] += max(0, new_tokens - passes["target"])
+        self.speculation["new_tokens"] += new_tokens
+        
+        return outputs
+    
     def generate(self, prompt, max_new_tokens=512, temperature=0.7, top_p=0.95, 
-                 repetition_penalty=1.15, do_sample=True):
+                 repetition_penalty=1.15, do_sample=True, stop_sequences=None):
         """
         Generate text from prompt with configurable parameters.
         
@@ -52,14 +262,28 @@ class LLMManager:
             top_p: Nucleus sampling threshold (default: 0.95)
             repetition_penalty: Penalize repetition (default: 1.15)
             do_sample: Whether to use sampling or greedy decoding (default: True)
+            stop_sequences: Strings that end generation early; the text from the first one on is dropped (default: None)
         """
-        inputs = self._tokenizer(
+        if self._backend is not None:
+            sampling = {"temperature": temperature, "top_p": top_p} if do_sample else {"temperature": 0.0}
+            if stop_sequences:
+                sampling["stop"] = stop_sequences
+            text, _ = self._backend.complete(prompt, max_new_tokens, **sampling)
+            return self._trim_stop(text, stop_sequences)
+        
+        input_ids = self._tokenizer(
             prompt, 
-            return_tensors="pt", 
             truncation=True, 
             max_length=MAX_CONTEXT_TOKENS
-        )
-        inputs = {k: v.to(self._device) for k, v in inputs.items()}
+        )["input_ids"]
+        
+        if self._draft_model is not None:
+            inputs = {
+                "input_ids": torch.tensor([input_ids], device=self._device),
+                "attention_mask": torch.ones(1, len(input_ids), dtype=torch.long, device=self._device)
+            }
+        else:
+            inputs = self._prefixed_inputs(input_ids)
         
         gen_config = {
             "max_new_tokens": max_new_tokens,
@@ -68,6 +292,10 @@ class LLMManager:
             "repetition_penalty": repetition_penalty,
         }
         
+        if stop_sequences:
+            # generate() needs the tokenizer to match stop strings across token boundaries
+            gen_config.update({"stop_strings": stop_sequences, "tokenizer": self._tokenizer})
+        
         
         if do_sample:
             gen_config.update({
@@ -79,15 +307,25 @@ class LLMManager:
         else:
             gen_config["do_sample"] = False
         
-        with torch.no_grad():
-            outputs = self._model.generate(**inputs, **gen_config)
+        if self._draft_model is not None:
+            outputs = self._speculate(inputs, gen_config)
+        else:
+            with torch.no_grad():
+                outputs = self._model.generate(**inputs, **gen_config)
         
         generated_text = self._tokenizer.decode(outputs[0], skip_special_tokens=True)
         
         
-        response = generated_text[len(prompt):].strip()
+        response = generated_text[len(prompt):]
         
-        return response
+        return self._trim_stop(response, stop_sequences)
+    
+    @staticmethod
+    def _trim_stop(text, stop_sequences):
+        """Cut text at the earliest stop sequence and strip surrounding whitespace."""
+        positions = [text.find(sequence) for sequence in stop_sequences or ()]
+        positions = [position for position in positions if position >= 0]
+        return (text[:min(positions)] if positions else text).strip()
 
 
 
@@ -4,7 +4,9 @@ from manual.config import (
     MAX_CONTEXT_TOKENS, 
     SUMMARIZE_THRESHOLD, 
     MAX_HISTORY_BEFORE_SUMMARY,
-    RESERVED_TOKENS_FOR_RESPONSE
+    RESERVED_TOKENS_FOR_RESPONSE,
+    RESPONSE_STOP_SEQUENCES,
+    PREFIX_CACHE
 )
 
 SYSTEM_PROMPT = """You are an expert AI assistant specialized in software architecture and design pattern analysis.
@@ -29,9 +31,7 @@ Analysis approach:
 4. Be precise: distinguish between similar patterns (e.g., Strategy vs State)
 5. Support conclusions with evidence from the code
 
-Respond as a knowledgeable colleague conducting a thorough code review.
-
-"""
+Respond as a knowledgeable colleague conducting a thorough code review."""
 
 
 class Orchestrator:
@@ -101,6 +101,8 @@ class Orchestrator:
             The assistant's response
         """
         self.llm_manager.load_model()
+        if PREFIX_CACHE:
+            self.llm_manager.cache_prefix(self.system_prompt)
         
         self.conversation_history.append({
             "role": "user",
@@ -117,7 +119,8 @@ class Orchestrator:
                 
         response = self.llm_manager.generate(
             prompt=full_prompt,
-            max_new_tokens=max_new_tokens
+            max_new_tokens=max_new_tokens,
+            stop_sequences=RESPONSE_STOP_SEQUENCES
         )
         
 
@@ -144,6 +147,9 @@ class Orchestrator:
         self.summary = None
         self.llm_manager._model = None
         self.llm_manager._tokenizer = None
+        self.llm_manager._draft_model = None
+        self.llm_manager.close_backend()
+        self.llm_manager.clear_prefixes()
         print("Model and conversation restarted. Model will reload on next message.")
     
     def save_history(self, filepath: str = None) -> str:
@@ -0,0 +1,60 @@
+import pytest
+
+CORPUS = [
+    "You are an expert AI assistant specialized in software architecture.",
+    "User: Which pattern does this class implement?\n\nAssistant: The Strategy pattern.",
+    "class Repository:\n    def clone(self, url):\n        pass\n",
+    "Identify behavioral, creational, and structural patterns."
+]
+
+
+@pytest.fixture(scope="session")
+def tiny_model(tmp_path_factory):
+    torch = pytest.importorskip("torch")
+    transformers = pytest.importorskip("transformers")
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers, trainers
+    
+    path = tmp_path_factory.mktemp("tiny-model")
+    
+    # Byte-level BPE trained on a few lines: any text encodes, nothing is downloaded
+    tokenizer = Tokenizer(models.BPE())
+    tokenizer.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tokenizer.decoder = decoders.ByteLevel()
+    tokenizer.train_from_iterator(CORPUS * 20, trainers.BpeTrainer(
+        vocab_size=400,
+        special_tokens=["<eos>"],
+        initial_alphabet=pre_tokenizers.ByteLevel.alphabet()
+    ))
+    fast = transformers.PreTrainedTokenizerFast(tokenizer_object=tokenizer, eos_token="<eos>")
+    fast.save_pretrained(path)
+    
+    config = transformers.LlamaConfig(
+        vocab_size=len(fast),
+        hidden_size=32,
+        intermediate_size=64,
+        num_hidden_layers=2,
+        num_attention_heads=4,
+        num_key_value_heads=4,
+        max_position_embeddings=4096,
+        bos_token_id=0,
+        eos_token_id=0
+    )
+    torch.manual_seed(0)
+    transformers.LlamaForCausalLM(config).save_pretrained(path)
+    
+    return path
+
+
+@pytest.fixture
+def llm(tiny_model, monkeypatch):
+    from manual import llm_manager
+    
+    monkeypatch.setattr(llm_manager, "MODEL_NAME", str(tiny_model))
+    monkeypatch.setattr(llm_manager, "DRAFT_MODEL_NAME", "")
+    manager = llm_manager.LLMManager()
+    manager.load_model(device="cpu", backend="local")
+    yield manager
+    manager._model = None
+    manager._tokenizer = None
+    manager._draft_model = None
+    manager.clear_prefixes()
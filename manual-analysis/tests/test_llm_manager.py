@@ -0,0 +1,27 @@
+from manual.orchestrator import SYSTEM_PROMPT
+
+
+def _chat_prompt(message):
+    # Same layout as Orchestrator.orchestrate
+    return f"{SYSTEM_PROMPT}\n\nUser: {message}\n\nAssistant:"
+
+
+def test_system_prompt_prefix_hits_and_keeps_output(llm):
+    prompts = [_chat_prompt("Which pattern does this class implement?"), _chat_prompt("class Repository:\n    pass")]
+    plain = [llm.generate(prompt, max_new_tokens=12, do_sample=False) for prompt in prompts]
+    
+    cached_tokens = llm.cache_prefix(SYSTEM_PROMPT)
+    hits = llm.prefix_hits
+    cached = [llm.generate(prompt, max_new_tokens=12, do_sample=False) for prompt in prompts]
+    
+    assert cached_tokens > 0
+    assert llm.prefix_hits == hits + len(prompts)
+    assert cached == plain
+
+
+def test_prefix_ids_start_the_tokenized_prompt(llm):
+    llm.cache_prefix(SYSTEM_PROMPT)
+    prefix_ids = llm._prefixes[0][0]
+    
+    for message in ("hi", "\n\nstarts with blank lines", "Code:\n\n    x = 1"):
+        assert llm._tokenizer(_chat_prompt(message))["input_ids"][:len(prefix_ids)] == prefix_ids